@@ -0,0 +1,584 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+bench_daemon
+~~~~~~~~~~~~~~~~~
+
+Microbenchmarks of the hot paths of the daemon package. Every benchmark runs
+in-process, without network, and prints the time and the memory allocated per
+request for the current code next to the code path it replaced.
+
+Benchmarks:
+-----------
+- parser: reading and parsing one request, from socket bytes to a prepared
+  :class:`Request <Request>`.
+- objects: object churn of serving requests, with fresh adapter, request and
+  response objects per request versus one reused per worker: garbage collector
+  runs and pauses per 100k requests.
+- router: route lookup in tables of a few hundred routes, with the
+  :class:`Router <Router>` tree versus a list of regular expressions tried in
+  turn.
+- headers: building the response to a JSON route and to a cached static file,
+  with header templates, a cached ``Date`` and one join versus the header dict
+  formatted per response.
+- json: encoding channel histories of growing size, with the codec of
+  :mod:`daemon.codec` whole and incrementally versus ``json.dumps`` then
+  ``encode``, and decoding a posted message.
+
+Usage Example:
+--------------
+>>> python bench_daemon.py            # every benchmark
+>>> python bench_daemon.py parser     # only the parser one
+>>> python bench_daemon.py headers    # only the response header one
+>>> python bench_daemon.py json       # only the JSON codec one
+"""
+
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import os
+import re
+import time
+import tracemalloc
+
+from daemon import codec
+from daemon.dictionary import CaseInsensitiveDict
+from daemon.framing import RequestFramer
+from daemon.httpadapter import HttpAdapter, worker_adapter
+from daemon.request import Request
+from daemon.response import Response, HTTP_REASON, OPTIONAL_HEADERS
+from daemon.middleware import server_timing
+from daemon.router import Router
+
+#: Request bodies used by the parser benchmark, by label.
+PARSER_BODIES = {
+    "GET, no body": None,
+    "POST 1 KiB": 1024,
+    "POST 256 KiB": 256 * 1024,
+}
+
+
+class FakeSocket:
+    """
+    In-memory stand-in of a connected socket returning a fixed byte stream,
+    at most ``segment`` bytes per call like a real ``recv``.
+    """
+
+    def __init__(self, data, segment=65536):
+        self.data = memoryview(data)
+        self.segment = segment
+        self.pos = 0
+
+    def recv(self, size):
+        chunk = bytes(self.data[self.pos:self.pos + min(size, self.segment)])
+        self.pos += len(chunk)
+        return chunk
+
+    def recv_into(self, buf):
+        n = min(len(buf), self.segment, len(self.data) - self.pos)
+        buf[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+def build_request(body_size):
+    """Encode a browser-like request with an optional body of ``body_size`` bytes."""
+    head = (
+        "{} /send-message HTTP/1.1\r\n"
+        "Host: 127.0.0.1:8001\r\n"
+        "User-Agent: Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/128.0\r\n"
+        "Accept: application/json, text/plain, */*\r\n"
+        "Accept-Language: en-US,en;q=0.5\r\n"
+        "Accept-Encoding: gzip, deflate, br\r\n"
+        "Cookie: auth=true; session_id=6f1d2c\r\n"
+        "Connection: keep-alive\r\n"
+    ).format("GET" if body_size is None else "POST")
+    if body_size is None:
+        return (head + "\r\n").encode()
+    body = b'{"message": "' + b"x" * (body_size - 15) + b'"}'
+    return (head + "Content-Type: application/json\r\n"
+            "Content-Length: {}\r\n\r\n".format(len(body))).encode() + body
+
+
+def legacy_parse(sock, routes):
+    """
+    The request path replaced by :class:`RequestFramer <RequestFramer>`: grow
+    the message with ``msg += chunk``, decode all of it and let
+    :meth:`Request.prepare` split it again.
+    """
+    msg = b""
+    while True:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        msg += chunk
+        header_end = msg.find(b"\r\n\r\n")
+        if header_end != -1:
+            content_length = 0
+            for line in msg[:header_end].decode('utf-8', errors='ignore').split('\r\n'):
+                if line.lower().startswith('content-length:'):
+                    content_length = int(line.split(':', 1)[1].strip())
+            while len(msg) - header_end - 4 < content_length:
+                chunk = sock.recv(min(4096, content_length - (len(msg) - header_end - 4)))
+                if not chunk:
+                    break
+                msg += chunk
+            break
+    try:
+        msg_str = msg.decode('utf-8')
+    except UnicodeDecodeError:
+        msg_str = msg.decode('latin-1', errors='ignore')
+    req = Request()
+    req.prepare(msg_str, routes)
+    return req
+
+
+def framer_parse(sock, routes, framer=None):
+    """The current request path: ``recv_into`` a reusable buffer, parse once."""
+    framer = framer or RequestFramer()
+    msg = framer.next_request()
+    while msg is None:
+        framer.recv_into(sock)
+        msg = framer.next_request()
+    req = Request()
+    req.prepare_message(msg, routes)
+    return req
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the request logging of the daemon while measuring."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def measure(func, data, rounds):
+    """
+    Run ``func(FakeSocket(data))`` ``rounds`` times.
+
+    :rtype tuple: microseconds per call and peak bytes allocated by one call.
+    """
+    with quiet():
+        for _ in range(min(rounds, 50)):
+            func(FakeSocket(data))
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func(FakeSocket(data))
+        elapsed = (time.perf_counter() - start) / rounds * 1e6
+
+        sock = FakeSocket(data)
+        tracemalloc.start()
+        func(sock)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_parser(rounds):
+    """
+    Compare the legacy and the framer request paths for several body sizes, the
+    framer being either new (first request of a connection) or reused (next
+    requests of a keep-alive connection).
+    """
+    routes = {("POST", "/send-message"): None}
+    print("parser: socket bytes to prepared Request ({} rounds)".format(rounds))
+    print("  {:<14} {:>10} {:>10} {:>10} {:>13} {:>13} {:>13}".format(
+        "request", "legacy us", "new us", "reused us",
+        "legacy bytes", "new bytes", "reused bytes"))
+    for label, size in PARSER_BODIES.items():
+        data = build_request(size)
+        n = rounds if size is None or size < 65536 else max(rounds // 20, 10)
+        framer = RequestFramer()
+        old_us, old_peak = measure(lambda s: legacy_parse(s, routes), data, n)
+        new_us, new_peak = measure(lambda s: framer_parse(s, routes), data, n)
+        kept_us, kept_peak = measure(lambda s: framer_parse(s, routes, framer), data, n)
+        print("  {:<14} {:>10.1f} {:>10.1f} {:>10.1f} {:>13,} {:>13,} {:>13,}".format(
+            label, old_us, new_us, kept_us, old_peak, new_peak, kept_peak))
+
+
+class DictRequest(Request):
+    """:class:`Request <Request>` with an instance ``__dict__``, as before slots."""
+
+    def reset(self):
+        super().reset()
+        self.routes = {}
+
+
+class DictResponse(Response):
+    """:class:`Response <Response>` with an instance ``__dict__`` and the eagerly
+    allocated members it had before slots."""
+
+    def reset(self):
+        super().reset()
+        self.history = []
+        self.cookies = CaseInsensitiveDict()
+        self.elapsed = datetime.timedelta(0)
+
+
+class DictAdapter(HttpAdapter):
+    """:class:`HttpAdapter <HttpAdapter>` with an instance ``__dict__``, building
+    the objects above."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.request = DictRequest()
+        self.response = DictResponse()
+
+
+class GCMonitor:
+    """Collects the number and duration of garbage collector runs."""
+
+    def __init__(self):
+        self.runs = [0, 0, 0]
+        self.pauses = []
+        self._started = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._started = time.perf_counter()
+        elif self._started is not None:
+            self.runs[info["generation"]] += 1
+            self.pauses.append(time.perf_counter() - self._started)
+            self._started = None
+
+    def __enter__(self):
+        gc.collect()
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *args):
+        gc.callbacks.remove(self)
+
+
+def serve_requests(adapter_for, data, routes, count):
+    """
+    Serve ``count`` times the request ``data`` with the adapter returned by
+    ``adapter_for()``, from framing to the encoded response.
+    """
+    for _ in range(count):
+        daemon = adapter_for()
+        daemon.framer.feed(data)
+        msg = daemon.framer.next_request()
+        daemon.handle_request(msg, routes, keep_alive=True)
+
+
+def bench_objects(rounds):
+    """
+    Serve ``rounds * 50`` requests (100k by default) to a route handler with a
+    new pre-slots adapter per request, a new slotted one, and one reused per
+    worker thread, counting garbage collector runs and pauses.
+    """
+    def hello(headers, body):
+        return {"status": "success"}
+    hello._route_path, hello._route_methods = "/send-message", ["POST"]
+    routes = {("POST", "/send-message"): hello}
+    data = build_request(256)
+    count = rounds * 50
+    addr = ("127.0.0.1", 50000)
+    variants = {
+        "fresh, dict": lambda: DictAdapter("127.0.0.1", 8001, None, addr, routes),
+        "fresh, slots": lambda: HttpAdapter("127.0.0.1", 8001, None, addr, routes),
+        "reused, slots": lambda: worker_adapter("127.0.0.1", 8001, routes),
+    }
+
+    print("objects: serving {:,} requests".format(count))
+    print("  {:<14} {:>8} {:>12} {:>10} {:>10} {:>10} {:>13} {:>12}".format(
+        "adapter", "us/req", "peak bytes", "gen0 GCs", "gen1 GCs", "gen2 GCs",
+        "GC pause ms", "max pause us"))
+    for label, adapter_for in variants.items():
+        with quiet():
+            serve_requests(adapter_for, data, routes, min(count, 1000))
+
+            tracemalloc.start()
+            serve_requests(adapter_for, data, routes, 1)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            with GCMonitor() as monitor:
+                start = time.perf_counter()
+                serve_requests(adapter_for, data, routes, count)
+                elapsed = time.perf_counter() - start
+        print("  {:<14} {:>8.1f} {:>12,} {:>10,} {:>10,} {:>10,} {:>13.1f} {:>12.0f}".format(
+            label, elapsed / count * 1e6, peak, monitor.runs[0], monitor.runs[1], monitor.runs[2],
+            sum(monitor.pauses) * 1e3, max(monitor.pauses, default=0) * 1e6))
+
+
+#: Route table sizes used by the router benchmark.
+ROUTER_SIZES = (10, 100, 500)
+
+
+def build_routes(count):
+    """
+    Build a route table of ``count`` routes named like a REST API, half of them
+    with path parameters, and the request paths of its last routes.
+    """
+    routes = {}
+    for i in range(count // 2):
+        routes[("GET", "/api/v1/resource{}".format(i))] = i
+        routes[("GET", "/api/v1/resource{}/<int:item_id>/comments/<name>".format(i))] = i
+    last = count // 2 - 1
+    requests = {
+        "static": ("GET", "/api/v1/resource{}".format(last)),
+        "params": ("GET", "/api/v1/resource{}/42/comments/general".format(last)),
+        "405": ("POST", "/api/v1/resource{}".format(last)),
+        "404": ("GET", "/api/v2/missing"),
+    }
+    return routes, requests
+
+
+class RegexRouter:
+    """
+    Usual alternative to a route tree: one regular expression per route, tried
+    in registration order.
+    """
+
+    def __init__(self, routes):
+        self.patterns = []
+        for (method, path), handler in routes.items():
+            pattern = re.sub(r"<(int:)?(\w+)>",
+                             lambda m: "(?P<{}>{})".format(m[2], "[0-9]+" if m[1] else "[^/]+"), path)
+            self.patterns.append((re.compile(pattern + "$"), method, handler))
+
+    def match(self, method, path):
+        allowed = []
+        for pattern, route_method, handler in self.patterns:
+            found = pattern.match(path)
+            if found is not None:
+                if route_method == method:
+                    params = {name: int(value) if value.isdigit() else value
+                              for name, value in found.groupdict().items()}
+                    return handler, params, None
+                allowed.append(route_method)
+        return None, None, tuple(sorted(allowed))
+
+
+def bench_router(rounds):
+    """
+    Time the lookup of the last routes of tables of growing size, and of paths
+    without a route, with the :class:`Router <Router>` and with a list of
+    regular expressions.
+    """
+    n = rounds * 25
+    print("router: route lookup ({:,} lookups)".format(n))
+    print("  {:<7} {:<8} {:>10} {:>10}".format("routes", "request", "regex us", "tree us"))
+    for size in ROUTER_SIZES:
+        routes, requests = build_routes(size)
+        tree, regex = Router(routes), RegexRouter(routes)
+        for label, (method, path) in requests.items():
+            assert tree.match(method, path) == regex.match(method, path), (label, path)
+            timings = []
+            for router in (regex, tree):
+                match = router.match
+                count = n if router is tree else max(n // size, 100)
+                start = time.perf_counter()
+                for _ in range(count):
+                    match(method, path)
+                timings.append((time.perf_counter() - start) / count * 1e6)
+            print("  {:<7} {:<8} {:>10.2f} {:>10.2f}".format(size, label, *timings))
+
+
+class LegacyHeaderResponse(Response):
+    """:class:`Response <Response>` building its header as before templates: a
+    dict of 17 headers, some echoed from the request, a ``Date`` formatted per
+    response and a string grown line by line."""
+
+    def build_response_header(self, request):
+        reqhdr = request.headers
+        rsphdr = self.headers
+        origin = reqhdr.get("origin", "*")
+        headers = {
+                "Accept": str(reqhdr.get("Accept", "application/json")),
+                "Accept-Language": str(reqhdr.get("Accept-Language", "en-US,en;q=0.9")),
+                "Authorization": str(reqhdr.get("Authorization", "Basic <credentials>")),
+                "Cache-Control": rsphdr.get('Cache-Control') or self.cache_control(request),
+                "Content-Type": str(self.headers.get('Content-Type', 'text/html')),
+                "Content-Length": str(len(self._content) if isinstance(self._content, (bytearray,bytes)) else 0 ),
+                "Date": str(datetime.datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")),
+                "Max-Forward": "10",
+                "Pragma": "no-cache",
+                "Proxy-Authorization": "Basic dXNlcjpwYXNz",
+                "Warning": "199 Miscellaneous warning",
+                "User-Agent": str(reqhdr.get("User-Agent", "Chrome/123.0.0.0")),
+                "Access-Control-Allow-Origin": origin,
+                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
+                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
+                "Access-Control-Allow-Credentials": "true",
+                "Connection": self.connection_header(request),
+            }
+        if headers["Cache-Control"] != "no-cache":
+            del headers["Pragma"]
+        for name in OPTIONAL_HEADERS:
+            if name in rsphdr:
+                headers[name] = rsphdr[name]
+        if self._content is None:
+            if 'Content-Length' in rsphdr:
+                headers['Content-Length'] = rsphdr['Content-Length']
+            else:
+                del headers["Content-Length"]
+            if 'Transfer-Encoding' in rsphdr:
+                headers['Transfer-Encoding'] = rsphdr['Transfer-Encoding']
+        if request.timings:
+            headers['Server-Timing'] = server_timing(request.timings)
+        if 'Set-Cookie' in rsphdr:
+            headers['Set-Cookie'] = rsphdr['Set-Cookie']
+        if 'Authorization' in reqhdr:
+            headers['Authorization'] = str(reqhdr.get("Authorization"))
+        self.reason = HTTP_REASON.get(self.status_code, "Unknown")
+        fmt_header = f"HTTP/1.1 {self.status_code} {self.reason}\r\n"
+        for key, value in headers.items():
+            fmt_header += f"{key}: {value}\r\n"
+        fmt_header += "\r\n"
+        return str(fmt_header).encode('utf-8')
+
+
+def prepare_get(path, routes):
+    """A prepared browser-like GET request of ``path``."""
+    framer = RequestFramer()
+    framer.feed(build_request(None).replace(b"/send-message", path.encode(), 1))
+    req = Request()
+    req.prepare_message(framer.next_request(), routes)
+    return req
+
+
+def bench_headers(rounds):
+    """
+    Time the building of complete responses, header included, to a JSON route
+    and to a static file held by the file cache, with the current header and
+    the legacy one, and compare their header sizes.
+    """
+    def messages(headers, body):
+        return {"status": "success", "messages": [{"user": "alice", "text": "hello"}] * 3}
+    routes = Router({("GET", "/messages"): messages})
+    cases = {
+        "JSON route": (prepare_get("/messages", routes),
+                       lambda rsp, req: rsp.build_json_response(messages(None, None), req)),
+        "static file": (prepare_get("/css/styles.css", routes),
+                        lambda rsp, req: rsp.build_response(req)),
+    }
+    n = rounds * 10
+    print("headers: building responses ({:,} rounds)".format(n))
+    print("  {:<12} {:>10} {:>10} {:>13} {:>13}".format(
+        "response", "legacy us", "new us", "legacy header", "new header"))
+    for label, (req, build) in cases.items():
+        timings, sizes = [], []
+        for rsp in (LegacyHeaderResponse(), Response()):
+            with quiet():
+                for _ in range(min(n, 100)):
+                    rsp.reset()
+                    build(rsp, req)
+                start = time.perf_counter()
+                for _ in range(n):
+                    rsp.reset()
+                    build(rsp, req)
+                timings.append((time.perf_counter() - start) / n * 1e6)
+            sizes.append(len(rsp._header))
+        print("  {:<12} {:>10.2f} {:>10.2f} {:>13,} {:>13,}".format(label, *timings, *sizes))
+
+
+#: Channel history sizes used by the json benchmark, in messages.
+JSON_HISTORIES = (100, 10000, 100000)
+
+
+def build_history(count):
+    """A ``/get-messages`` result of ``count`` chat messages."""
+    messages = [{
+        "from": "peer{}".format(i % 50),
+        "message": "Tin nhắn số {} trong kênh general, hello everyone!".format(i),
+        "timestamp": "2026-10-17T08:{:02d}:{:02d}.{:06d}".format(i // 60 % 60, i % 60, i),
+    } for i in range(count)]
+    return {"status": "success", "channel": "general", "messages": messages, "count": count}
+
+
+def measure_encode(func, data, rounds):
+    """
+    Run ``func(data)`` ``rounds`` times.
+
+    :rtype tuple: milliseconds per call and peak bytes allocated by one call.
+    """
+    func(data)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(data)
+    elapsed = (time.perf_counter() - start) / rounds * 1e3
+    tracemalloc.start()
+    func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def consume(chunks):
+    """Drain an incremental encoding as a socket would, keeping only the size."""
+    return sum(len(chunk) for chunk in chunks)
+
+
+def bench_json(rounds):
+    """
+    Time and measure the peak memory of encoding channel histories with
+    ``json.dumps(...).encode()``, :func:`codec.dumps` and
+    :func:`codec.iterencode`, and of decoding a posted message.
+    """
+    variants = {
+        "json.dumps": lambda data: json.dumps(data, ensure_ascii=False).encode('utf-8'),
+        "codec.dumps": codec.dumps,
+        "iterencode": lambda data: consume(codec.iterencode(data)),
+    }
+    print("json: encoding channel histories with the {} codec".format(codec.BACKEND))
+    print("  {:<9} {:<12} {:>10} {:>14}".format("messages", "encoder", "ms", "peak bytes"))
+    for count in JSON_HISTORIES:
+        data = build_history(count)
+        n = max(rounds * 100 // count, 3)
+        for label, func in variants.items():
+            elapsed, peak = measure_encode(func, data, n)
+            print("  {:<9,} {:<12} {:>10.3f} {:>14,}".format(count, label, elapsed, peak))
+
+    body = json.dumps({"peer_id": "peer12", "channel": "general",
+                       "message": "Xin chào mọi người, hello everyone!"}).encode('utf-8')
+    n = rounds * 25
+    timings = []
+    for loads in (json.loads, codec.loads):
+        start = time.perf_counter()
+        for _ in range(n):
+            loads(body)
+        timings.append((time.perf_counter() - start) / n * 1e6)
+    print("  decoding a posted message: json.loads {:.2f} us, codec.loads {:.2f} us".format(*timings))
+
+
+#: Available benchmarks, by name.
+BENCHMARKS = {
+    "parser": bench_parser,
+    "objects": bench_objects,
+    "router": bench_router,
+    "headers": bench_headers,
+    "json": bench_json,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='bench_daemon', description='Daemon microbenchmarks')
+    parser.add_argument('names', nargs='*', metavar='name',
+                        help='Benchmarks to run, among {}. Default is all of them'.format(
+                            ", ".join(BENCHMARKS)))
+    parser.add_argument('--rounds', type=int, default=2000,
+                        help='Iterations per measurement. Default is 2000')
+    args = parser.parse_args()
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark {}".format(name))
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name](args.rounds)
+        print()
@@ -0,0 +1,2 @@
+# test_chat.py exercises a running chat app by hand, it is not a pytest module.
+collect_ignore = ["test_chat.py"]
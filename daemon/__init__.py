@@ -17,4 +17,13 @@ from .response import Response
 from .request import Request
 from .backend import create_backend
 from .httpadapter import HttpAdapter
+from .workerpool import WorkerPool
+from .admission import AdmissionController
+from .bodystream import RequestBody
+from .router import Router
+from .appconfig import AppConfig
+from .middleware import Pipeline
+from .cache import ResponseCache
+from .filecache import FileCache
+from .conditional import CacheControl
 from .dictionary import CaseInsensitiveDict
\ No newline at end of file
@@ -0,0 +1,185 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.admission
+~~~~~~~~~~~~~~~~~
+
+This module provides an :class:`AdmissionController <AdmissionController>` object
+which sheds load when the backend falls behind. Instead of letting requests pile
+up in the listen backlog and in threads, a request over the configured thresholds
+is answered at once with a pre-encoded ``503 Service Unavailable`` and a
+``Retry-After`` header, without running its route handler.
+
+A request is shed when:
+
+- ``max_in_flight`` requests are already admitted and not finished, or
+- it waited longer than ``max_queue_wait`` seconds between the moment it was
+  accepted (or queued for a handler) and the moment a handler picked it up.
+
+Usage Example:
+--------------
+>>> admission = AdmissionController(max_in_flight=64, max_queue_wait=0.5)
+>>> create_backend("127.0.0.1", 9000, routes={}, engine="pool", admission=admission)
+>>> admission.stats()["shed"]
+0
+"""
+
+import threading
+import time
+
+from .response import Response
+
+
+class AdmissionController:
+    """
+    Thread-safe gate counting in-flight requests and their queue wait time.
+
+    Attributes:
+        max_in_flight (int): maximum number of requests admitted at once, None for no limit.
+        max_queue_wait (float): maximum seconds a request may wait for a handler,
+                                None for no limit.
+        retry_after (int): seconds announced in the ``Retry-After`` header of shed requests.
+        reply (bytes): the pre-encoded 503 response sent to shed requests.
+    """
+
+    __attrs__ = [
+        "max_in_flight",
+        "max_queue_wait",
+        "retry_after",
+        "reply",
+    ]
+
+    def __init__(self, max_in_flight=64, max_queue_wait=0.5, retry_after=1):
+        """
+        Initialize a new AdmissionController instance.
+
+        :param max_in_flight (int): maximum number of requests admitted at once,
+                                    None to disable the limit.
+        :param max_queue_wait (float): maximum seconds a request may wait for a
+                                       handler, None to disable the limit.
+        :param retry_after (int): seconds announced in the ``Retry-After`` header.
+
+        :raises ValueError: If a threshold is not positive.
+        """
+        if max_in_flight is not None and max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1, got {}".format(max_in_flight))
+        if max_queue_wait is not None and max_queue_wait <= 0:
+            raise ValueError("max_queue_wait must be positive, got {}".format(max_queue_wait))
+
+        #: In-flight limit
+        self.max_in_flight = max_in_flight
+        #: Queue wait limit
+        self.max_queue_wait = max_queue_wait
+        #: Retry-After seconds
+        self.retry_after = retry_after
+        #: Shed response, encoded once
+        self.reply = Response().build_unavailable(retry_after)
+
+        self._lock = threading.Lock()
+
+        # Counters, guarded by self._lock
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._admitted = 0
+        self._shed_in_flight = 0
+        self._shed_queue_wait = 0
+        self._wait_total = 0.0
+        self._wait_count = 0
+        self._wait_max = 0.0
+
+    def overloaded(self):
+        """
+        Cheap check made before any work is spent on a new connection, e.g. in an
+        accept loop. A True answer counts as a shed request.
+
+        :rtype bool: True if the in-flight limit is reached.
+        """
+        with self._lock:
+            if self.max_in_flight is not None and self._in_flight >= self.max_in_flight:
+                self._shed_in_flight += 1
+                return True
+        return False
+
+    def admit(self, queued_at=None):
+        """
+        Decide whether a request is served. An admitted request must be followed
+        by one :meth:`release` call once its response is built.
+
+        :param queued_at (float): ``time.monotonic()`` of the moment the request
+                                  started waiting for a handler, None to skip the
+                                  queue wait check.
+
+        :rtype bool: True if the request is admitted, False if it must be answered
+                     with ``self.reply``.
+        """
+        with self._lock:
+            if self.max_in_flight is not None and self._in_flight >= self.max_in_flight:
+                self._shed_in_flight += 1
+                return False
+            self._in_flight += 1
+            self._admitted += 1
+            if self._in_flight > self._peak_in_flight:
+                self._peak_in_flight = self._in_flight
+
+        if queued_at is not None and self.expired(queued_at):
+            self.release()
+            return False
+        return True
+
+    def expired(self, queued_at):
+        """
+        Record the queue wait of an already admitted request and tell whether it
+        waited too long to still be worth serving.
+
+        :param queued_at (float): ``time.monotonic()`` of the moment the request
+                                  started waiting for a handler.
+
+        :rtype bool: True if the request must be answered with ``self.reply``.
+        """
+        waited = time.monotonic() - queued_at
+        with self._lock:
+            self._wait_total += waited
+            self._wait_count += 1
+            if waited > self._wait_max:
+                self._wait_max = waited
+            if self.max_queue_wait is not None and waited > self.max_queue_wait:
+                self._shed_queue_wait += 1
+                return True
+        return False
+
+    def release(self):
+        """
+        Mark an admitted request as finished.
+        """
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self):
+        """
+        Snapshot of the admission counters.
+
+        :rtype dict: admitted and shed request counts (total and per reason), the
+                     current and peak number of in-flight requests and the queue
+                     wait time (average and maximum, in milliseconds).
+        """
+        with self._lock:
+            return {
+                "admitted": self._admitted - self._shed_queue_wait,
+                "shed": self._shed_in_flight + self._shed_queue_wait,
+                "shed_in_flight": self._shed_in_flight,
+                "shed_queue_wait": self._shed_queue_wait,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "wait_avg_ms": (self._wait_total / self._wait_count * 1000.0) if self._wait_count else 0.0,
+                "wait_max_ms": self._wait_max * 1000.0,
+            }
@@ -0,0 +1,89 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.appconfig
+~~~~~~~~~~~~~~~~~
+
+This module provides an :class:`AppConfig <AppConfig>` object, the settings of a
+WeApRous app that apply to every request besides its routes: the middleware
+pipeline, the response and static file caches, the ``Cache-Control`` policies and
+the compression and JSON streaming thresholds.
+
+The app builds it and hands it to :func:`create_backend`, which passes it to the
+:class:`HttpAdapter <HttpAdapter>` of every connection; the adapter sets it on
+each request as ``request.config`` for the response builder. Routes passed to a
+backend without an app are served with :data:`DEFAULT_CONFIG`.
+
+Usage Example:
+--------------
+>>> config = AppConfig(pipeline=Pipeline(), compress_min_size=None)
+>>> create_backend("127.0.0.1", 9000, routes={}, config=config)
+"""
+
+from .compression import COMPRESS_MIN_SIZE
+from .codec import STREAM_MIN_ITEMS
+
+
+class AppConfig:
+    """
+    Settings of a WeApRous app shared by all its requests.
+
+    Attributes:
+        pipeline (Pipeline): middleware run around the route handlers, or None.
+        cache (ResponseCache): cache of the routes registered with ``@app.cache``, or None.
+        files (FileCache): cache of the static files, or None for the default one.
+        cache_control (CacheControl): ``Cache-Control`` policies by path, or None.
+        compress_min_size (int): smallest JSON response compressed, in bytes, None
+                                 to never compress them.
+        json_stream_items (int): smallest list of a route result encoded
+                                 incrementally, in items, None to never do so.
+    """
+
+    __attrs__ = [
+        "pipeline",
+        "cache",
+        "files",
+        "cache_control",
+        "compress_min_size",
+        "json_stream_items",
+    ]
+
+    def __init__(self, pipeline=None, cache=None, files=None, cache_control=None,
+                 compress_min_size=COMPRESS_MIN_SIZE, json_stream_items=STREAM_MIN_ITEMS):
+        """
+        Initialize a new AppConfig instance.
+
+        :param pipeline (Pipeline): middleware of the app, or None.
+        :param cache (ResponseCache): response cache of the app, or None.
+        :param files (FileCache): static file cache of the app, or None.
+        :param cache_control (CacheControl): ``Cache-Control`` policies, or None.
+        :param compress_min_size (int): JSON compression threshold, in bytes.
+        :param json_stream_items (int): JSON streaming threshold, in items.
+        """
+        #: Middleware pipeline
+        self.pipeline = pipeline
+        #: Response cache
+        self.cache = cache
+        #: Static file cache
+        self.files = files
+        #: Cache-Control policies
+        self.cache_control = cache_control
+        #: JSON compression threshold
+        self.compress_min_size = compress_min_size
+        #: JSON streaming threshold
+        self.json_stream_items = json_stream_items
+
+
+#: Settings of the routes served without an app: no middleware nor response
+#: cache, the default thresholds.
+DEFAULT_CONFIG = AppConfig()
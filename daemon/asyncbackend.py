@@ -0,0 +1,323 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.asyncbackend
+~~~~~~~~~~~~~~~~~
+
+This module provides the "asyncio" backend engine. All connections are served by
+a single event loop, so idle or slow clients cost a coroutine instead of a thread.
+
+Requests are parsed and answered with the same :class:`HttpAdapter <HttpAdapter>`,
+:class:`Request <Request>` and :class:`Response <Response>` logic as the threaded
+engines:
+
+- ``async def`` route handlers are awaited directly on the event loop.
+- regular route handlers (and static file serving) run in a thread pool executor
+  so they never block the loop.
+
+On SIGINT or SIGTERM the server drains: it stops accepting, closes its idle
+connections and waits for the requests in flight before the loop stops.
+
+Usage Example:
+--------------
+>>> create_backend("127.0.0.1", 9000, routes={}, engine="asyncio")
+
+"""
+
+import asyncio
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .httpadapter import HttpAdapter, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS
+from .framing import FramingError, RECV_SIZE
+from .response import FileResponse, next_part
+from .eventloop import is_async_handler
+from .listener import create_listener
+from .lifecycle import Drain, DRAIN_TIMEOUT
+
+#: Idle adapters kept by the server for the next connections.
+MAX_IDLE_ADAPTERS = 64
+
+
+async def read_request(reader, framer, timeout=None):
+    """
+    Read the next raw HTTP request from a stream, like
+    :meth:`HttpAdapter.read_request`.
+
+    :param reader (asyncio.StreamReader): the client stream.
+    :param framer (RequestFramer): the framer of the connection.
+    :param timeout (float): seconds each read may wait for data, like the
+                            socket timeout of the threaded engines, so a slow
+                            upload is not cut as long as it keeps sending.
+                            None to wait forever.
+
+    :rtype Message: the framed request, None if the client closed the
+                    connection before sending a complete request.
+
+    :raises FramingError: If the request is malformed or too large.
+    :raises asyncio.TimeoutError: If a read waited ``timeout`` seconds.
+    """
+    msg = framer.next_request()
+    while msg is None:
+        chunk = await asyncio.wait_for(reader.read(RECV_SIZE), timeout)
+        if not chunk:
+            return None
+        framer.feed(chunk)
+        msg = framer.next_request()
+    return msg
+
+
+async def write_response(writer, response, executor):
+    """
+    Write an encoded response to a stream, like :meth:`HttpAdapter.send_response`.
+    The parts of a streamed response are produced in the executor, since the
+    route handler may block between two of them. The file spans of a file
+    response are sent with ``loop.sendfile``, which copies them itself when the
+    transport cannot use ``os.sendfile``.
+
+    :param writer (asyncio.StreamWriter): the client stream writer.
+    :param response (bytes): the complete HTTP response, or an iterator of its parts.
+    :param executor (Executor): executor running the synchronous handlers.
+
+    :rtype bool: False if a streamed response was cut short by its handler.
+    """
+    if isinstance(response, (bytes, bytearray)):
+        writer.write(response)
+        await writer.drain()
+        return True
+    loop = asyncio.get_running_loop()
+    if isinstance(response, FileResponse):
+        try:
+            writer.write(response.header)
+            for part in response.parts:
+                if isinstance(part, bytes):
+                    writer.write(part)
+                else:
+                    await writer.drain()
+                    await loop.sendfile(writer.transport, response.file, *part)
+            await writer.drain()
+        finally:
+            response.close()
+        return True
+    while True:
+        part = await loop.run_in_executor(executor, next_part, response)
+        if part is None:
+            return False
+        if not part:
+            return True
+        writer.write(part)
+        await writer.drain()
+
+
+def dispatch_admitted(daemon, req, admission, queued_at):
+    """
+    Executor job running a synchronous handler, unless the request waited too
+    long for an executor thread.
+
+    :param daemon (HttpAdapter): the adapter of the request.
+    :param req (Request): the prepared request.
+    :param admission (AdmissionController): admission control, or None.
+    :param queued_at (float): ``time.monotonic()`` of the submission to the executor.
+
+    :rtype bytes: the complete HTTP response, or the shed reply.
+    """
+    if admission is not None and admission.expired(queued_at):
+        req.keep_alive = False
+        return admission.reply
+    return daemon.dispatch_sync(req)
+
+
+async def handle_client(ip, port, reader, writer, routes, executor,
+                        keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX_REQUESTS,
+                        admission=None, drain=None, adapters=None, config=None):
+    """
+    Serve one client connection on the event loop, keeping it open between
+    requests like :meth:`HttpAdapter.handle_client`.
+
+    :param ip (str): IP address of the server.
+    :param port (int): Port number the server is listening on.
+    :param reader (asyncio.StreamReader): the client stream reader.
+    :param writer (asyncio.StreamWriter): the client stream writer.
+    :param routes (dict): Dictionary of route handlers.
+    :param executor (Executor): executor running the synchronous handlers.
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+    :param max_requests (int): maximum number of requests served per connection.
+    :param admission (AdmissionController): admission control, or None.
+    :param drain (Drain): open connections book-keeping of the server, or None.
+    :param adapters (list): idle :class:`HttpAdapter <HttpAdapter>` objects of the
+                            server; the connection takes one and gives it back
+                            when closed, instead of allocating its own.
+    :param config (AppConfig): settings of the app serving the routes, or None.
+    """
+    addr = writer.get_extra_info("peername")
+    sock = writer.get_extra_info("socket")
+    loop = asyncio.get_running_loop()
+    if adapters:
+        daemon = adapters.pop()
+        daemon.reset(None, addr)
+    else:
+        daemon = HttpAdapter(ip, port, None, addr, routes, config=config)
+    framer = daemon.framer
+    served = 0
+    try:
+        while served < max_requests:
+            if served and drain is not None and not drain.idle(sock):
+                break
+            try:
+                msg = await read_request(reader, framer, keepalive_timeout)
+            except asyncio.TimeoutError:
+                break
+            except FramingError as e:
+                print("[AsyncBackend] Rejecting request from {}: {}".format(addr, e))
+                writer.write(daemon.response.build_error(e.status_code))
+                await writer.drain()
+                break
+            if not msg:
+                break
+            if drain is not None:
+                drain.busy(sock)
+            served += 1
+
+            if admission is not None and not admission.admit():
+                print("[AsyncBackend] Overloaded, shedding request from {}".format(addr))
+                writer.write(admission.reply)
+                await writer.drain()
+                break
+
+            try:
+                if served > 1:
+                    daemon.request.reset()
+                    daemon.response.reset()
+                req = daemon.prepare_request(msg, routes)
+                req.keep_alive = (req.keep_alive and served < max_requests
+                                  and not (drain is not None and drain.draining))
+
+                if req.method == 'OPTIONS':
+                    response = daemon.build_preflight(req)
+                elif is_async_handler(req.hook):
+                    response = await daemon.dispatch_async(req)
+                else:
+                    response = await loop.run_in_executor(executor, dispatch_admitted,
+                                                          daemon, req, admission, time.monotonic())
+            finally:
+                if admission is not None:
+                    admission.release()
+
+            if not await write_response(writer, response, executor) or not req.keep_alive:
+                break
+    except ConnectionError:
+        pass
+    except asyncio.CancelledError:
+        # An executor thread may still be using the adapter
+        daemon = None
+    except Exception as e:
+        print("[AsyncBackend] Error handling client {}: {}".format(addr, e))
+        daemon = None
+    finally:
+        writer.close()
+        if daemon is not None and adapters is not None and len(adapters) < MAX_IDLE_ADAPTERS:
+            daemon.reset()
+            adapters.append(daemon)
+
+
+async def serve(ip, port, routes, executor, listener=None, drain_timeout=DRAIN_TIMEOUT, **options):
+    """
+    Start the asyncio server and serve until SIGINT or SIGTERM, then drain.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param executor (Executor): executor running the synchronous handlers.
+    :param listener (socket.socket): already listening socket, or None to bind one.
+    :param drain_timeout (float): seconds given to open connections once stopped.
+    :param options: ``keepalive_timeout``, ``max_requests``, ``admission`` and
+                    ``config`` of :func:`handle_client`.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Not the main thread: KeyboardInterrupt stops the server abruptly.
+            pass
+
+    drain = Drain(drain_timeout)
+    clients = set()
+    adapters = []
+
+    async def on_connect(reader, writer):
+        task = asyncio.current_task()
+        clients.add(task)
+        drain.add()
+        try:
+            await handle_client(ip, port, reader, writer, routes, executor, drain=drain,
+                                adapters=adapters, **options)
+        finally:
+            clients.discard(task)
+            drain.remove(writer.get_extra_info("socket"))
+
+    if listener is None:
+        listener = create_listener(ip, port)
+    server = await asyncio.start_server(on_connect, sock=listener)
+    print("[AsyncBackend] Listening on port {}".format(port))
+    if routes != {}:
+        print("[AsyncBackend] Route settings {}".format(routes))
+
+    await stop.wait()
+    print("\n[AsyncBackend] Shutting down, draining {} connections...".format(len(clients)))
+    server.close()
+    drain.start()
+    if clients:
+        _, pending = await asyncio.wait(set(clients), timeout=drain_timeout)
+        if pending:
+            print("[AsyncBackend] Drain deadline reached, closing {} connections".format(len(pending)))
+
+
+def run_async_backend(ip, port, routes, executor_workers=32,
+                      keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX_REQUESTS,
+                      listener=None, admission=None, drain_timeout=DRAIN_TIMEOUT, config=None):
+    """
+    Starts the asyncio backend server and blocks until it is interrupted.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param executor_workers (int): Number of threads running synchronous handlers.
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+    :param max_requests (int): maximum number of requests served per connection.
+    :param listener (socket.socket): already listening socket to serve, e.g. one
+                                     shared by worker processes. Defaults to binding
+                                     a new one.
+    :param admission (AdmissionController): sheds requests over its thresholds, or
+                                            None to serve everything. The time spent
+                                            waiting for an executor thread counts as
+                                            queue wait.
+    :param drain_timeout (float): seconds given to open connections once interrupted.
+    :param config (AppConfig): settings of the app serving the routes, or None.
+    """
+    executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="AsyncBackend")
+    try:
+        asyncio.run(serve(ip, port, routes, executor, listener=listener,
+                          keepalive_timeout=keepalive_timeout, max_requests=max_requests,
+                          admission=admission, drain_timeout=drain_timeout, config=config))
+    except OSError as e:
+        print("[AsyncBackend] Socket error: {}".format(e))
+    except KeyboardInterrupt:
+        print("\n[AsyncBackend] Shutting down...")
+    finally:
+        executor.shutdown(wait=False)
+        if admission is not None:
+            print("[AsyncBackend] Admission stats {}".format(admission.stats()))
+        print("[AsyncBackend] Server closed")
@@ -25,56 +25,150 @@ Requirements:
 - threading: Enables concurrent client handling via threads.
 - response: response utilities.
 - httpadapter: the class for handling HTTP requests.
-- CaseInsensitiveDict: provides dictionary for managing headers or routes.
+- workerpool: bounded pool of handler threads.
+- parking: selector thread holding the idle connections of the "pool" engine.
+- asyncbackend: the asyncio engine.
+- reactor: the selectors based non-blocking engine.
+- prefork: runs an engine in several worker processes.
+- admission: sheds requests when the backend falls behind.
+- lifecycle: graceful drain and listening socket hand-off.
 
 
 Notes:
 ------
 - The server create daemon threads for client handling.
+- Engines: "thread" spawns one thread per connection, "pool" serves connections
+  from a bounded :class:`WorkerPool <WorkerPool>` (fixed size, queue depth and
+  overflow policy) and parks them between requests (see :mod:`daemon.parking`),
+  "asyncio" serves every connection from one event loop (see
+  :mod:`daemon.asyncbackend`), "reactor" multiplexes every connection in one
+  thread with :mod:`selectors` and runs handlers in a small pool (see
+  :mod:`daemon.reactor`).
+- ``workers=N`` runs N pre-forked processes of the chosen engine sharing the
+  port (see :mod:`daemon.prefork`).
+- ``admission=AdmissionController(...)`` answers requests over the in-flight or
+  queue wait thresholds with a pre-encoded 503 (see :mod:`daemon.admission`).
+- SIGINT/SIGTERM drain the backend: it stops accepting, lets in-flight requests
+  finish within ``drain_timeout`` seconds and runs the ``on_shutdown`` hooks.
+  SIGUSR2 first hands the listening socket to a new process running the same
+  command (see :mod:`daemon.lifecycle`).
 - The current implementation error handling is minimal, socket errors are printed to the console.
 - The actual request processing is delegated to the HttpAdapter class.
 
 Usage Example:
 --------------
 >>> create_backend("127.0.0.1", 9000, routes={})
+>>> create_backend("127.0.0.1", 9000, routes={}, engine="pool", pool_size=32)
+>>> create_backend("0.0.0.0", 9000, routes={}, engine="reactor", workers=4)
 
 """
 
 import socket
 import threading
-import argparse
+import time
 
 from .response import *
-from .httpadapter import HttpAdapter
-from .dictionary import CaseInsensitiveDict
+from .httpadapter import HttpAdapter, worker_adapter, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS
+from .workerpool import WorkerPool
+from .parking import ConnectionParking
+from .listener import create_listener, inherited_listener
+from .lifecycle import Drain, DRAIN_TIMEOUT, install_signal_handlers
+from .prefork import run_prefork
+from .asyncbackend import run_async_backend
+from .reactor import run_reactor_backend
+from .router import Router
+from .offload import shutdown as shutdown_offload
 
-def handle_client(ip, port, conn, addr, routes):
+#: Names of the serving engines accepted by :func:`create_backend`.
+ENGINES = ("thread", "pool", "asyncio", "reactor")
+
+def handle_client(ip, port, conn, addr, routes,
+                  keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX_REQUESTS,
+                  admission=None, accepted_at=None, drain=None, parking=None, served=0, config=None):
     """
-    Initializes an HttpAdapter instance and delegates the client handling logic to it.
+    Delegates the client handling logic to the HttpAdapter of the calling thread,
+    reused from one connection to the next by pool workers.
 
     :param ip (str): IP address of the server.
     :param port (int): Port number the server is listening on.
     :param conn (socket.socket): Client connection socket.
     :param addr (tuple): client address (IP, port).
     :param routes (dict): Dictionary of route handlers.
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+    :param max_requests (int): maximum number of requests served per connection.
+    :param admission (AdmissionController): admission control of the backend, or None.
+    :param accepted_at (float): ``time.monotonic()`` of the accept.
+    :param drain (Drain): open connections book-keeping of the backend, already
+                          counting this connection, or None.
+    :param parking (ConnectionParking): parking taking over the connection while
+                                        it is idle, or None to keep it in this thread.
+    :param served (int): requests already served on a connection taken back from
+                         the parking.
+    :param config (AppConfig): settings of the app serving the routes, or None.
     """
+    parked = False
     try:
         print("[Backend] Handling client from {}:{}".format(addr[0], addr[1]))
-        daemon = HttpAdapter(ip, port, conn, addr, routes)
+        daemon = worker_adapter(ip, port, routes,
+                                keepalive_timeout=keepalive_timeout, max_requests=max_requests,
+                                admission=admission, drain=drain, config=config)
 
         # Handle client request
-        daemon.handle_client(conn, addr, routes)
+        parked = daemon.handle_client(conn, addr, routes, queued_at=accepted_at,
+                                      park=parking.park if parking is not None else None,
+                                      served=served)
     except Exception as e:
         print("[Backend] Error handling client {}: {}".format(addr, e))
     finally:
-        # Ensure connection is closed
-        try:
-            conn.close()
-        except:
-            pass
+        if not parked:
+            # Ensure connection is closed
+            try:
+                conn.close()
+            except:
+                pass
+            if drain is not None:
+                drain.remove(conn)
+
+
+def refuse_client(conn, reply=None):
+    """
+    Turns away a client the backend has no capacity for, optionally answering it
+    first with a pre-encoded reply.
 
+    The pending request bytes are drained before closing so the kernel does not
+    reset the connection and discard the reply.
+
+    :param conn (socket.socket): Client connection socket.
+    :param reply (bytes): Encoded HTTP response, or None to close silently.
+    """
+    try:
+        if reply:
+            conn.settimeout(0.05)
+            try:
+                conn.recv(65536)
+            except socket.timeout:
+                pass
+            conn.sendall(reply)
+            conn.shutdown(socket.SHUT_WR)
+    except socket.error:
+        pass
+    finally:
+        conn.close()
+
+def drain_backend(drain):
+    """
+    Lets the connections of a stopped backend finish within the drain deadline.
+
+    :param drain (Drain): open connections book-keeping of the backend.
+    """
+    drain.start()
+    left = drain.wait()
+    if left:
+        print("[Backend] Drain deadline reached, closing {} connections".format(left))
 
-def run_backend(ip, port, routes):
+def run_backend(ip, port, routes,
+                keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX_REQUESTS, listener=None,
+                admission=None, drain_timeout=DRAIN_TIMEOUT, config=None):
     """
     Starts the backend server, binds to the specified IP and port, and listens for incoming
     connections. Each connection is handled in a separate thread. The backend accepts incoming
@@ -84,12 +178,22 @@ def run_backend(ip, port, routes):
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
     :param routes (dict): Dictionary of route handlers.
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+    :param max_requests (int): maximum number of requests served per connection.
+    :param listener (socket.socket): already listening socket to serve, e.g. one
+                                     shared by worker processes. Defaults to binding
+                                     a new one.
+    :param admission (AdmissionController): sheds connections and requests over its
+                                            thresholds, or None to serve everything.
+    :param drain_timeout (float): seconds given to open connections once interrupted.
+    :param config (AppConfig): settings of the app serving the routes, or None.
     """
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    drain = Drain(drain_timeout)
+    server = listener
 
     try:
-        server.bind((ip, port))
-        server.listen(50)
+        if server is None:
+            server = create_listener(ip, port)
         print("[Backend] Listening on port {}".format(port))
         if routes != {}:
             print("[Backend] Route settings {}".format(routes))
@@ -97,25 +201,195 @@ def run_backend(ip, port, routes):
         while True:
             # Accept incoming connection
             conn, addr = server.accept()
-            t = threading.Thread(target=handle_client, args=(ip, port, conn, addr, routes), daemon=True)
+            if admission is not None and admission.overloaded():
+                print("[Backend] Overloaded, refusing client {}".format(addr))
+                refuse_client(conn, admission.reply)
+                continue
+            drain.add()
+            t = threading.Thread(target=handle_client,
+                                 args=(ip, port, conn, addr, routes, keepalive_timeout, max_requests,
+                                       admission, time.monotonic(), drain, None, 0, config),
+                                 daemon=True)
             t.start()
             print("[Backend] Started thread for client {}".format(addr))
             
     except socket.error as e:
       print("[Backend] Socket error: {}".format(e))
     except KeyboardInterrupt:
-        print("\n[Backend] Shutting down...")
+        print("\n[Backend] Shutting down, draining connections...")
+    finally:
+        if server is not None:
+            server.close()
+        drain_backend(drain)
+        if admission is not None:
+            print("[Backend] Admission stats {}".format(admission.stats()))
+        print("[Backend] Server closed")
+
+def run_pool_backend(ip, port, routes, pool_size=16, queue_size=256, overflow="reject",
+                     keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX_REQUESTS,
+                     listener=None, admission=None, drain_timeout=DRAIN_TIMEOUT, config=None):
+    """
+    Starts the backend server like :func:`run_backend`, but hands every accepted
+    connection to a bounded :class:`WorkerPool <WorkerPool>` instead of a new thread.
+
+    When the pool queue is full the connection is handled according to the overflow
+    policy: "block" stops accepting until a slot frees up (clients wait in the listen
+    backlog), "reject" answers ``503 Service Unavailable`` and "drop" closes it.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param pool_size (int): Number of worker threads.
+    :param queue_size (int): Maximum number of accepted connections waiting for a worker.
+    :param overflow (str): Overflow policy, one of "block", "reject" or "drop".
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+                                      An idle persistent connection is parked (see
+                                      :mod:`daemon.parking`) and holds no worker.
+    :param max_requests (int): maximum number of requests served per connection.
+    :param listener (socket.socket): already listening socket to serve, e.g. one
+                                     shared by worker processes. Defaults to binding
+                                     a new one.
+    :param admission (AdmissionController): sheds connections and requests over its
+                                            thresholds, or None to serve everything.
+                                            The time spent in the pool queue counts
+                                            as queue wait.
+    :param drain_timeout (float): seconds given to open and queued connections once
+                                  interrupted.
+    :param config (AppConfig): settings of the app serving the routes, or None.
+    """
+    pool = WorkerPool(size=pool_size, queue_size=queue_size, overflow=overflow, name="Backend")
+    drain = Drain(drain_timeout)
+    busy_reply = Response().build_unavailable()
+    server = listener
+
+    def resume(conn, addr, served):
+        # A parked connection sent its next request
+        if not pool.submit(handle_client, ip, port, conn, addr, routes, keepalive_timeout, max_requests,
+                           admission, time.monotonic(), drain, parking, served, config):
+            print("[Backend] Worker pool full, refusing client {}".format(addr))
+            refuse_client(conn, busy_reply if overflow == "reject" else None)
+            drain.remove(conn)
+
+    parking = ConnectionParking(resume, keepalive_timeout, drain)
+
+    try:
+        if server is None:
+            server = create_listener(ip, port)
+        pool.start()
+        parking.start()
+        print("[Backend] Listening on port {} with {} workers (queue {}, overflow {})".format(
+            port, pool_size, queue_size, overflow))
+        if routes != {}:
+            print("[Backend] Route settings {}".format(routes))
+
+        while True:
+            # Accept incoming connection
+            conn, addr = server.accept()
+            if admission is not None and admission.overloaded():
+                print("[Backend] Overloaded, refusing client {}".format(addr))
+                refuse_client(conn, admission.reply)
+                continue
+            drain.add()
+            if pool.submit(handle_client, ip, port, conn, addr, routes, keepalive_timeout, max_requests,
+                           admission, time.monotonic(), drain, parking, 0, config):
+                continue
+            drain.remove(conn)
+            print("[Backend] Worker pool full, refusing client {}".format(addr))
+            refuse_client(conn, busy_reply if overflow == "reject" else None)
+
+    except socket.error as e:
+      print("[Backend] Socket error: {}".format(e))
+    except KeyboardInterrupt:
+        print("\n[Backend] Shutting down, draining connections...")
     finally:
-        server.close()
+        if server is not None:
+            server.close()
+        drain_backend(drain)
+        parking.shutdown()
+        print("[Backend] Worker pool stats {}".format(pool.stats()))
+        if admission is not None:
+            print("[Backend] Admission stats {}".format(admission.stats()))
+        pool.shutdown(wait=False)
         print("[Backend] Server closed")
 
-def create_backend(ip, port, routes={}):
+def run_engine(ip, port, routes, engine, on_shutdown=(), **options):
+    """
+    Runs one serving engine in the current process until it is interrupted and
+    drained, then calls the shutdown hooks.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param engine (str): Serving engine, one of ``ENGINES``.
+    :param on_shutdown (list): callables run once the engine stopped, e.g. to
+                               flush persistence.
+    :param options: Engine settings, see :func:`create_backend`.
+    """
+
+    try:
+        if engine == "thread":
+            run_backend(ip, port, routes, **options)
+        elif engine == "pool":
+            run_pool_backend(ip, port, routes, **options)
+        elif engine == "asyncio":
+            run_async_backend(ip, port, routes, **options)
+        elif engine == "reactor":
+            run_reactor_backend(ip, port, routes, **options)
+    finally:
+        shutdown_offload()
+        for hook in on_shutdown:
+            try:
+                hook()
+            except Exception as e:
+                print("[Backend] Error in shutdown hook {}: {}".format(hook, e))
+
+def create_backend(ip, port, routes={}, engine="thread", workers=1, on_shutdown=(), **options):
     """
     Entry point for creating and running the backend server.
 
+    The listening socket is inherited from the predecessor process when the
+    backend was started by a hand-off (see :mod:`daemon.lifecycle`).
+
     :param ip (str): IP address to bind the server.
     :param port (int): Port number to listen on.
-    :param routes (dict, optional): Dictionary of route handlers. Defaults to empty dict.
+    :param routes (dict, optional): Dictionary of route handlers, compiled into a
+                                    :class:`Router <Router>` unless it is one.
+                                    Defaults to empty dict.
+    :param engine (str, optional): Serving engine, one of ``ENGINES``. Defaults to "thread".
+    :param workers (int, optional): Number of pre-forked worker processes sharing the
+                                    port. Defaults to 1, serving in this process.
+    :param on_shutdown (list, optional): callables run by every serving process once
+                                         it is drained, e.g. to flush persistence.
+    :param options: Engine settings: ``keepalive_timeout``, ``max_requests``,
+                    ``drain_timeout``, ``admission`` (an
+                    :class:`AdmissionController <AdmissionController>`) and
+                    ``config`` (the :class:`AppConfig <AppConfig>` of the app)
+                    for every engine, plus e.g. ``pool_size``, ``queue_size`` and
+                    ``overflow`` for the "pool" engine, ``executor_workers`` for
+                    the "asyncio" engine, ``handler_threads`` and ``queue_size``
+                    for the "reactor" engine.
+
+    :raises ValueError: If the engine is unknown.
     """
 
-    run_backend(ip, port, routes)
\ No newline at end of file
+    if engine not in ENGINES:
+        raise ValueError("Invalid backend engine {}, expected one of {}".format(engine, ENGINES))
+    if not isinstance(routes, Router):
+        routes = Router(routes)
+
+    listener = inherited_listener()
+    if workers > 1:
+        run_prefork(ip, port, workers,
+                    lambda listener: run_engine(ip, port, routes, engine, on_shutdown,
+                                                listener=listener, **options),
+                    listener=listener)
+        return
+
+    try:
+        if listener is None:
+            listener = create_listener(ip, port)
+    except OSError as e:
+        print("[Backend] Socket error: {}".format(e))
+        return
+    install_signal_handlers(listener)
+    run_engine(ip, port, routes, engine, on_shutdown, listener=listener, **options)
@@ -0,0 +1,193 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.bodystream
+~~~~~~~~~~~~~~~~~
+
+This module provides a :class:`RequestBody <RequestBody>` object, the request
+body given to the route handlers registered with ``stream=True``.
+
+Instead of being buffered whole in memory and decoded to ``str``, the body of
+such a request is written to a spooled file as it is received: it stays in
+memory up to ``spool_size`` bytes and spills to a temporary file past that. The
+handler receives it once complete, rewound, as a read-only file-like object.
+Bodies larger than ``max_size`` are refused with ``413 Payload Too Large``.
+
+Usage Example:
+--------------
+>>> @app.route('/upload', methods=['POST'], stream=True, max_body_size=512 * 1024 * 1024)
+>>> def upload(headers, body):
+>>>     for line in body:              # lines, like a file
+>>>         ...
+>>>     return {"size": body.size}
+
+>>> @app.route('/upload-async', methods=['POST'], stream=True)
+>>> async def upload_async(headers, body):
+>>>     async for chunk in body:       # chunks of CHUNK_SIZE bytes
+>>>         ...
+"""
+
+import tempfile
+
+from .framing import FramingError
+from .request import Request
+from .router import match_route
+
+#: Default largest streamed body, in bytes.
+MAX_STREAM_SIZE = 256 * 1024 * 1024
+#: Default size past which a streamed body spills from memory to a temporary file.
+SPOOL_SIZE = 1024 * 1024
+#: Bytes per chunk when iterating over a body by chunks.
+CHUNK_SIZE = 65536
+
+
+class RequestBody:
+    """
+    Request body streamed to a spooled file.
+
+    Attributes:
+        max_size (int): largest accepted body, None for no limit.
+        spool_size (int): size past which the body is kept in a temporary file.
+        size (int): number of body bytes received so far.
+    """
+
+    __attrs__ = [
+        "max_size",
+        "spool_size",
+        "size",
+    ]
+
+    def __init__(self, max_size=MAX_STREAM_SIZE, spool_size=SPOOL_SIZE):
+        """
+        Initialize a new, empty RequestBody instance.
+
+        :param max_size (int): largest accepted body, in bytes, None for no limit.
+        :param spool_size (int): size past which the body spills to disk, in bytes.
+        """
+        #: Body size limit
+        self.max_size = max_size
+        #: Spill threshold
+        self.spool_size = spool_size
+        #: Bytes received
+        self.size = 0
+
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+
+    def write(self, data):
+        """
+        Append received body bytes. Called by the framer while reading.
+
+        :param data (bytes): body bytes.
+
+        :raises FramingError: If the body grows past ``max_size``.
+        """
+        self.size += len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            raise FramingError(413, "Request body too large")
+        self._file.write(data)
+
+    def finish(self):
+        """
+        Mark the body as complete and rewind it for the handler.
+        """
+        self._file.seek(0)
+
+    @property
+    def spilled(self):
+        """Whether the body was moved from memory to a temporary file."""
+        return self._file._rolled
+
+    def read(self, size=-1):
+        """
+        Read up to ``size`` bytes, all the rest by default.
+
+        :rtype bytes: the bytes read, b"" at the end of the body.
+        """
+        return self._file.read(size)
+
+    def readinto(self, buf):
+        """
+        Read body bytes into a writable buffer.
+
+        :rtype int: number of bytes read, 0 at the end of the body.
+        """
+        return self._file.readinto(buf)
+
+    def readline(self, size=-1):
+        """
+        Read one line, including its trailing newline.
+
+        :rtype bytes: the line, b"" at the end of the body.
+        """
+        return self._file.readline(size)
+
+    def chunks(self, size=CHUNK_SIZE):
+        """
+        Iterate over the rest of the body by chunks.
+
+        :param size (int): largest chunk, in bytes.
+        """
+        while True:
+            chunk = self._file.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def __iter__(self):
+        return iter(self._file)
+
+    async def __aiter__(self):
+        for chunk in self.chunks():
+            yield chunk
+
+    def close(self):
+        """
+        Release the memory or temporary file holding the body.
+        """
+        self._file.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return "<RequestBody {} bytes{}>".format(self.size, ", spilled" if self.spilled else "")
+
+
+def body_sink(routes):
+    """
+    Build the ``body_sink`` callback of a :class:`RequestFramer <RequestFramer>`
+    for a route mapping: the body of a request matching a route registered with
+    ``stream=True`` goes to a new :class:`RequestBody <RequestBody>`.
+
+    :param routes (Router): route handlers by (method, path).
+
+    :rtype callable: ``sink(message)`` returning a RequestBody or None, or None
+                     when no route streams its body.
+    """
+    if not routes or not any(getattr(hook, '_route_stream', False) for hook in routes.values()):
+        return None
+
+    def sink(message):
+        path = Request.prepare_path(message.target.partition('?')[0])
+        hook = match_route(routes, message.method, path)[0]
+        if hook is None or not getattr(hook, '_route_stream', False):
+            return None
+        return RequestBody(max_size=hook._route_max_body_size, spool_size=hook._route_spool_size)
+    return sink
@@ -0,0 +1,279 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.cache
+~~~~~~~~~~~~~~~~~
+
+This module provides a :class:`ResponseCache <ResponseCache>` object, the cache
+of encoded route responses of a WeApRous app, and the :class:`CachePolicy
+<CachePolicy>` set on a route handler by ``@app.cache``.
+
+The body of a cached response is kept encoded, so a hit skips both the route
+handler and the JSON encoding; only the response header is built again, since it
+depends on the request (``Connection``, CORS origin, date).
+
+Entries expire after the ``ttl`` of their route and the least recently used ones
+are evicted past ``max_entries`` entries or ``max_bytes`` bytes. An entry can
+carry tags, e.g. ``channel:general``: invalidating a tag bumps its version, which
+makes every entry filled under the previous version stale in O(1). Versions are
+only kept for the tags of cached entries; the others share a floor version,
+raised whenever a tag is forgotten, so a fill started before an invalidation is
+still dropped.
+
+Only GET requests are cached, and only results that are not streamed nor an
+error (``{"status": "error", ...}``). The cache stands in for the route handler
+inside the middleware of the app: a hit is only answered once the
+``before_request`` checks (e.g. authentication) let the request through, and the
+result of the handler is cached, not what ``after_request`` middleware make of
+it, which still run on every hit. With several worker processes each one has its
+own cache, invalidated by the writes it serves.
+
+Usage Example:
+--------------
+>>> @app.route('/channels/<channel>/messages', methods=['GET'])
+>>> @app.cache(ttl=5, tags=["channel:{channel}"])
+>>> def get_messages(headers, body, channel):
+>>>     ...
+
+>>> app.invalidate("channel:general")   # in the handler posting to the channel
+>>> app.response_cache.stats()
+{'hits': 120, 'misses': 4, 'hit_rate': 0.967, ...}
+"""
+
+import collections
+import threading
+import time
+
+#: Default largest number of cached responses.
+CACHE_ENTRIES = 1024
+#: Default largest total size of the cached bodies, in bytes.
+CACHE_BYTES = 64 * 1024 * 1024
+#: Methods whose responses are cached.
+CACHED_METHODS = ("GET",)
+
+
+def default_key(req):
+    """Cache key of a request: its path and query string."""
+    return (req.path, req.query_string)
+
+
+class CachePolicy:
+    """
+    Caching settings of one route handler, set by ``@app.cache``.
+
+    Attributes:
+        ttl (float): seconds a response stays valid.
+        key (callable): ``key(request)`` returning the hashable cache key.
+        tags (callable): ``tags(request)`` returning the invalidation tags.
+    """
+
+    __slots__ = ("ttl", "key", "tags")
+
+    def __init__(self, ttl, key=None, tags=()):
+        """
+        Initialize a new CachePolicy instance.
+
+        :param ttl (float): seconds a response stays valid.
+        :param key (callable): ``key(request)`` returning a hashable cache key.
+                               Defaults to the path and query string.
+        :param tags (list): tags of the entries, as templates formatted with the
+                            path parameters (e.g. ``"channel:{channel}"``), or a
+                            callable ``tags(request)`` returning them.
+        """
+        self.ttl = ttl
+        self.key = key or default_key
+        if callable(tags):
+            self.tags = tags
+        else:
+            templates = tuple(tags)
+            self.tags = lambda req: [tag.format(**(req.path_params or {})) for tag in templates]
+
+
+class CacheEntry:
+    """
+    One cached response.
+
+    Attributes:
+        body (bytes): the encoded body.
+        content_type (str): its ``Content-Type``.
+        status_code (int): the HTTP status.
+        expires (float): ``time.monotonic()`` past which it is stale.
+        versions (tuple): (tag, version) of its tags when it was filled.
+        etag (str): the ``ETag`` of the body, or None.
+        variants (dict): the body compressed by encoding, filled on demand.
+    """
+
+    __slots__ = ("body", "content_type", "status_code", "expires", "versions", "etag", "variants")
+
+    def __init__(self, body, content_type, status_code, expires, versions, etag=None):
+        self.body = body
+        self.content_type = content_type
+        self.status_code = status_code
+        self.expires = expires
+        self.versions = versions
+        self.etag = etag
+        self.variants = {}
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of encoded route responses, safe to share between threads.
+
+    Attributes:
+        max_entries (int): largest number of entries.
+        max_bytes (int): largest total size of the bodies, in bytes.
+    """
+
+    __attrs__ = [
+        "max_entries",
+        "max_bytes",
+    ]
+
+    def __init__(self, max_entries=CACHE_ENTRIES, max_bytes=CACHE_BYTES):
+        """
+        Initialize a new, empty ResponseCache instance.
+
+        :param max_entries (int): largest number of entries.
+        :param max_bytes (int): largest total size of the bodies, in bytes.
+        """
+        #: Entry limit
+        self.max_entries = max_entries
+        #: Size limit
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._versions = {}
+        self._tag_entries = {}
+        self._clock = 0
+        self._floor = 0
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def versions(self, tags):
+        """
+        Current versions of tags, to be stored with an entry filled from now on.
+
+        :param tags (list): the tags.
+
+        :rtype tuple: (tag, version) pairs.
+        """
+        versions, floor = self._versions, self._floor
+        return tuple((tag, versions.get(tag, floor)) for tag in tags)
+
+    def get(self, key):
+        """
+        Look up a fresh entry, counting a hit or a miss.
+
+        :param key: the cache key.
+
+        :rtype CacheEntry: the entry, or None if missing, expired or invalidated.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                versions = self._versions
+                if entry.expires > time.monotonic() and all(
+                        versions[tag] == version for tag, version in entry.versions):
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry
+                self._remove(key)
+            self._misses += 1
+            return None
+
+    def put(self, key, entry):
+        """
+        Store an entry, evicting the least recently used ones over the limits.
+        An entry whose tags were invalidated since its versions were taken is
+        dropped.
+
+        :param key: the cache key.
+        :param entry (CacheEntry): the response.
+        """
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            versions, floor = self._versions, self._floor
+            if any(versions.get(tag, floor) != version for tag, version in entry.versions):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            tag_entries = self._tag_entries
+            for tag, version in entry.versions:
+                versions[tag] = version
+                tag_entries[tag] = tag_entries.get(tag, 0) + 1
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, *tags):
+        """
+        Make every entry carrying one of the tags stale.
+
+        :param tags (str): the tags, e.g. ``"channel:general"``.
+        """
+        with self._lock:
+            self._clock += 1
+            for tag in tags:
+                if tag in self._versions:
+                    self._versions[tag] = self._clock
+                else:
+                    # No cached entry: only fills in flight hold its version
+                    self._floor = self._clock
+
+    def clear(self):
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._floor = self._clock
+            self._versions.clear()
+            self._tag_entries.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._size -= len(entry.body)
+        tag_entries = self._tag_entries
+        for tag, _ in entry.versions:
+            tag_entries[tag] -= 1
+            if not tag_entries[tag]:
+                # Forgotten: its last version must not match a fill in flight
+                self._floor = self._clock
+                del tag_entries[tag]
+                del self._versions[tag]
+
+    def stats(self):
+        """
+        Hit and miss counts of the cache so far.
+
+        :rtype dict: hits, misses, hit_rate, entries, bytes, evictions and the
+                     number of tags with a version.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "evictions": self._evictions,
+                "tags": len(self._versions),
+            }
@@ -0,0 +1,169 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.codec
+~~~~~~~~~~~~~~~~~
+
+This module is the JSON codec of the daemon package. It decodes request bodies
+(``request.json``) and encodes route results, with ``orjson`` when that optional
+package is installed, else with the standard :mod:`json` module. ``orjson``
+encodes straight to UTF-8 bytes: it builds no intermediate ``str`` to encode again.
+A value it cannot encode, e.g. a dict with non-string keys, falls back to
+:mod:`json`.
+
+A route result holding a list of at least ``STREAM_MIN_ITEMS`` items, e.g. a
+channel history, is not encoded as a whole. :func:`iterencode` encodes it in
+chunks of about ``STREAM_CHUNK_SIZE`` bytes, sent as a chunked response while
+the rest is encoded. Memory use then does not grow with the payload. Such a
+response has no ``ETag`` and is not compressed; a route registered with
+``@app.cache`` is still encoded whole, to be cached. The first chunk is encoded
+before the response header is sent, so a result failing there is still answered
+``500``; a failure further on can only cut the chunked body short, without its
+last chunk, which clients report as a truncated response.
+
+Usage Example:
+--------------
+>>> dumps({"status": "success"})
+b'{"status":"success"}'
+>>> loads(b"".join(iterencode({"messages": messages}))) == {"messages": messages}
+True
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+#: Name of the codec in use.
+BACKEND = "orjson" if orjson is not None else "json"
+#: Smallest list of a route result encoded incrementally, in items.
+STREAM_MIN_ITEMS = 10000
+#: Size of the chunks of an incrementally encoded body, in bytes.
+STREAM_CHUNK_SIZE = 64 * 1024
+#: Items of a list encoded by one call of the codec.
+STREAM_BATCH = 256
+#: Separators between items and after keys, as the codec in use writes them.
+ITEM_SEPARATOR, KEY_SEPARATOR = (b",", b":") if orjson is not None else (b", ", b": ")
+
+
+def std_dumps(obj):
+    """Encode a value with the standard :mod:`json` module."""
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def dumps(obj):
+    """
+    Encode a value as JSON.
+
+    :param obj: a JSON-serializable value.
+
+    :rtype bytes: the UTF-8 encoded JSON.
+
+    :raises TypeError: If the value is not JSON-serializable.
+    :raises ValueError: If it holds a circular reference.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # e.g. non-str dict keys or integers past 64 bits
+            pass
+    return std_dumps(obj)
+
+
+def loads(data):
+    """
+    Decode JSON.
+
+    :param data (bytes | str): the encoded JSON.
+
+    :rtype object: the decoded value.
+
+    :raises ValueError: If the data is not valid JSON.
+    :raises UnicodeDecodeError: If the bytes are not valid UTF-8.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def is_large(obj, min_items=STREAM_MIN_ITEMS):
+    """
+    Tell whether a route result is worth encoding incrementally: a list, or a
+    dict holding a list, of at least ``min_items`` items.
+
+    :param obj: the route result.
+    :param min_items (int): the threshold, None to never encode incrementally.
+
+    :rtype bool: True to use :func:`iterencode`.
+    """
+    if min_items is None:
+        return False
+    if isinstance(obj, dict):
+        return any(isinstance(value, (list, tuple)) and len(value) >= min_items
+                   for value in obj.values())
+    return isinstance(obj, (list, tuple)) and len(obj) >= min_items
+
+
+def iter_pieces(obj):
+    """
+    Encode a value piece by piece: dicts key by key, lists by batches of
+    ``STREAM_BATCH`` items, each encoded by one call of :func:`dumps`.
+    """
+    if isinstance(obj, dict) and all(isinstance(key, str) for key in obj):
+        yield b"{"
+        separator = b""
+        for key, value in obj.items():
+            yield separator + dumps(key) + KEY_SEPARATOR
+            yield from iter_pieces(value)
+            separator = ITEM_SEPARATOR
+        yield b"}"
+    elif isinstance(obj, (list, tuple)) and len(obj) > STREAM_BATCH:
+        yield b"["
+        for start in range(0, len(obj), STREAM_BATCH):
+            batch = dumps(obj[start:start + STREAM_BATCH])
+            yield (ITEM_SEPARATOR if start else b"") + batch[1:-1]
+        yield b"]"
+    else:
+        yield dumps(obj)
+
+
+def iterencode(obj, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Encode a value as JSON incrementally.
+
+    :param obj: a JSON-serializable value.
+    :param chunk_size (int): approximate size of the chunks, in bytes.
+
+    :rtype iterator: the encoded JSON, as bytes chunks of about ``chunk_size``
+                     bytes. They decode to the same value as :func:`dumps`
+                     output, but may differ from it in separators: pieces the
+                     codec cannot encode, e.g. dicts with non-string keys, fall
+                     back to :mod:`json` on their own.
+
+    :raises TypeError: If the value is not JSON-serializable, once its chunk is
+                       encoded.
+    """
+    buffer = []
+    size = 0
+    for piece in iter_pieces(obj):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
@@ -0,0 +1,153 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.compression
+~~~~~~~~~~~~~~~~~
+
+This module compresses response bodies for the clients that accept it, with
+``gzip``, and ``br`` when the optional ``brotli`` package is installed.
+
+- Static files are compressed once, at the highest level, when the file cache
+  reads them from disk (on their first request, then whenever they change). A
+  request costs the choice of the variant.
+- JSON route results are compressed per response, at a fast level, and only
+  from ``COMPRESS_MIN_SIZE`` bytes: below that, the CPU spent outweighs the
+  bytes saved. A cached route result keeps its compressed variants.
+
+The encoding is negotiated from the ``Accept-Encoding`` request header, ``br``
+first, and the response carries ``Vary: Accept-Encoding``. A compressed variant
+gets its own ``ETag``, the tag of the content suffixed with the encoding.
+
+Usage Example:
+--------------
+>>> variants = precompress(content, "text/html")
+>>> negotiate("gzip, deflate, br", variants)
+'br'
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+#: Smallest JSON body compressed, in bytes.
+COMPRESS_MIN_SIZE = 1024
+#: Smallest static file compressed, in bytes.
+STATIC_MIN_SIZE = 256
+#: Supported encodings, by order of preference.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+#: Content types worth compressing: text, and media types that are text.
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript",
+                      "application/xml", "image/svg+xml", "image/x-icon")
+#: Compression levels of static files, compressed once, by encoding.
+STATIC_LEVELS = {"br": 11, "gzip": 9}
+#: Compression levels of dynamic responses, by encoding.
+DYNAMIC_LEVELS = {"br": 4, "gzip": 5}
+
+
+def is_compressible(content_type):
+    """
+    Tell whether a content type is worth compressing; images other than SVG
+    and icons, audio and video already are.
+
+    :param content_type (str): the ``Content-Type``, or None.
+
+    :rtype bool: True for text.
+    """
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(data, encoding, levels=DYNAMIC_LEVELS):
+    """
+    Compress a body.
+
+    :param data (bytes): the body.
+    :param encoding (str): one of ``ENCODINGS``.
+    :param levels (dict): compression level by encoding.
+
+    :rtype bytes: the encoded body.
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=levels["br"])
+    # mtime=0: the same content always gives the same bytes
+    return gzip.compress(data, compresslevel=levels["gzip"], mtime=0)
+
+
+def precompress(data, content_type):
+    """
+    Compress a static file in every supported encoding, at the highest level.
+
+    :param data (bytes): the file content.
+    :param content_type (str): its ``Content-Type``, or None.
+
+    :rtype dict: the encoded contents by encoding, only those smaller than the
+                 content; empty when not worth compressing.
+    """
+    if len(data) < STATIC_MIN_SIZE or not is_compressible(content_type):
+        return {}
+    variants = {}
+    for encoding in ENCODINGS:
+        encoded = compress(data, encoding, STATIC_LEVELS)
+        if len(encoded) < len(data):
+            variants[encoding] = encoded
+    return variants
+
+
+def negotiate(accept_encoding, available=ENCODINGS):
+    """
+    Choose the encoding of a response from the ``Accept-Encoding`` request
+    header.
+
+    :param accept_encoding (str): the header value, e.g. ``gzip, br;q=0.9``, or None.
+    :param available (iterable): the encodings the response exists in.
+
+    :rtype str: the accepted encoding with the highest weight, ties broken by
+                ``ENCODINGS`` order, or None for the identity.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    default = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        if encoding not in available:
+            continue
+        weight = weights.get(encoding, default)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def variant_etag(etag, encoding):
+    """
+    ``ETag`` of an encoded variant.
+
+    :param etag (str): the quoted tag of the content.
+    :param encoding (str): the content coding.
+
+    :rtype str: e.g. ``"3f2a9c0d1b7e4a55-gzip"``.
+    """
+    return '{}-{}"'.format(etag[:-1], encoding)
@@ -0,0 +1,200 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.conditional
+~~~~~~~~~~~~~~~~~
+
+This module provides the validators of conditional GET requests and the
+:class:`CacheControl <CacheControl>` table giving the ``Cache-Control`` header of
+a response by request path.
+
+Validators:
+-----------
+- A static file held by the file cache gets a strong ``ETag``, the hash of its
+  content, and a ``Last-Modified`` date. A file sent from disk with ``sendfile``
+  is not read to be hashed: its ``ETag`` is built from its modification time,
+  inode and size.
+- A JSON route result gets the hash of its encoded body, which changes exactly
+  when the state it shows changes. For a route registered with ``@app.cache``
+  the hash is kept with the cached body, so an unchanged poll is answered
+  ``304`` without calling the handler nor hashing again.
+
+A GET request whose ``If-None-Match`` lists the current ``ETag``, or else whose
+``If-Modified-Since`` is not older than ``Last-Modified``, is answered
+``304 Not Modified`` without a body.
+
+Usage Example:
+--------------
+>>> app.cache_control("/images/*", "public, max-age=31536000, immutable")
+>>> app.cache_control("/css/*", "public, max-age=3600")
+"""
+
+import email.utils
+import fnmatch
+import hashlib
+import threading
+
+#: Cache-Control of the responses of paths without a policy: stored, but
+#: revalidated with their ETag before every reuse.
+DEFAULT_CACHE_CONTROL = "no-cache"
+#: Methods whose responses get validators.
+CONDITIONAL_METHODS = ("GET", "HEAD")
+
+
+def make_etag(data):
+    """
+    Strong entity tag of a body.
+
+    :param data (bytes): the body.
+
+    :rtype str: the quoted tag, e.g. ``"3f2a9c0d1b7e4a55"``.
+    """
+    return '"{}"'.format(hashlib.blake2b(data, digest_size=8).hexdigest())
+
+
+def file_etag(st):
+    """
+    Entity tag of a file from its ``os.stat`` result, without reading it.
+
+    :rtype str: the quoted tag.
+    """
+    return '"{:x}-{:x}-{:x}"'.format(st.st_mtime_ns, st.st_ino, st.st_size)
+
+
+def http_date(timestamp):
+    """
+    Format a POSIX timestamp as an HTTP date.
+
+    :rtype str: e.g. ``Tue, 15 Nov 1994 08:12:31 GMT``.
+    """
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def etag_matches(header, etag):
+    """
+    Tell whether an ``If-None-Match`` header lists an entity tag, with the weak
+    comparison of RFC 9110.
+
+    :param header (str): the header value, e.g. ``"abc", W/"def"`` or ``*``.
+    :param etag (str): the current tag.
+
+    :rtype bool: True if the client copy is current.
+    """
+    if header.strip() == "*":
+        return True
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    Evaluate the conditional headers of a request against the validators of
+    its response.
+
+    :param request (Request): the request.
+    :param etag (str): the ``ETag`` of the response, or None.
+    :param last_modified (str): its ``Last-Modified`` date, or None.
+
+    :rtype bool: True if ``304 Not Modified`` is to be answered.
+    """
+    if request.method not in CONDITIONAL_METHODS:
+        return False
+    headers = request.headers
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        # Takes precedence over If-Modified-Since
+        return etag is not None and etag_matches(if_none_match, etag)
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+        modified = email.utils.parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return modified <= since
+
+
+class CacheControl:
+    """
+    ``Cache-Control`` header values by request path pattern.
+
+    Patterns are matched with :mod:`fnmatch` (``*`` also spans ``/``) in
+    registration order; the first match wins. The value of a path is computed
+    once and kept.
+
+    Attributes:
+        policies (list): (pattern, value) of every policy, in registration order.
+        default (str): value of the paths matching no pattern.
+    """
+
+    __attrs__ = [
+        "policies",
+        "default",
+    ]
+
+    def __init__(self, default=DEFAULT_CACHE_CONTROL):
+        """
+        Initialize a new, empty CacheControl instance.
+
+        :param default (str): value of the paths matching no pattern.
+        """
+        #: Policies, in registration order
+        self.policies = []
+        #: Value of the paths matching no pattern
+        self.default = default
+
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def add(self, pattern, value):
+        """
+        Give a ``Cache-Control`` value to the paths matching a pattern.
+
+        :param pattern (str): the path pattern, e.g. ``/images/*``.
+        :param value (str): the header value, e.g. ``public, max-age=86400``.
+        """
+        with self._lock:
+            self.policies.append((pattern, value))
+            self._values.clear()
+
+    def lookup(self, path):
+        """
+        ``Cache-Control`` value of a request path.
+
+        :param path (str): the request path.
+
+        :rtype str: the value of the first matching policy, else the default.
+        """
+        value = self._values.get(path)
+        if value is not None:
+            return value
+        value = self.default
+        for pattern, policy in self.policies:
+            if fnmatch.fnmatchcase(path, pattern):
+                value = policy
+                break
+        with self._lock:
+            if len(self._values) >= 4096:
+                self._values.clear()
+            self._values[path] = value
+        return value
@@ -0,0 +1,90 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.eventloop
+~~~~~~~~~~~~~~~~~
+
+This module runs the ``async def`` route handlers of the threaded engines
+("thread", "pool" and "reactor") on one event loop per process, in a background
+thread started on first use. The "asyncio" engine awaits them on its own loop.
+
+A coroutine handler that waits (a long-poll, a fan-out to peers, an upstream
+call) costs a task on the loop instead of a thread:
+
+- the "reactor" engine gives its handler thread back as soon as the coroutine is
+  scheduled, and writes the response once it is done;
+- the "thread" and "pool" engines serve one connection per thread, so the thread
+  of the connection waits for the result, but the handler runs on the loop with
+  the other coroutine handlers.
+
+Usage Example:
+--------------
+>>> future = submit(handler(headers=headers, body=body))
+>>> future.result()
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+
+_lock = threading.Lock()
+_loop = None
+_pid = None
+
+
+def is_async_handler(func):
+    """
+    Tell whether a route handler is a coroutine function.
+
+    :param func (function): the route handler, or None.
+
+    :rtype bool: True for an ``async def`` handler.
+    """
+    if func is None:
+        return False
+    flag = getattr(func, '_route_async', None)
+    if flag is None:
+        # Handler registered without WeApRous.route
+        flag = inspect.iscoroutinefunction(func)
+    return flag
+
+
+def get_loop():
+    """
+    The event loop running the coroutine handlers of this process, started in a
+    daemon thread on first use. A pre-forked worker starts its own.
+
+    :rtype asyncio.AbstractEventLoop: the running loop.
+    """
+    global _loop, _pid
+    with _lock:
+        if _loop is None or _pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+            loop.call_soon(started.set)
+            threading.Thread(target=loop.run_forever, name="HandlerLoop", daemon=True).start()
+            started.wait()
+            _loop, _pid = loop, os.getpid()
+        return _loop
+
+
+def submit(coro):
+    """
+    Schedule a coroutine on the handler event loop from any other thread.
+
+    :param coro (coroutine): the coroutine, e.g. the call of an async handler.
+
+    :rtype concurrent.futures.Future: its result.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
@@ -0,0 +1,283 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.filecache
+~~~~~~~~~~~~~~~~~
+
+This module provides a :class:`FileCache <FileCache>` object, the in-memory
+cache of the static files and error pages served by :class:`Response
+<Response>`.
+
+A file is read from disk on its first request and kept with its content type,
+length, validators (see :mod:`daemon.conditional`) and compressed variants (see
+:mod:`daemon.compression`), so later requests for it cost a dict lookup. The request path is also
+remembered with the file it resolved to, which skips the MIME type and directory
+resolution of :meth:`Response.build_response`.
+
+Entries are checked against the disk at most once per ``check_interval``
+seconds: a file whose modification time, inode or size changed is read again,
+and a deleted one is dropped. Edits to ``www/`` and ``static/`` are thus served
+within ``check_interval`` seconds without a restart. The least recently used
+entries are evicted past ``max_bytes`` bytes. Files larger than
+``max_file_size`` are not cached: :class:`Response <Response>` sends them
+straight from the disk with ``sendfile``.
+
+Usage Example:
+--------------
+>>> files = FileCache(max_bytes=32 * 1024 * 1024, check_interval=1.0)
+>>> entry = files.get("www/index.html")
+>>> entry.content_type, entry.content_length
+('text/html', '51234')
+>>> files.stats()
+{'hits': 120, 'misses': 3, 'hit_rate': 0.976, ...}
+"""
+
+import collections
+import mimetypes
+import os
+import threading
+import time
+
+from .conditional import make_etag, http_date
+from .compression import precompress
+
+#: Default largest total size of the cached files, in bytes.
+FILE_CACHE_BYTES = 32 * 1024 * 1024
+#: Default largest size of one cached file, in bytes.
+FILE_CACHE_FILE_SIZE = 4 * 1024 * 1024
+#: Default seconds between two checks of a cached file against the disk.
+FILE_CHECK_INTERVAL = 1.0
+
+
+class FileEntry:
+    """
+    One cached file.
+
+    Attributes:
+        content (bytes): the file content.
+        content_type (str): its ``Content-Type``, or None if not known yet.
+        content_length (str): its ``Content-Length`` header value.
+        signature (tuple): modification time, inode and size it was read with.
+        checked (float): ``time.monotonic()`` of its last check against the disk.
+        etag (str): its ``ETag``, the hash of its content.
+        last_modified (str): its ``Last-Modified`` date.
+        variants (dict): its compressed contents by encoding, see
+                         :mod:`daemon.compression`.
+    """
+
+    __slots__ = ("content", "content_type", "content_length", "signature", "checked",
+                 "etag", "last_modified", "variants")
+
+    def __init__(self, content, content_type, signature, checked):
+        self.content = content
+        self.content_type = content_type
+        self.content_length = str(len(content))
+        self.signature = signature
+        self.checked = checked
+        self.etag = make_etag(content)
+        self.last_modified = http_date(signature[0] / 1e9)
+        self.variants = {}
+
+    @property
+    def size(self):
+        """Bytes the entry keeps in memory: its content and compressed variants."""
+        return len(self.content) + sum(len(variant) for variant in self.variants.values())
+
+
+def file_signature(st):
+    """Modification time, inode and size of a ``os.stat`` result."""
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+
+class FileCache:
+    """
+    Bounded LRU cache of file contents, checked against the disk, safe to share
+    between threads.
+
+    Attributes:
+        max_bytes (int): largest total size of the cached files and their
+                         compressed variants, in bytes.
+        max_file_size (int): largest size of one cached file, in bytes.
+        check_interval (float): seconds between two checks of a file against the
+                                disk, 0 to check on every request.
+    """
+
+    __attrs__ = [
+        "max_bytes",
+        "max_file_size",
+        "check_interval",
+    ]
+
+    def __init__(self, max_bytes=FILE_CACHE_BYTES, max_file_size=FILE_CACHE_FILE_SIZE,
+                 check_interval=FILE_CHECK_INTERVAL):
+        """
+        Initialize a new, empty FileCache instance.
+
+        :param max_bytes (int): largest total size of the cached files and
+                                their compressed variants, in bytes.
+        :param max_file_size (int): largest size of one cached file, in bytes.
+        :param check_interval (float): seconds between two checks of a file
+                                       against the disk.
+        """
+        #: Size limit
+        self.max_bytes = max_bytes
+        #: Size limit of one file
+        self.max_file_size = min(max_file_size, max_bytes)
+        #: Freshness check interval
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._paths = {}
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._reloads = 0
+        self._evictions = 0
+
+    def get(self, filepath):
+        """
+        Content of a file, from the cache when it is fresh, else from the disk.
+
+        :param filepath (str): path of the file.
+
+        :rtype FileEntry: the cached file, or None if it is larger than
+                          ``max_file_size``, to be read from disk.
+
+        :raises OSError: If the file cannot be read, e.g. FileNotFoundError.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(filepath)
+            if entry is not None and now - entry.checked < self.check_interval:
+                self._entries.move_to_end(filepath)
+                self._hits += 1
+                return entry
+
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            self.discard(filepath)
+            raise
+        signature = file_signature(st)
+        if st.st_size > self.max_file_size:
+            self.discard(filepath)
+            return None
+        if entry is not None and entry.signature == signature:
+            with self._lock:
+                entry.checked = now
+                self._hits += 1
+            return entry
+
+        with open(filepath, 'rb') as f:
+            content = f.read()
+        fresh = FileEntry(content, entry.content_type if entry is not None else None, signature, now)
+        if len(content) > self.max_file_size:
+            # Grew since the stat: served once, not kept
+            self.discard(filepath)
+            return fresh
+        # Compressed once per change of the file, outside the lock
+        fresh.variants = precompress(content, mimetypes.guess_type(filepath)[0])
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._reloads += 1
+            if filepath in self._entries:
+                self._remove(filepath)
+            self._entries[filepath] = fresh
+            self._size += fresh.size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+        return fresh
+
+    def lookup(self, path):
+        """
+        Cached file a request path was resolved to by :meth:`remember`.
+
+        :param path (str): the request path.
+
+        :rtype FileEntry: the cached file, or None if the path is unknown or
+                          the file changed on disk.
+        """
+        filepath = self._paths.get(path)
+        if filepath is None:
+            return None
+        try:
+            entry = self.get(filepath)
+        except OSError:
+            return None
+        if entry is None or entry.content_type is None:
+            return None
+        return entry
+
+    def remember(self, path, filepath, content_type):
+        """
+        Record the file and content type a request path resolved to, once it was
+        served from ``filepath``.
+
+        :param path (str): the request path.
+        :param filepath (str): the file it was served from.
+        :param content_type (str): its ``Content-Type``.
+        """
+        with self._lock:
+            entry = self._entries.get(filepath)
+            if entry is None:
+                return
+            entry.content_type = content_type
+            if len(self._paths) >= 4 * len(self._entries) + 64:
+                # Bound the aliases of unusual spellings of the same paths
+                self._paths.clear()
+            self._paths[path] = filepath
+
+    def discard(self, filepath):
+        """
+        Drop the cached content of a file, if any.
+
+        :param filepath (str): path of the file.
+        """
+        with self._lock:
+            if filepath in self._entries:
+                self._remove(filepath)
+
+    def clear(self):
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._paths.clear()
+            self._size = 0
+
+    def _remove(self, filepath):
+        self._size -= self._entries.pop(filepath).size
+
+    def stats(self):
+        """
+        Hit and miss counts of the cache so far.
+
+        :rtype dict: hits, misses, hit_rate, reloads of changed files, entries,
+                     bytes and evictions.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses + self._reloads
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "reloads": self._reloads,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,553 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.framing
+~~~~~~~~~~~~~~~~~
+
+This module provides a :class:`RequestFramer <RequestFramer>` object which splits
+the byte stream of a connection into successive HTTP requests, independently of
+how the bytes were cut by ``recv``.
+
+A request ends after its header block and a body delimited either by
+``Content-Length`` or by ``Transfer-Encoding: chunked``. Bytes past the end of a
+request are kept for the next one, so pipelined requests are answered in order.
+A chunked body is decoded once complete, so handlers always get the plain body
+with a matching ``Content-Length`` header; trailer fields are discarded.
+
+With a ``body_sink`` callback, the body of a request may instead be written to a
+sink (e.g. a :class:`RequestBody <RequestBody>`) piece by piece as it arrives,
+chunked or not, so the receive buffer never holds more than one ``recv`` of it.
+
+The framer parses in a single pass over bytes: sockets are read with
+``recv_into`` straight into one reusable ``bytearray``, the request line and
+headers are decoded and parsed once, when the end of the header block is found,
+and the buffer grows straight to the announced size of a large body. A small body
+is copied out of the buffer once, as ``bytes``; a large one ending the buffered
+stream is handed over with the buffer itself, as a ``bytearray``, with no copy.
+
+Usage Example:
+--------------
+>>> framer = RequestFramer()
+>>> framer.feed(b"GET /a HTTP/1.1\r\nHost: x\r\n\r\nGET /b HT")
+>>> msg = framer.next_request()
+>>> msg.method, msg.target, msg.headers
+('GET', '/a', {'host': 'x'})
+>>> framer.next_request() is None
+True
+"""
+
+#: Largest accepted request line plus header block, in bytes.
+MAX_HEADER_SIZE = 64 * 1024
+#: Largest accepted request body, in bytes.
+MAX_BODY_SIZE = 10 * 1024 * 1024
+#: Bytes read from a stream per ``read`` call.
+RECV_SIZE = 65536
+#: Initial size of the receive buffer of a connection, enough for most requests.
+BUFFER_SIZE = 8192
+#: Digits of a chunk size.
+HEX_DIGITS = b"0123456789abcdefABCDEF"
+#: Bodies at least this large are handed over with the buffer instead of copied.
+DETACH_SIZE = 65536
+
+
+class FramingError(Exception):
+    """
+    Raised when the byte stream cannot be split into valid requests.
+
+    Attributes:
+        status_code (int): HTTP status to answer with before closing the connection.
+    """
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Message:
+    """
+    One framed request: its parsed request line and headers, and its body.
+
+    Attributes:
+        method (str): the request method, e.g. "GET".
+        target (str): the request target as sent, e.g. "/index.html?x=1".
+        version (str): the protocol version, e.g. "HTTP/1.1".
+        headers (dict): header values by lower-cased header name.
+        body (bytes): the body, decoded when it was sent chunked, a ``bytearray``
+                      for large bodies.
+    """
+
+    __slots__ = ("method", "target", "version", "headers", "body")
+
+    def __init__(self, method, target, version, headers, body=b""):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+
+def parse_head(head):
+    """
+    Parse a request line and header block.
+
+    :param head (bytes): request line and headers, without the blank line.
+
+    :rtype Message: the parsed request, with an empty body.
+
+    :raises FramingError: If the request line is malformed.
+    """
+    try:
+        text = head.decode('utf-8')
+    except UnicodeDecodeError:
+        text = head.decode('latin-1')
+
+    lines = text.split('\r\n')
+    parts = lines[0].split()
+    if len(parts) != 3:
+        raise FramingError(400, "Malformed request line")
+
+    headers = {}
+    for line in lines[1:]:
+        key, sep, value = line.partition(':')
+        if sep:
+            headers[key.strip().lower()] = value.strip()
+    return Message(parts[0], parts[1], parts[2], headers)
+
+
+def parse_chunk_size(line):
+    """
+    Parse the size of a chunk from its chunk-size line.
+
+    :param line (bytes): the line, without its CRLF, e.g. ``1a;name=value``.
+
+    :rtype int: the chunk size.
+
+    :raises FramingError: If the size is not hexadecimal digits only; ``int``
+                          would also take a ``0x`` prefix, a sign or underscores.
+    """
+    field = line.split(b";", 1)[0].strip()
+    if not field or field.strip(HEX_DIGITS):
+        raise FramingError(400, "Invalid chunk size")
+    return int(field, 16)
+
+
+def decode_chunked(data, start=0, end=None):
+    """
+    Decode a complete chunked body.
+
+    :param data (bytes): buffer holding the chunked body.
+    :param start (int): offset of the first chunk-size line in ``data``.
+    :param end (int): offset right after the body, defaults to the end of ``data``.
+
+    :rtype bytes: the concatenated chunk data, without chunk framing nor trailers.
+
+    :raises FramingError: If the chunk framing is malformed or truncated.
+    """
+    if end is None:
+        end = len(data)
+    view = memoryview(data)
+    parts = []
+    pos = start
+    while True:
+        line_end = data.find(b"\r\n", pos, end)
+        if line_end == -1:
+            raise FramingError(400, "Truncated chunked body")
+        size = parse_chunk_size(bytes(view[pos:line_end]))
+        if size == 0:
+            break
+        pos = line_end + 2
+        if pos + size + 2 > end:
+            raise FramingError(400, "Truncated chunked body")
+        parts.append(view[pos:pos + size])
+        pos += size + 2
+    body = b"".join(parts)
+    # Release the exports so the buffer can be resized again
+    for part in parts:
+        part.release()
+    view.release()
+    return body
+
+
+def unchunk_headers(headers, length):
+    """
+    Rewrite the headers of a request whose chunked body was decoded, as if it had
+    been sent with a ``Content-Length``.
+
+    :param headers (dict): header values by lower-cased header name, modified in place.
+    :param length (int): length of the decoded body.
+    """
+    codings = [coding.strip() for coding in headers.pop('transfer-encoding', '').split(',')]
+    codings = [coding for coding in codings if coding and coding.lower() != 'chunked']
+    if codings:
+        headers['transfer-encoding'] = ', '.join(codings)
+    headers['content-length'] = str(length)
+
+
+class RequestFramer:
+    """
+    Incremental splitter of one connection byte stream into requests.
+
+    Received bytes live in ``_buf[_start:_end]``; every offset of the request
+    being framed is relative to ``_start`` so the buffer can be compacted at
+    any time.
+
+    Attributes:
+        max_header_size (int): largest accepted header block.
+        max_body_size (int): largest accepted body.
+    """
+
+    __slots__ = (
+        "max_header_size",
+        "max_body_size",
+        "body_sink",
+        "_buf",
+        "_start",
+        "_end",
+        "_scan",
+        "_head",
+        "_header_end",
+        "_content_length",
+        "_chunked",
+        "_chunk_pos",
+        "_chunk_total",
+        "_sink",
+        "_remaining",
+    )
+
+    def __init__(self, max_header_size=MAX_HEADER_SIZE, max_body_size=MAX_BODY_SIZE, body_sink=None):
+        """
+        Initialize a new RequestFramer instance.
+
+        :param max_header_size (int): largest accepted header block, in bytes.
+        :param max_body_size (int): largest accepted body, in bytes.
+        :param body_sink (callable): ``body_sink(message)`` called with the parsed
+                                     head of every request, returning None to
+                                     buffer its body as usual or a sink to stream
+                                     it to. A sink has a ``max_size`` attribute
+                                     replacing ``max_body_size``, ``write(data)``,
+                                     ``finish()``, ``close()`` methods and a
+                                     ``size`` attribute; it becomes the body of
+                                     the returned message.
+        """
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.body_sink = body_sink
+        self._buf = bytearray(BUFFER_SIZE)
+        self._start = 0
+        self._end = 0
+        self._reset()
+
+    def _reset(self):
+        """Forget the framing state of the current request."""
+        # Offset from which to look for the end of the header block
+        self._scan = 0
+        self._head = None
+        self._header_end = None
+        self._content_length = 0
+        self._chunked = False
+        # Offset of the next chunk-size line and body bytes seen so far
+        self._chunk_pos = 0
+        self._chunk_total = 0
+        # Sink of a streamed body, and its remaining length (or chunk state)
+        self._sink = None
+        self._remaining = 0
+
+    def clear(self):
+        """
+        Drop every buffered byte and the framing state, e.g. before reusing the
+        framer for another connection. A buffer grown by a large request is
+        given back.
+        """
+        if self._sink is not None:
+            self._sink.close()
+        if len(self._buf) > 4 * DETACH_SIZE:
+            self._buf = bytearray(BUFFER_SIZE)
+        self._start = self._end = 0
+        self._reset()
+
+    def _reserve(self, size):
+        """
+        Make room for ``size`` more bytes after ``_end``, first by moving the
+        unconsumed bytes to the front of the buffer, then by growing it.
+
+        :param size (int): number of bytes about to be written.
+        """
+        buf = self._buf
+        if len(buf) - self._end >= size:
+            return
+        length = self._end - self._start
+        if self._start:
+            buf[:length] = memoryview(buf)[self._start:self._end]
+            self._start = 0
+            self._end = length
+        if len(buf) - length < size:
+            buf.extend(bytes(max(len(buf), length + size - len(buf))))
+
+    def feed(self, data):
+        """
+        Append received bytes to the stream.
+
+        :param data (bytes): bytes returned by ``recv``.
+        """
+        self._reserve(len(data))
+        self._buf[self._end:self._end + len(data)] = data
+        self._end += len(data)
+
+    def recv_into(self, sock):
+        """
+        Read from a socket straight into the free end of the stream buffer.
+
+        :param sock (socket.socket): the connection to read from.
+
+        :rtype int: number of bytes read, 0 when the peer closed the connection.
+
+        :raises OSError: On socket errors, e.g. ``socket.timeout`` or
+                         ``BlockingIOError`` on non-blocking sockets.
+        """
+        self._reserve(BUFFER_SIZE // 2)
+        with memoryview(self._buf) as view:
+            n = sock.recv_into(view[self._end:])
+        self._end += n
+        return n
+
+    @property
+    def pending(self):
+        """Whether bytes of a next request are already buffered."""
+        return self._end > self._start
+
+    def next_request(self):
+        """
+        Cut the next complete request out of the buffered stream.
+
+        :rtype Message: the parsed request with its decoded body, or None while
+                        it is incomplete.
+
+        :raises FramingError: If the request is malformed or too large.
+        """
+        if self._sink is not None:
+            return self._stream_body()
+        buf = self._buf
+        if self._header_end is None:
+            # Tolerate empty lines between pipelined requests (RFC 7230 3.5)
+            while buf.startswith(b"\r\n", self._start, self._end):
+                self._start += 2
+            base = self._start
+            header_end = buf.find(b"\r\n\r\n", base + self._scan, self._end)
+            if header_end == -1:
+                if self._end - base > self.max_header_size:
+                    raise FramingError(431, "Request header too large")
+                self._scan = max(0, self._end - base - 3)
+                return None
+            header_end -= base
+            if header_end > self.max_header_size:
+                raise FramingError(431, "Request header too large")
+
+            head = parse_head(bytes(memoryview(buf)[base:base + header_end]))
+            self._chunked = head.headers.get('transfer-encoding', '').lower().endswith('chunked')
+            sink = self.body_sink(head) if self.body_sink is not None else None
+            max_body_size = sink.max_size if sink is not None else self.max_body_size
+            if not self._chunked:
+                try:
+                    self._content_length = int(head.headers.get('content-length', 0))
+                except ValueError:
+                    raise FramingError(400, "Invalid Content-Length")
+                if self._content_length < 0:
+                    raise FramingError(400, "Invalid Content-Length")
+                if max_body_size is not None and self._content_length > max_body_size:
+                    raise FramingError(413, "Request body too large")
+            if sink is not None:
+                # Drop the head from the buffer and stream the body from there
+                self._head = head
+                self._start = base + header_end + 4
+                self._sink = sink
+                self._remaining = -1 if self._chunked else self._content_length
+                return self._stream_body()
+            self._head = head
+            self._header_end = header_end
+            self._chunk_pos = header_end + 4
+
+        base = self._start
+        if self._chunked:
+            end = self._chunked_end()
+            if end is None:
+                return None
+        else:
+            end = self._header_end + 4 + self._content_length
+            if self._end - base < end:
+                # Grow once to hold the whole body
+                self._reserve(end - (self._end - base))
+                return None
+
+        msg = self._head
+        body_start = base + self._header_end + 4
+        if self._chunked:
+            msg.body = decode_chunked(buf, body_start, base + end)
+            unchunk_headers(msg.headers, len(msg.body))
+            self._start += end
+            if self._start == self._end:
+                self._start = self._end = 0
+                if len(buf) > 4 * DETACH_SIZE:
+                    # Give back the memory of a large chunked body
+                    self._buf = bytearray(BUFFER_SIZE)
+        elif base + end == self._end and end - self._header_end - 4 >= DETACH_SIZE:
+            # Hand the buffer over as the body and start a fresh one
+            del buf[self._end:]
+            del buf[:body_start]
+            msg.body = buf
+            self._buf = bytearray(BUFFER_SIZE)
+            self._start = self._end = 0
+        else:
+            if end > self._header_end + 4:
+                msg.body = bytes(memoryview(buf)[body_start:base + end])
+            self._start += end
+            if self._start == self._end:
+                self._start = self._end = 0
+        self._reset()
+        return msg
+
+    def _stream_body(self):
+        """
+        Move the buffered bytes of a streamed body to its sink.
+
+        ``_remaining`` counts the body bytes still expected, or for a chunked
+        body the data bytes left in the current chunk, -1 while expecting a
+        chunk-size line, -2 in the trailers; 0 means the CRLF ending a chunk is
+        next.
+
+        :rtype Message: the request with the finished sink as body, or None while
+                        the body is incomplete.
+
+        :raises FramingError: If the chunk framing is malformed or the body too large.
+        """
+        try:
+            done = self._stream_chunked() if self._chunked else self._stream_plain()
+        except FramingError:
+            self._sink.close()
+            self._reset()
+            raise
+        if self._start == self._end:
+            self._start = self._end = 0
+        if not done:
+            return None
+
+        msg = self._head
+        msg.body = self._sink
+        msg.body.finish()
+        if self._chunked:
+            unchunk_headers(msg.headers, msg.body.size)
+        self._reset()
+        return msg
+
+    def _stream_plain(self):
+        """Stream the bytes of a ``Content-Length`` body; True once complete."""
+        n = min(self._remaining, self._end - self._start)
+        if n:
+            with memoryview(self._buf) as view:
+                self._sink.write(view[self._start:self._start + n])
+            self._start += n
+            self._remaining -= n
+        return self._remaining == 0
+
+    def _stream_chunked(self):
+        """Stream the data of the chunks received so far; True once complete."""
+        buf = self._buf
+        while True:
+            if self._remaining > 0:
+                n = min(self._remaining, self._end - self._start)
+                if not n:
+                    return False
+                with memoryview(buf) as view:
+                    self._sink.write(view[self._start:self._start + n])
+                self._start += n
+                self._remaining -= n
+                continue
+            if self._remaining == 0:
+                if self._end - self._start < 2:
+                    return False
+                if not buf.startswith(b"\r\n", self._start):
+                    raise FramingError(400, "Invalid chunk terminator")
+                self._start += 2
+                self._remaining = -1
+                continue
+
+            line_end = buf.find(b"\r\n", self._start, self._end)
+            end = self._end if line_end == -1 else line_end
+            if self._remaining == -2:
+                if self._chunk_total + end - self._start > self.max_header_size:
+                    raise FramingError(431, "Request trailers too large")
+            elif end - self._start > self.max_header_size:
+                raise FramingError(400, "Chunk line too long")
+            if line_end == -1:
+                return False
+            line = bytes(buf[self._start:line_end])
+            self._start = line_end + 2
+            if self._remaining == -2:
+                if not line:
+                    return True
+                # The sink counts the body: _chunk_total counts the trailers here
+                self._chunk_total += len(line) + 2
+                continue
+            size = parse_chunk_size(line)
+            self._remaining = size if size else -2
+
+    def _chunked_end(self):
+        """
+        Walk the chunks received so far.
+
+        :rtype int: offset right after the last chunk and trailers, or None
+                    while the body is incomplete.
+        """
+        buf = self._buf
+        base = self._start
+        limit = self._end
+        pos = self._chunk_pos
+        while True:
+            line_end = buf.find(b"\r\n", base + pos, limit)
+            if line_end == -1:
+                if limit - base - pos > self.max_header_size:
+                    raise FramingError(400, "Chunk line too long")
+                return None
+            line_end -= base
+            if line_end - pos > self.max_header_size:
+                raise FramingError(400, "Chunk line too long")
+            size = parse_chunk_size(bytes(buf[base + pos:base + line_end]))
+
+            if size == 0:
+                # Last chunk, then optional trailers up to an empty line,
+                # bounded like a header block
+                trailers = line_end + 2
+                trailer = trailers
+                while True:
+                    trailer_end = buf.find(b"\r\n", base + trailer, limit)
+                    if trailer_end == -1:
+                        if limit - base - trailers > self.max_header_size:
+                            raise FramingError(431, "Request trailers too large")
+                        return None
+                    trailer_end -= base
+                    if trailer_end - trailers > self.max_header_size:
+                        raise FramingError(431, "Request trailers too large")
+                    if trailer_end == trailer:
+                        return trailer_end + 2
+                    trailer = trailer_end + 2
+
+            self._chunk_total += size
+            if self._chunk_total > self.max_body_size:
+                raise FramingError(413, "Request body too large")
+            data_end = line_end + 2 + size
+            if limit - base < data_end + 2:
+                self._chunk_total -= size
+                return None
+            if buf[base + data_end:base + data_end + 2] != b"\r\n":
+                raise FramingError(400, "Invalid chunk terminator")
+            pos = data_end + 2
+            self._chunk_pos = pos
@@ -20,9 +20,67 @@ raw URL paths and RESTful route definitions, and integrates with
 Request and Response objects to handle client-server communication.
 """
 
-from .request import Request
-from .response import Response
+from .request import Request, InvalidJSON, route_params
+from .response import Response, FileResponse, next_part
 from .dictionary import CaseInsensitiveDict
+from .framing import RequestFramer, FramingError
+from .bodystream import RequestBody, body_sink
+from .eventloop import is_async_handler, submit
+from .offload import offload_route, EncodedJSON
+from .cache import CacheEntry, CACHED_METHODS
+from .appconfig import DEFAULT_CONFIG
+from .codec import dumps, loads
+from .conditional import make_etag
+from collections.abc import Iterator
+from concurrent.futures import Future
+import socket
+import threading
+import time
+
+#: Seconds a persistent connection may stay idle between two requests.
+KEEPALIVE_TIMEOUT = 5
+#: Maximum number of requests served on one persistent connection.
+KEEPALIVE_MAX_REQUESTS = 100
+
+# HttpAdapter reused by the connections served one after the other by a thread
+_worker = threading.local()
+
+
+def worker_adapter(ip, port, routes, **settings):
+    """
+    The :class:`HttpAdapter <HttpAdapter>` of the calling thread, reset for a new
+    connection. Threads serving many connections in a row (pool workers, reactor
+    handler threads) reuse one adapter, with its request, response and receive
+    buffer, instead of allocating them for every connection.
+
+    :param ip (str): IP address of the server.
+    :param port (int): Port number the server is listening on.
+    :param routes (dict): Mapping of route paths to handler functions.
+    :param settings: ``keepalive_timeout``, ``max_requests``, ``admission``,
+                     ``drain`` and ``config`` of :class:`HttpAdapter <HttpAdapter>`.
+
+    :rtype HttpAdapter: the adapter of the thread, without connection.
+    """
+    key = (ip, port, id(routes)) + tuple(settings.values())
+    daemon = getattr(_worker, "adapter", None)
+    if daemon is None or _worker.key != key:
+        daemon = HttpAdapter(ip, port, None, None, routes, **settings)
+        _worker.adapter = daemon
+        _worker.key = key
+    else:
+        daemon.reset()
+    return daemon
+
+def detach_worker_adapter(daemon):
+    """
+    Stop reusing the adapter of the calling thread, which is still busy with a
+    request once the thread moves on, e.g. one waiting for a coroutine handler.
+    The next :func:`worker_adapter` call of the thread allocates a new one.
+
+    :param daemon (HttpAdapter): the adapter returned by :func:`worker_adapter`.
+    """
+    if getattr(_worker, "adapter", None) is daemon:
+        _worker.adapter = None
 
 class HttpAdapter:
     """
@@ -42,8 +100,30 @@ class HttpAdapter:
         routes (dict): Mapping of route paths to handler functions.
         request (Request): Request object for parsing incoming data.
         response (Response): Response object for building and sending replies.
+        keepalive_timeout (float): idle seconds before a persistent connection is closed.
+        max_requests (int): maximum number of requests served per connection.
+        framer (RequestFramer): splits the connection byte stream into requests.
+        admission (AdmissionController): sheds requests when overloaded, or None.
+        drain (Drain): open connections book-keeping of the daemon, or None.
+        config (AppConfig): settings of the app serving the routes.
     """
 
+    __slots__ = (
+        "ip",
+        "port",
+        "conn",
+        "connaddr",
+        "routes",
+        "request",
+        "response",
+        "keepalive_timeout",
+        "max_requests",
+        "framer",
+        "admission",
+        "drain",
+        "config",
+    )
+
     __attrs__ = [
         "ip",
         "port",
@@ -52,9 +132,17 @@ class HttpAdapter:
         "routes",
         "request",
         "response",
+        "keepalive_timeout",
+        "max_requests",
+        "framer",
+        "admission",
+        "drain",
+        "config",
     ]
 
-    def __init__(self, ip, port, conn, connaddr, routes):
+    def __init__(self, ip, port, conn, connaddr, routes,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX_REQUESTS,
+                 admission=None, drain=None, config=None):
         """
         Initialize a new HttpAdapter instance.
 
@@ -63,6 +151,12 @@ class HttpAdapter:
         :param conn (socket): Active socket connection.
         :param connaddr (tuple): Address of the connected client.
         :param routes (dict): Mapping of route paths to handler functions.
+        :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+        :param max_requests (int): maximum number of requests served per connection.
+        :param admission (AdmissionController): admission control of the backend, or None.
+        :param drain (Drain): open connections book-keeping of the backend, or None.
+        :param config (AppConfig): settings of the app serving the routes, or None
+                                   for :data:`DEFAULT_CONFIG`.
         """
 
         #: IP address.
@@ -79,8 +173,34 @@ class HttpAdapter:
         self.request = Request()
         #: Response
         self.response = Response()
+        #: Keep-alive idle timeout
+        self.keepalive_timeout = keepalive_timeout
+        #: Keep-alive request cap
+        self.max_requests = max_requests
+        #: Request framer of the connection
+        self.framer = RequestFramer(body_sink=body_sink(routes))
+        #: Admission controller
+        self.admission = admission
+        #: Drain book-keeping
+        self.drain = drain
+        #: App settings
+        self.config = config if config is not None else DEFAULT_CONFIG
+
+    def reset(self, conn=None, connaddr=None):
+        """
+        Forget the previous connection and request, keeping the request,
+        response and framer objects for reuse.
+
+        :param conn (socket): the next connection, if known.
+        :param connaddr (tuple): its address.
+        """
+        self.conn = conn
+        self.connaddr = connaddr
+        self.request.reset()
+        self.response.reset()
+        self.framer.clear()
 
-    def handle_client(self, conn, addr, routes):
+    def handle_client(self, conn, addr, routes, queued_at=None, park=None, served=0):
         """
         Handle an incoming client connection.
 
@@ -88,114 +208,461 @@ class HttpAdapter:
         invokes the appropriate route handler if available, builds the response,
         and sends it back to the client.
 
+        The connection is persistent: requests are served one after the other
+        until the client asks to close it, stays idle for ``keepalive_timeout``
+        seconds, or ``max_requests`` requests have been answered. Pipelined
+        requests are answered in the order they were received.
+
+        With an admission controller, a request over its thresholds is answered
+        with the pre-encoded 503 reply and the connection is closed. Once the
+        backend drains, the request being served is answered with
+        ``Connection: close`` and an idle connection is closed.
+
         :param conn (socket): The client socket connection.
         :param addr (tuple): The client's address.
         :param routes (dict): The route mapping for dispatching requests.
+        :param queued_at (float): ``time.monotonic()`` of the accept, so the time the
+                                  connection waited for this thread counts as the
+                                  queue wait of its first request.
+        :param park (callable): ``park(conn, addr, served)`` taking over the
+                                connection while it waits for its next request
+                                (see :mod:`daemon.parking`), or None to wait here.
+        :param served (int): requests already served on a connection taken back
+                             from the parking.
+
+        :rtype bool: True if the connection was parked rather than closed.
         """
 
         # Connection handler.
         self.conn = conn
         # Connection address.
         self.connaddr = addr
-        # Request handler
-        req = self.request
-        # Response handler
-        resp = self.response
-
-        # Handle the request - read full request
-        msg = b""
-        # Read in chunks until we get the complete request
-        # First, read headers (end with \r\n\r\n)
-        headers_received = False
-        while not headers_received:
-            chunk = conn.recv(4096)
-            if not chunk:
+
+        drain = self.drain
+        conn.settimeout(self.keepalive_timeout)
+        resumed = served
+        while served < self.max_requests:
+            if served and drain is not None and not drain.idle(conn):
                 break
-            msg += chunk
-            if b"\r\n\r\n" in msg:
-                headers_received = True
-                # Check if there's a Content-Length header
+            if (served > resumed and park is not None and not self.framer.pending
+                    and park(conn, addr, served)):
+                return True
+            # Handle the request - read full request
+            try:
+                msg = self.read_request(conn)
+            except socket.timeout:
+                break
+            except FramingError as e:
+                print("[HttpAdapter] Rejecting request from {}: {}".format(addr, e))
+                conn.sendall(self.response.build_error(e.status_code))
+                break
+            if not msg:
+                break
+            if drain is not None:
+                drain.busy(conn)
+            if served:
+                # Fresh request/response state for every request on the connection
+                self.request.reset()
+                self.response.reset()
+            served += 1
+            keep_alive = served < self.max_requests and not (drain is not None and drain.draining)
+
+            if self.admission is None:
+                response = self.handle_request(msg, routes, keep_alive=keep_alive)
+                if isinstance(response, Future):
+                    response = response.result()
+            elif self.admission.admit(queued_at):
                 try:
-                    # Decode only headers part to check Content-Length
-                    header_end = msg.find(b"\r\n\r\n")
-                    header_bytes = msg[:header_end]
-                    header_str = header_bytes.decode('utf-8', errors='ignore')
-                    lines = header_str.split('\r\n')
-                    content_length = 0
-                    for line in lines:
-                        if line.lower().startswith('content-length:'):
-                            content_length = int(line.split(':', 1)[1].strip())
-                            break
-                    
-                    # If there's a body, read it
-                    if content_length > 0:
-                        body_start = header_end + 4
-                        body_received = len(msg) - body_start
-                        while body_received < content_length:
-                            chunk = conn.recv(min(4096, content_length - body_received))
-                            if not chunk:
-                                break
-                            msg += chunk
-                            body_received = len(msg) - body_start
-                except Exception as e:
-                    print(f"[HttpAdapter] Error reading request body: {e}")
+                    response = self.handle_request(msg, routes, keep_alive=keep_alive)
+                    if isinstance(response, Future):
+                        response = response.result()
+                finally:
+                    self.admission.release()
+            else:
+                print("[HttpAdapter] Overloaded, shedding request from {}".format(addr))
+                conn.sendall(self.admission.reply)
                 break
-            # Safety check to avoid infinite loop
-            if len(msg) > 100000:  # 100KB limit
+            queued_at = None
+
+            #print(response)
+            if not self.send_response(conn, response) or not self.request.keep_alive:
                 break
-        
-        try:
-            msg_str = msg.decode('utf-8')
-        except UnicodeDecodeError:
-            msg_str = msg.decode('latin-1', errors='ignore')  # Fallback encoding
-        
-        req.prepare(msg_str, routes)
+        conn.close()
+        return False
+
+    def send_response(self, conn, response):
+        """
+        Send an encoded response on a blocking socket. The parts of a streamed
+        response are sent one by one, as the route handler produces them, and
+        the body of a file response with ``sendfile``.
+
+        :param conn (socket): The client socket connection.
+        :param response (bytes): the complete HTTP response, or an iterator of
+                                 its parts.
+
+        :rtype bool: False if a streamed response was cut short by its handler.
+        """
+        if isinstance(response, (bytes, bytearray)):
+            conn.sendall(response)
+            return True
+        if isinstance(response, FileResponse):
+            response.sendfile(conn)
+            return True
+        while True:
+            part = next_part(response)
+            if part is None:
+                return False
+            if not part:
+                return True
+            conn.sendall(part)
+
+    def read_request(self, conn):
+        """
+        Read the next raw HTTP request from a blocking socket.
+
+        Bytes received past the end of the request stay in ``self.framer`` and
+        start the next request.
+
+        :param conn (socket): The client socket connection.
+
+        :rtype Message: the framed request, None if the client closed the
+                        connection before sending a complete request.
+
+        :raises FramingError: If the request is malformed or too large.
+        """
+        framer = self.framer
+        msg = framer.next_request()
+        while msg is None:
+            if not framer.recv_into(conn):
+                if framer.pending:
+                    print("[HttpAdapter] Connection closed in the middle of a request")
+                return None
+            msg = framer.next_request()
+        return msg
+
+    def handle_request(self, msg, routes, keep_alive=False):
+        """
+        Turn one raw request message into the encoded response, independently of
+        how the message was received.
+
+        After the call ``self.request.keep_alive`` tells whether the connection
+        stays open, as announced in the response ``Connection`` header.
+
+        :param msg (Message): the request parsed by the framer.
+        :param routes (dict): The route mapping for dispatching requests.
+        :param keep_alive (bool): whether the server allows the connection to
+                                  persist after this request.
+
+        :rtype bytes: the complete HTTP response, or an iterator of its parts
+                      when the route handler streams it (see :meth:`send_response`),
+                      or a Future of either when the route handler is a coroutine
+                      function (see :meth:`dispatch`).
+        """
+        req = self.prepare_request(msg, routes)
+        req.keep_alive = req.keep_alive and keep_alive
 
         # Handle OPTIONS preflight request for CORS
         if req.method == 'OPTIONS':
-            print("[HttpAdapter] Handling OPTIONS preflight request")
-            origin = req.headers.get("origin", "*")
-            allow_methods = req.headers.get("access-control-request-method", "GET, POST, PUT, DELETE, OPTIONS")
-            allow_headers = req.headers.get("access-control-request-headers", "Content-Type, Authorization, X-Requested-With")
-            
-            # Build OPTIONS response
-            status_line = "HTTP/1.1 200 OK\r\n"
-            headers = (
-                f"Access-Control-Allow-Origin: {origin}\r\n"
-                f"Access-Control-Allow-Methods: {allow_methods}\r\n"
-                f"Access-Control-Allow-Headers: {allow_headers}\r\n"
-                f"Access-Control-Allow-Credentials: true\r\n"
-                f"Access-Control-Max-Age: 86400\r\n"
-                f"Content-Length: 0\r\n"
-                f"\r\n"
-            )
-            preflight_response = (status_line + headers).encode('utf-8')
-            conn.sendall(preflight_response)
-            conn.close()
-            return
+            return self.build_preflight(req)
+
+        return self.dispatch(req)
+
+    def dispatch(self, req):
+        """
+        Run the route handler of a prepared request and build its response.
+
+        An ``async def`` or CPU-bound route handler is scheduled on the handler
+        event loop (see :mod:`daemon.eventloop`) instead, and the response is
+        built there once it returns.
+
+        :param req (Request): the prepared request.
+
+        :rtype bytes: the complete HTTP response, or an iterator of its parts,
+                      or a concurrent Future of either for a coroutine handler.
+        """
+        if is_async_handler(req.hook):
+            return submit(self.dispatch_async(req))
+        return self.dispatch_sync(req)
+
+    def dispatch_sync(self, req):
+        """
+        Run the regular route handler of a prepared request and build its response.
+
+        :param req (Request): the prepared request.
 
+        :rtype bytes: the complete HTTP response, or an iterator of its parts.
+        """
         # Handle request hook (route handler)
-        route_result = None
+        self.call_hook(req)
+
+        # Build response
+        return self.response.build_response(req)
+
+    async def dispatch_async(self, req):
+        """
+        Await the coroutine route handler of a prepared request and build its
+        response, like :meth:`dispatch_sync`.
+
+        :param req (Request): the prepared request.
+
+        :rtype bytes: the complete HTTP response, or an iterator of its parts.
+        """
+        await self.call_hook_async(req)
+        return self.response.build_response(req)
+
+    def cache_policy(self, req):
+        """
+        The ``@app.cache`` policy of the route of a request, if it is cached.
+
+        :param req (Request): the prepared request.
+
+        :rtype CachePolicy: the policy, or None when the response is not cached.
+        """
+        policy = getattr(req.hook, '_route_cache', None)
+        if policy is None or req.method not in CACHED_METHODS or self.config.cache is None:
+            return None
+        return policy
+
+    def cached_call(self, req, call, policy):
+        """
+        Wrap the call of a cached route handler, so that it is the one the
+        middleware run: a hit is only answered once the before stages let the
+        request through, and the cache is filled with the result of the
+        handler, not with what after stages make of it.
+
+        :param req (Request): the prepared request.
+        :param call (callable): calls the route handler.
+        :param policy (CachePolicy): the cache policy of its route.
+
+        :rtype callable: returns the handler result, or the
+                         :class:`CacheEntry <CacheEntry>` holding it when no
+                         middleware looks at results.
+        """
+        def cached():
+            entry = self.cache_lookup(req, policy)
+            if entry is not None:
+                return self.cache_result(req, entry)
+            result = call()
+            return self.cache_result(req, self.cache_store(req, result), result)
+        return cached
+
+    def cached_call_async(self, req, call, policy):
+        """
+        Wrap the call of a cached coroutine or CPU-bound route handler, like
+        :meth:`cached_call`.
+
+        :rtype callable: returns the coroutine of the wrapped call.
+        """
+        async def cached():
+            entry = self.cache_lookup(req, policy)
+            if entry is not None:
+                return self.cache_result(req, entry)
+            result = await call()
+            return self.cache_result(req, self.cache_store(req, result), result)
+        return cached
+
+    def cache_lookup(self, req, policy):
+        """
+        Look a request up in the response cache of the app. On a miss, the
+        cache key is kept in ``req.cache_key`` for :meth:`cache_store`.
+
+        :param req (Request): the prepared request.
+        :param policy (CachePolicy): the cache policy of its route.
+
+        :rtype CacheEntry: the cached response, or None on a miss.
+        """
+        cache = self.config.cache
+        key = policy.key(req)
+        entry = cache.get(key)
+        if entry is not None:
+            print("[HttpAdapter] Cached response for {} {}".format(req.method, req.path))
+            return entry
+        # Tag versions before the handler runs, so a write meanwhile makes it stale
+        req.cache_key = (key, cache.versions(policy.tags(req)), policy.ttl)
+        return None
+
+    def cache_store(self, req, result):
+        """
+        Encode the result of a route handler and keep it in the response cache,
+        after a miss of :meth:`cache_lookup`. Streamed, error and unencodable
+        results are not cached.
+
+        :param req (Request): the handled request.
+        :param result: the result returned by its route handler.
+
+        :rtype CacheEntry: the new entry, or None when the result is not cached.
+        """
+        if result is None or isinstance(result, Iterator) or (
+                isinstance(result, dict) and result.get("status") == "error"):
+            return None
+        try:
+            # The uncompressed body: the encoding depends on the client
+            body = bytes(result) if isinstance(result, EncodedJSON) else dumps(result)
+        except (TypeError, ValueError):
+            return None
+        key, versions, ttl = req.cache_key
+        entry = CacheEntry(body, 'application/json; charset=utf-8', 200,
+                           time.monotonic() + ttl, versions, make_etag(body))
+        self.config.cache.put(key, entry)
+        return entry
+
+    def cache_result(self, req, entry, result=None):
+        """
+        What a cached route handler call returns to the middleware: the cache
+        entry itself, sent without encoding anything again, unless after or
+        around stages look at the result.
+
+        :param req (Request): the handled request.
+        :param entry (CacheEntry): the cached response, or None if not cached.
+        :param result: the result returned by the handler, None on a hit.
+
+        :rtype: the entry, or the result (decoded from the entry on a hit).
+        """
+        if entry is None:
+            return result
+        pipeline = self.config.pipeline
+        if pipeline is None or not pipeline.inspects_results:
+            return entry
+        return result if result is not None else loads(entry.body)
+
+    def prepare_request(self, msg, routes):
+        """
+        Prepare the :class:`Request <Request>` from the framed request message.
+
+        :param msg (Message): the request parsed by the framer.
+        :param routes (dict): The route mapping for dispatching requests.
+
+        :rtype Request: the prepared request.
+        """
+        req = self.request
+        req.config = self.config
+        req.prepare_message(msg, routes)
+        return req
+
+    def build_preflight(self, req):
+        """
+        Build the response of an OPTIONS preflight request for CORS.
+
+        :param req (Request): the prepared request.
+
+        :rtype bytes: the encoded preflight response.
+        """
+        print("[HttpAdapter] Handling OPTIONS preflight request")
+        origin = req.headers.get("origin", "*")
+        allow_methods = req.headers.get("access-control-request-method", "GET, POST, PUT, DELETE, OPTIONS")
+        allow_headers = req.headers.get("access-control-request-headers", "Content-Type, Authorization, X-Requested-With")
+
+        # Build OPTIONS response
+        status_line = "HTTP/1.1 200 OK\r\n"
+        headers = (
+            f"Access-Control-Allow-Origin: {origin}\r\n"
+            f"Access-Control-Allow-Methods: {allow_methods}\r\n"
+            f"Access-Control-Allow-Headers: {allow_headers}\r\n"
+            f"Access-Control-Allow-Credentials: true\r\n"
+            f"Access-Control-Max-Age: 86400\r\n"
+            f"Content-Length: 0\r\n"
+            f"Connection: {self.response.connection_header(req)}\r\n"
+            f"\r\n"
+        )
+        return (status_line + headers).encode('utf-8')
+
+    def call_hook(self, req):
+        """
+        Call the route handler matched by the request, if any, through the
+        middleware of the app and, for a route registered with ``@app.cache``,
+        the response cache (see :meth:`cached_call`), and store its result in
+        ``req.route_result`` for the response builder.
+
+        :param req (Request): the prepared request.
+        """
         if req.hook:
             print("[HttpAdapter] hook in route-path METHOD {} PATH {}".format(req.hook._route_path,req.hook._route_methods))
+            pipeline = self.config.pipeline
+            call = lambda: req.hook(**self.hook_arguments(req))
+            policy = self.cache_policy(req)
+            if policy is not None:
+                call = self.cached_call(req, call, policy)
             # Call route handler with actual headers and body
             try:
-                route_result = req.hook(headers=req.headers, body=req.body)
-                # Store the result in request object for response builder
-                req.route_result = route_result
+                if pipeline is None or not pipeline.active:
+                    req.route_result = call()
+                else:
+                    req.route_result = pipeline.run(req, call)
+            except InvalidJSON as e:
+                print(f"[HttpAdapter] {e}")
+                req.route_result = {"status": "error", "message": "Invalid JSON"}
             except Exception as e:
                 print(f"[HttpAdapter] Error in route handler: {e}")
                 req.route_result = {"status": "error", "message": str(e)}
-            #
-            # TODO: handle for App hook here
-            #
+            finally:
+                self.release_body(req)
 
-        # Build response
-        response = resp.build_response(req)
+    async def call_hook_async(self, req):
+        """
+        Await a coroutine route handler matched by the request, or a CPU-bound
+        one run in a worker process (see :mod:`daemon.offload`), and store its
+        result in ``req.route_result``, like :meth:`call_hook`.
 
-        #print(response)
-        conn.sendall(response)
-        conn.close()
+        :param req (Request): the prepared request.
+        """
+        print("[HttpAdapter] async hook in route-path METHOD {} PATH {}".format(req.hook._route_path,req.hook._route_methods))
+        pipeline = self.config.pipeline
+        if getattr(req.hook, '_route_cpu_bound', False):
+            call = lambda: offload_route(req.hook, self.hook_arguments(req))
+        else:
+            call = lambda: req.hook(**self.hook_arguments(req))
+        policy = self.cache_policy(req)
+        if policy is not None:
+            call = self.cached_call_async(req, call, policy)
+        try:
+            if pipeline is None or not pipeline.active:
+                req.route_result = await call()
+            else:
+                req.route_result = await pipeline.run_async(req, call)
+        except InvalidJSON as e:
+            print(f"[HttpAdapter] {e}")
+            req.route_result = {"status": "error", "message": "Invalid JSON"}
+        except Exception as e:
+            print(f"[HttpAdapter] Error in route handler: {e}")
+            req.route_result = {"status": "error", "message": str(e)}
+        finally:
+            self.release_body(req)
+
+    def hook_arguments(self, req):
+        """
+        Keyword arguments of a route handler call: the headers and body, the
+        path parameters of its route, plus the parsed ``query``, ``cookies`` or
+        ``json`` when the handler declares such a parameter. Parts the handler
+        does not ask for are never parsed.
+
+        :param req (Request): the prepared request.
+
+        :rtype dict: the arguments.
+
+        :raises InvalidJSON: If the handler wants ``json`` and the body is not JSON.
+        """
+        params = getattr(req.hook, '_route_params', None)
+        if params is None:
+            # Handler registered without WeApRous.route
+            params = route_params(req.hook)
+        kwargs = {"headers": req.headers, "body": req.body}
+        if req.path_params:
+            kwargs.update(req.path_params)
+        for name in params:
+            kwargs[name] = getattr(req, name)
+        return kwargs
+
+    def release_body(self, req):
+        """
+        Free the spooled body of a streaming route once its handler returned,
+        unless the handler streams its response and may still read it.
+
+        :param req (Request): the handled request.
+        """
+        # A received body is left undecoded, a streamed one has no bytes
+        if (not req.body_bytes and isinstance(req.body, RequestBody)
+                and not isinstance(getattr(req, 'route_result', None), Iterator)):
+            req.body.close()
 
     @property
     def extract_cookies(self, req, resp):
@@ -0,0 +1,214 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.lifecycle
+~~~~~~~~~~~~~~~~~
+
+This module lets the backend and proxy daemons stop and restart without cutting
+responses short.
+
+Drain:
+------
+On SIGINT or SIGTERM a daemon stops accepting connections, closes its idle
+persistent connections, lets the requests in flight finish within a deadline,
+runs its shutdown hooks (e.g. flushing persistence) and exits.
+
+Hand-off:
+---------
+On SIGUSR2 a daemon starts a successor process running the same command line,
+which inherits the listening socket (its file descriptor number is passed in the
+``WEAPROUS_LISTEN_FD`` environment variable). Once the successor is up, the old
+process drains. Connections waiting in the listen backlog are accepted by the
+successor, so deploying new code drops none of them.
+
+Usage Example:
+--------------
+>>> kill -USR2 <pid>    # start the new code, then drain the old process
+>>> kill -TERM <pid>    # drain and exit
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from .listener import LISTEN_FD_ENV
+
+#: Seconds given to in-flight requests to finish once draining starts.
+DRAIN_TIMEOUT = 10
+#: Seconds a successor must stay up before the old process starts draining.
+HANDOFF_GRACE = 1.0
+
+
+def raise_interrupt(signum, frame):
+    """
+    Turn SIGTERM into the KeyboardInterrupt every engine drains on. Later SIGTERMs
+    are ignored so they do not cut the drain short; a second Ctrl-C still does.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+
+def spawn_successor(listener=None):
+    """
+    Start a new process running the current command line, handing it the
+    listening socket.
+
+    :param listener (socket.socket): listening socket to inherit, or None when the
+                                     successor binds its own (``SO_REUSEPORT``).
+
+    :rtype subprocess.Popen: the successor, or None if it failed to start.
+    """
+    env = dict(os.environ)
+    pass_fds = ()
+    if listener is not None:
+        fd = listener.fileno()
+        env[LISTEN_FD_ENV] = str(fd)
+        pass_fds = (fd,)
+
+    try:
+        proc = subprocess.Popen([sys.executable] + sys.orig_argv[1:], env=env, pass_fds=pass_fds)
+    except OSError as e:
+        print("[Lifecycle] Cannot start successor: {}".format(e))
+        return None
+
+    # Keep serving if the new code dies at start-up.
+    deadline = time.monotonic() + HANDOFF_GRACE
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            print("[Lifecycle] Successor exited with status {}, keep serving".format(proc.returncode))
+            return None
+        time.sleep(0.05)
+    print("[Lifecycle] Handed over to successor pid {}".format(proc.pid))
+    return proc
+
+
+def install_signal_handlers(listener):
+    """
+    Make SIGTERM drain the daemon like Ctrl-C and SIGUSR2 hand the listening
+    socket to a successor before draining. Signal handlers can only be set from
+    the main thread; elsewhere the call does nothing.
+
+    :param listener (socket.socket): the listening socket of the daemon.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+
+    def on_handoff(signum, frame):
+        if spawn_successor(listener) is not None:
+            # Drain through the SIGTERM handler in place, which may be the
+            # asyncio event loop one.
+            signal.raise_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, raise_interrupt)
+    signal.signal(signal.SIGUSR2, on_handoff)
+
+
+class Drain:
+    """
+    Book-keeping of the open connections of a threaded daemon, so it can be
+    stopped once they are done.
+
+    Attributes:
+        timeout (float): seconds given to in-flight requests once draining starts.
+        draining (bool): whether the daemon stopped accepting new work.
+    """
+
+    __attrs__ = [
+        "timeout",
+        "draining",
+    ]
+
+    def __init__(self, timeout=DRAIN_TIMEOUT):
+        """
+        Initialize a new Drain instance.
+
+        :param timeout (float): seconds given to in-flight requests once draining starts.
+        """
+        #: Drain deadline
+        self.timeout = timeout
+        #: Draining flag
+        self.draining = False
+
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._active = 0
+        self._idle = set()
+
+    def add(self):
+        """
+        Count a newly accepted connection.
+        """
+        with self._lock:
+            self._active += 1
+
+    def remove(self, conn):
+        """
+        Forget a connection once it is closed.
+
+        :param conn (socket.socket): the closed connection.
+        """
+        with self._lock:
+            self._active -= 1
+            self._idle.discard(conn)
+            self._done.notify_all()
+
+    def idle(self, conn):
+        """
+        Mark a persistent connection as waiting for its next request.
+
+        :param conn (socket.socket): the connection.
+
+        :rtype bool: False when draining, the connection must then be closed.
+        """
+        with self._lock:
+            if self.draining:
+                return False
+            self._idle.add(conn)
+            return True
+
+    def busy(self, conn):
+        """
+        Mark a connection as serving a request again.
+
+        :param conn (socket.socket): the connection.
+        """
+        with self._lock:
+            self._idle.discard(conn)
+
+    def start(self):
+        """
+        Enter draining: no connection is kept alive any more, and those waiting
+        for their next request are woken up to be closed.
+        """
+        with self._lock:
+            self.draining = True
+            for conn in self._idle:
+                try:
+                    conn.shutdown(socket.SHUT_RD)
+                except OSError:
+                    pass
+            self._idle.clear()
+
+    def wait(self):
+        """
+        Wait until every connection is closed or the deadline expires.
+
+        :rtype int: number of connections still open.
+        """
+        with self._lock:
+            self._done.wait_for(lambda: self._active <= 0, self.timeout)
+            return self._active
@@ -0,0 +1,79 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.listener
+~~~~~~~~~~~~~~~~~
+
+This module creates the listening sockets of the backend engines, so a socket
+can be opened once and handed to any engine (or to several worker processes),
+or inherited from the process being replaced (see :mod:`daemon.lifecycle`).
+"""
+
+import os
+import socket
+
+#: Default length of the pending connections queue.
+BACKLOG = 50
+#: Environment variable carrying the file descriptor of an inherited listening socket.
+LISTEN_FD_ENV = "WEAPROUS_LISTEN_FD"
+
+
+def create_listener(ip, port, backlog=BACKLOG, reuse_port=False):
+    """
+    Create a TCP socket bound to ``(ip, port)`` and listening.
+
+    :param ip (str): IP address to bind.
+    :param port (int): Port number to listen on.
+    :param backlog (int): length of the pending connections queue.
+    :param reuse_port (bool): set ``SO_REUSEPORT`` so several processes can
+                              listen on the same port, the kernel spreading
+                              new connections among them.
+
+    :rtype socket.socket: the listening socket.
+
+    :raises OSError: If the socket cannot be bound, or ``SO_REUSEPORT`` is
+                     requested on a platform without it.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        if reuse_port:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        server.bind((ip, port))
+        server.listen(backlog)
+    except (OSError, AttributeError) as e:
+        server.close()
+        raise OSError("cannot listen on {}:{}: {}".format(ip, port, e))
+    return server
+
+
+def has_reuse_port():
+    """
+    Tell whether the platform supports ``SO_REUSEPORT``.
+
+    :rtype bool: True when ``socket.SO_REUSEPORT`` is available.
+    """
+    return hasattr(socket, "SO_REUSEPORT")
+
+
+def inherited_listener():
+    """
+    Take over the listening socket handed down by a predecessor process, if any.
+    The environment variable is consumed so child processes do not reuse it.
+
+    :rtype socket.socket: the inherited listening socket, or None.
+    """
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd is None:
+        return None
+    print("[Listener] Inherited listening socket fd {}".format(fd))
+    return socket.socket(fileno=int(fd))
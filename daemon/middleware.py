@@ -0,0 +1,330 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.middleware
+~~~~~~~~~~~~~~~~~
+
+This module provides a :class:`Pipeline <Pipeline>` object, the middleware
+chain of a WeApRous app, run around the route handler of every routed request.
+
+Stages:
+-------
+- before ``func(request)``: runs before the handler. Returning anything but None
+  answers the request with that result, without calling the handler.
+- after ``func(request, result)``: runs after the handler. Returning anything but
+  None replaces the result.
+- around ``func(request)``: a generator function, whose code before its ``yield``
+  runs on the way in and after it on the way out. The ``yield`` returns the
+  result of the inner stages and handler, or raises their exception. Returning a
+  value replaces the result; returning before the ``yield`` answers the request.
+
+Stages run in registration order on the way in and in reverse order on the way
+out. Before and after hooks may be ``async def``; around ones are plain
+generators, so that one middleware wraps regular and coroutine handlers alike.
+
+The pipeline times every stage, on the way in and out, and the handler. The
+timings of a request are sent in its ``Server-Timing`` response header and added
+to the totals of :meth:`Pipeline.stats`. Without any stage, requests skip the
+pipeline, and so carry no timings, unless timing is enabled.
+
+Usage Example:
+--------------
+>>> @app.before_request
+>>> def require_auth(request):
+>>>     if request.cookies.get('auth') != 'true':
+>>>         return {"status": "error", "message": "Unauthorized"}
+
+>>> @app.around_request
+>>> def catch_errors(request):
+>>>     try:
+>>>         return (yield)
+>>>     except KeyError as e:
+>>>         return {"status": "error", "message": "Missing {}".format(e)}
+"""
+
+import inspect
+import threading
+import time
+
+from .eventloop import submit
+
+#: Kinds of pipeline stages.
+STAGE_KINDS = ("before", "after", "around")
+#: Name of the route handler in the timings.
+HANDLER_TIMING = "handler"
+
+
+def call_stage(func, *args):
+    """Call a before or after hook from synchronous code, running a coroutine
+    hook on the handler event loop."""
+    result = func(*args)
+    if inspect.isawaitable(result):
+        result = submit(result).result()
+    return result
+
+
+async def call_stage_async(func, *args):
+    """Call a before or after hook from a coroutine."""
+    result = func(*args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+class Pipeline:
+    """
+    Middleware chain of a WeApRous app.
+
+    Attributes:
+        stages (list): (kind, name, function) of every stage, in registration order.
+        timing (bool): whether the route handlers are timed even without stages.
+    """
+
+    __attrs__ = [
+        "stages",
+        "timing",
+    ]
+
+    def __init__(self, timing=False):
+        """
+        Initialize a new, empty Pipeline instance.
+
+        :param timing (bool): time the route handlers even when no stage is
+                              registered.
+        """
+        #: Stages of the chain
+        self.stages = []
+        #: Whether requests are timed without stages
+        self.timing = timing
+
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def add(self, kind, func):
+        """
+        Append a stage to the chain.
+
+        :param kind (str): one of ``STAGE_KINDS``.
+        :param func (function): the hook.
+
+        :raises ValueError: If the kind is unknown.
+        :raises TypeError: If an around hook is not a generator function.
+        """
+        if kind not in STAGE_KINDS:
+            raise ValueError("Invalid middleware kind {}, expected one of {}".format(kind, STAGE_KINDS))
+        if kind == "around" and not inspect.isgeneratorfunction(func):
+            raise TypeError("around middleware {} must be a generator function".format(func.__name__))
+        self.stages.append((kind, func.__name__, func))
+
+    @property
+    def active(self):
+        """Whether requests go through the chain: a stage is registered or timing is enabled."""
+        return self.timing or bool(self.stages)
+
+    @property
+    def inspects_results(self):
+        """Whether after or around stages see the results of the handlers."""
+        return any(kind != "before" for kind, _, _ in self.stages)
+
+    def run(self, req, call):
+        """
+        Run the chain around a regular route handler.
+
+        :param req (Request): the prepared request. Its ``timings`` receive the
+                              time spent in every stage and in the handler.
+        :param call (callable): calls the route handler and returns its result.
+
+        :rtype: the result to answer with.
+
+        :raises Exception: the exception of the handler or of a stage, unless an
+                           around stage handled it.
+        """
+        steps = self.steps(req)
+        try:
+            step = next(steps)
+            while True:
+                try:
+                    result = call() if step is None else call_stage(step[0], *step[1])
+                except Exception as e:
+                    step = steps.throw(e)
+                else:
+                    step = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    async def run_async(self, req, call):
+        """
+        Run the chain around a coroutine route handler, like :meth:`run`.
+
+        :param req (Request): the prepared request.
+        :param call (callable): returns the coroutine of the route handler call.
+
+        :rtype: the result to answer with.
+        """
+        steps = self.steps(req)
+        try:
+            step = next(steps)
+            while True:
+                try:
+                    if step is None:
+                        result = await call()
+                    else:
+                        result = await call_stage_async(step[0], *step[1])
+                except Exception as e:
+                    step = steps.throw(e)
+                else:
+                    step = steps.send(result)
+        except StopIteration as stop:
+            return stop.value
+
+    def steps(self, req):
+        """
+        Walk the chain for one request, leaving the calls to :meth:`run` or
+        :meth:`run_async` so that hooks and handler are called or awaited by
+        them. Each call is sent back its result, or thrown its exception.
+
+        :param req (Request): the prepared request, whose ``timings`` are set.
+
+        :rtype generator: yields ``(func, args)`` for every before or after hook
+                          to call and None for the route handler, then returns
+                          the result to answer with.
+
+        :raises Exception: the exception of the handler or of a stage, unless an
+                           around stage handled it.
+        """
+        timings = req.timings = []
+        unwind = []
+        result = error = None
+        answered = False
+        clock = time.perf_counter
+        for kind, name, func in self.stages:
+            started = clock()
+            try:
+                if kind == "before":
+                    result = yield func, (req,)
+                    answered = result is not None
+                elif kind == "around":
+                    gen = func(req)
+                    try:
+                        next(gen)
+                        unwind.append((kind, name, gen))
+                    except StopIteration as stop:
+                        result, answered = stop.value, True
+                else:
+                    unwind.append((kind, name, func))
+            except Exception as e:
+                error, answered = e, True
+            timings.append((name, clock() - started))
+            if answered:
+                break
+
+        if not answered:
+            started = clock()
+            try:
+                result = yield None
+            except Exception as e:
+                error = e
+            timings.append((HANDLER_TIMING, clock() - started))
+
+        for kind, name, stage in reversed(unwind):
+            started = clock()
+            try:
+                if kind == "around":
+                    result, error = self.resume(stage, result, error)
+                elif error is None:
+                    replaced = yield stage, (req, result)
+                    if replaced is not None:
+                        result = replaced
+            except Exception as e:
+                error = e
+            timings.append((name, clock() - started))
+        self.record(timings)
+        if error is not None:
+            raise error
+        return result
+
+    @staticmethod
+    def resume(gen, result, error):
+        """
+        Resume an around stage after its ``yield`` with the inner result or
+        exception.
+
+        :rtype tuple: the result and exception the stage leaves.
+        """
+        try:
+            if error is None:
+                gen.send(result)
+            else:
+                gen.throw(error)
+        except StopIteration as stop:
+            if stop.value is not None:
+                return stop.value, None
+            return result, None
+        # Yielded again: stop it there
+        gen.close()
+        return result, error
+
+    def record(self, timings):
+        """
+        Add the timings of one request to the totals.
+
+        :param timings (list): (name, seconds) of every stage.
+        """
+        durations = merge_timings(timings)
+        with self._lock:
+            for name, seconds in durations.items():
+                total = self._totals.get(name)
+                if total is None:
+                    self._totals[name] = [1, seconds, seconds]
+                else:
+                    total[0] += 1
+                    total[1] += seconds
+                    if seconds > total[2]:
+                        total[2] = seconds
+
+    def stats(self):
+        """
+        Time spent in every stage and in the route handlers so far.
+
+        :rtype dict: by stage name, the number of runs and the total and
+                     largest time in milliseconds.
+        """
+        with self._lock:
+            return {name: {"count": count, "total_ms": total * 1e3, "max_ms": largest * 1e3}
+                    for name, (count, total, largest) in self._totals.items()}
+
+
+def merge_timings(timings):
+    """
+    Total time of every stage of a request, over its ways in and out.
+
+    :param timings (list): (name, seconds) of every stage pass.
+
+    :rtype dict: seconds by stage name, in the order of the first passes.
+    """
+    durations = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0) + seconds
+    return durations
+
+
+def server_timing(timings):
+    """
+    Format the timings of a request as a ``Server-Timing`` header value.
+
+    :param timings (list): (name, seconds) of every stage pass.
+
+    :rtype str: e.g. ``require_auth;dur=0.012, handler;dur=1.305``, in milliseconds.
+    """
+    return ", ".join("{};dur={:.3f}".format(name, seconds * 1e3)
+                     for name, seconds in merge_timings(timings).items())
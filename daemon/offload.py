@@ -0,0 +1,146 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.offload
+~~~~~~~~~~~~~~~~~
+
+This module runs CPU-heavy work of a WeApRous app (ranking, hashing, report
+building) in a pool of worker processes, one pool per server process, started
+on first use. A thread of the server computing for seconds holds the GIL and
+stalls every other connection of its process; a worker process does not.
+
+Two ways to use it:
+
+- ``@app.route(path, cpu_bound=True)``: the whole handler runs in a worker
+  process. It gets its usual keyword arguments (``headers``, ``body``, path
+  parameters, ``query``, ...), which are pickled to the worker, and its result is
+  JSON-encoded there, so only the encoded bytes travel back.
+- ``await app.offload(func, *args)`` from an ``async def`` handler: only the
+  heavy part runs in a worker, e.g. on a snapshot of the data the handler
+  collected, which keeps the arguments and result small.
+
+In both cases the server waits for the worker on an event loop (see
+:mod:`daemon.eventloop`), not in a thread of its own. The function and its
+arguments must be picklable: a module-level function, not a closure or lambda.
+The middleware of the app run in the server process, and an ``after_request``
+hook sees the result of a CPU-bound handler already encoded, as
+:class:`EncodedJSON` bytes.
+
+Usage Example:
+--------------
+>>> @app.route('/reports/<int:year>', methods=['GET'], cpu_bound=True)
+>>> def report(headers, body, year):
+>>>     return build_report(year)
+
+>>> @app.route('/search', methods=['GET'])
+>>> async def search(headers, body, query):
+>>>     return {'hits': await app.offload(rank, list(texts), query['q'])}
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from .codec import dumps
+
+#: Default number of worker processes of the pool.
+CPU_WORKERS = os.cpu_count() or 1
+
+_lock = threading.Lock()
+_pool = None
+_pid = None
+_max_workers = CPU_WORKERS
+
+
+class EncodedJSON(bytes):
+    """Result of a CPU-bound route handler, already JSON-encoded by the worker
+    process, sent as the response body as it is."""
+
+
+def configure(max_workers):
+    """
+    Set the number of worker processes of the pools started from now on.
+
+    :param max_workers (int): the number of worker processes.
+    """
+    global _max_workers
+    _max_workers = max_workers
+
+
+def get_pool():
+    """
+    The worker process pool of this process, started on first use. A
+    pre-forked server worker starts its own.
+
+    Workers are started by a fork server where available, so they do not inherit
+    the sockets and threads of the server, else spawned.
+
+    :rtype ProcessPoolExecutor: the pool.
+    """
+    global _pool, _pid
+    with _lock:
+        if _pool is None or _pid != os.getpid():
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool, _pid = ProcessPoolExecutor(max_workers=_max_workers, mp_context=context), os.getpid()
+        return _pool
+
+
+def shutdown():
+    """
+    Stop the worker processes of this process, if started, once their running
+    work is done.
+    """
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pid == os.getpid():
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def offload(func, *args, **kwargs):
+    """
+    Run a function in a worker process.
+
+    :param func (function): a module-level function.
+    :param args: its picklable arguments.
+
+    :rtype asyncio.Future: its result, to be awaited on the running event loop.
+    """
+    return asyncio.wrap_future(get_pool().submit(func, *args, **kwargs))
+
+
+def call_route(func, kwargs):
+    """
+    Call a CPU-bound route handler in a worker process. A dict or list result
+    is returned JSON-encoded, except an error result (``{"status": "error"}``),
+    which the server must still recognise.
+    """
+    result = func(**kwargs)
+    if isinstance(result, (dict, list)) and not (isinstance(result, dict) and result.get("status") == "error"):
+        return EncodedJSON(dumps(result))
+    return result
+
+
+def offload_route(func, kwargs):
+    """
+    Run a CPU-bound route handler in a worker process.
+
+    :param func (function): the route handler.
+    :param kwargs (dict): its keyword arguments.
+
+    :rtype asyncio.Future: its result, an :class:`EncodedJSON` for a dict or list.
+    """
+    return offload(call_route, func, kwargs)
@@ -0,0 +1,196 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.parking
+~~~~~~~~~~~~~~~~~
+
+This module provides a :class:`ConnectionParking <ConnectionParking>` object, one
+thread watching the idle persistent connections of the "pool" engine with
+:mod:`selectors`. A pool worker that answered a request parks its connection
+instead of blocking in ``recv`` until the next one: the worker is free for other
+connections meanwhile, and the connection is handed back to the pool once the
+client sends more bytes, or closed once idle for ``keepalive_timeout`` seconds.
+
+Notes:
+------
+- Only connections without buffered bytes are parked; a worker that already
+  holds part of the next request keeps reading it.
+- Parked connections stay counted by the :class:`Drain <Drain>` of the backend
+  as idle: when draining starts they are shut down for reading, which wakes them
+  up to be read to their end and closed by a worker.
+
+Usage Example:
+--------------
+>>> parking = ConnectionParking(resume, timeout=5)
+>>> parking.start()
+>>> parking.park(conn, addr, served)
+True
+
+"""
+
+import selectors
+import socket
+import threading
+import time
+
+
+class ConnectionParking:
+    """
+    Selector thread holding idle persistent connections until their next request.
+
+    Attributes:
+        resume (callable): ``resume(conn, addr, served)`` called from the parking
+                           thread once a parked connection is readable, e.g. to
+                           submit it to the worker pool again.
+        timeout (float): idle seconds before a parked connection is closed.
+        drain (Drain): open connections book-keeping of the backend, or None.
+    """
+
+    __attrs__ = [
+        "resume",
+        "timeout",
+        "drain",
+    ]
+
+    def __init__(self, resume, timeout, drain=None):
+        """
+        Initialize a new ConnectionParking instance.
+
+        :param resume (callable): called with ``(conn, addr, served)`` for a
+                                  parked connection that became readable.
+        :param timeout (float): idle seconds before a parked connection is closed.
+        :param drain (Drain): book-keeping told about the connections closed
+                              here, or None.
+        """
+        #: Callback of the readable connections
+        self.resume = resume
+        #: Idle timeout
+        self.timeout = timeout
+        #: Drain book-keeping
+        self.drain = drain
+
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        # Connections parked by workers, registered by the parking thread
+        self._arrivals = []
+        # Parked connection -> (addr, served, deadline)
+        self._parked = {}
+        self._closed = False
+        self._thread = None
+        self._wakeup, self._waker = socket.socketpair()
+        self._wakeup.setblocking(False)
+        self._selector.register(self._wakeup, selectors.EVENT_READ)
+
+    def start(self):
+        """
+        Start the parking thread.
+        """
+        self._thread = threading.Thread(target=self.run, name="Parking", daemon=True)
+        self._thread.start()
+
+    def park(self, conn, addr, served):
+        """
+        Hand an idle connection over to the parking thread. Called by the
+        worker that answered its last request.
+
+        :param conn (socket.socket): the connection, with no buffered request bytes.
+        :param addr (tuple): client address (IP, port).
+        :param served (int): number of requests already served on it.
+
+        :rtype bool: False once the parking is shut down, the caller then keeps
+                     the connection.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            self._arrivals.append((conn, addr, served))
+        self.wake()
+        return True
+
+    def wake(self):
+        """Interrupt the ``select`` of the parking thread."""
+        try:
+            self._waker.send(b"\0")
+        except OSError:
+            pass
+
+    def run(self):
+        """
+        Body of the parking thread: resume the readable connections and close
+        the expired ones until :meth:`shutdown`.
+        """
+        while True:
+            with self._lock:
+                if self._closed:
+                    break
+                arrivals, self._arrivals = self._arrivals, []
+            now = time.monotonic()
+            for conn, addr, served in arrivals:
+                self._parked[conn] = (addr, served, now + self.timeout)
+                self._selector.register(conn, selectors.EVENT_READ)
+
+            timeout = None
+            if self._parked:
+                timeout = max(min(deadline for _, _, deadline in self._parked.values()) - now, 0)
+            for key, _ in self._selector.select(timeout):
+                if key.fileobj is self._wakeup:
+                    try:
+                        self._wakeup.recv(4096)
+                    except OSError:
+                        pass
+                    continue
+                conn = key.fileobj
+                addr, served, _ = self._parked.pop(conn)
+                self._selector.unregister(conn)
+                self.resume(conn, addr, served)
+
+            now = time.monotonic()
+            for conn, (addr, served, deadline) in list(self._parked.items()):
+                if deadline <= now:
+                    del self._parked[conn]
+                    self._selector.unregister(conn)
+                    self.close(conn)
+
+        for conn, _, _ in self._arrivals:
+            self.close(conn)
+        for conn in list(self._parked):
+            self._selector.unregister(conn)
+            self.close(conn)
+        self._arrivals = []
+        self._parked.clear()
+
+    def close(self, conn):
+        """
+        Close a parked connection.
+
+        :param conn (socket.socket): the connection.
+        """
+        try:
+            conn.close()
+        except OSError:
+            pass
+        if self.drain is not None:
+            self.drain.remove(conn)
+
+    def shutdown(self):
+        """
+        Stop the parking thread and close the connections still parked.
+        """
+        with self._lock:
+            self._closed = True
+        self.wake()
+        if self._thread is not None:
+            self._thread.join()
+        self._selector.close()
+        self._wakeup.close()
+        self._waker.close()
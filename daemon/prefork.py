@@ -0,0 +1,185 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.prefork
+~~~~~~~~~~~~~~~~~
+
+This module runs a backend engine in several pre-forked worker processes, so
+route handlers are no longer serialized by one interpreter lock.
+
+The workers share the listening port either through ``SO_REUSEPORT`` (each
+worker binds its own socket and the kernel balances connections) or, where the
+option is missing, through one socket bound by the supervisor and inherited on
+``fork``.
+
+The supervisor process:
+
+- restarts a worker that exits or crashes, with a short back-off when it dies
+  right after starting.
+- forwards SIGTERM and SIGINT to the workers and exits once they are gone.
+- on SIGHUP, stops every worker; each one is restarted with a fresh state.
+- on SIGUSR2, hands the port to a new supervisor running the same command (see
+  :mod:`daemon.lifecycle`), then stops its own workers.
+
+Workers drain on SIGTERM: in-flight requests finish before the worker exits.
+
+Notes:
+------
+- Module level state (e.g. in-memory registries of an app) is per worker
+  process and is not shared between workers.
+- Requires ``os.fork``, i.e. a POSIX platform.
+
+Usage Example:
+--------------
+>>> create_backend("0.0.0.0", 9000, routes={}, engine="thread", workers=4)
+
+"""
+
+import os
+import signal
+import sys
+import time
+import traceback
+
+from .listener import create_listener, has_reuse_port
+from .lifecycle import raise_interrupt, spawn_successor
+
+#: A worker exiting sooner than this after its start is considered crashing.
+MIN_UPTIME = 1.0
+
+
+def run_worker(ip, port, index, target, listener):
+    """
+    Body of a forked worker process. Never returns.
+
+    :param ip (str): IP address to bind.
+    :param port (int): Port number to listen on.
+    :param index (int): worker number, for logging.
+    :param target (callable): ``target(listener)`` runs the engine until interrupted.
+    :param listener (socket.socket): inherited listening socket, or None to bind a
+                                     ``SO_REUSEPORT`` one.
+    """
+    signal.signal(signal.SIGTERM, raise_interrupt)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGHUP, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+
+    code = 0
+    try:
+        if listener is None:
+            listener = create_listener(ip, port, reuse_port=True)
+        print("[Prefork] Worker {} (pid {}) serving on port {}".format(index, os.getpid(), port))
+        target(listener)
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(code)
+
+
+def run_prefork(ip, port, workers, target, reuse_port=None, listener=None):
+    """
+    Start ``workers`` worker processes running ``target`` and supervise them
+    until the supervisor is told to stop.
+
+    :param ip (str): IP address to bind.
+    :param port (int): Port number to listen on.
+    :param workers (int): number of worker processes.
+    :param target (callable): ``target(listener)`` runs one engine on the given
+                              listening socket until interrupted.
+    :param reuse_port (bool): share the port with ``SO_REUSEPORT`` instead of an
+                              inherited socket. Defaults to whether the platform
+                              supports it.
+    :param listener (socket.socket): listening socket inherited from a predecessor,
+                                     shared by the workers instead of binding one.
+    """
+    if reuse_port is None:
+        reuse_port = listener is None and has_reuse_port()
+
+    try:
+        if listener is not None:
+            shared = listener
+        elif reuse_port:
+            # Fail here rather than in every worker when the port is taken.
+            create_listener(ip, port, reuse_port=True).close()
+            shared = None
+        else:
+            shared = create_listener(ip, port)
+    except OSError as e:
+        print("[Prefork] Socket error: {}".format(e))
+        return
+
+    children = {}
+    state = {"stopping": False}
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(ip, port, index, target, shared)
+        children[pid] = (index, time.monotonic())
+
+    def forward():
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def on_stop(signum, frame):
+        if not state["stopping"]:
+            print("\n[Prefork] Shutting down {} workers...".format(len(children)))
+        state["stopping"] = True
+        forward()
+
+    def on_reload(signum, frame):
+        print("[Prefork] Restarting {} workers".format(len(children)))
+        forward()
+
+    def on_handoff(signum, frame):
+        # With SO_REUSEPORT the successor binds the port next to our workers.
+        if spawn_successor(shared) is not None:
+            on_stop(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_stop)
+    signal.signal(signal.SIGINT, on_stop)
+    signal.signal(signal.SIGHUP, on_reload)
+    signal.signal(signal.SIGUSR2, on_handoff)
+
+    print("[Prefork] Starting {} workers on port {} ({})".format(
+        workers, port, "SO_REUSEPORT" if reuse_port else "shared socket"))
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in children:
+            continue
+        index, started = children.pop(pid)
+        code = os.waitstatus_to_exitcode(status)
+        if state["stopping"]:
+            continue
+        print("[Prefork] Worker {} (pid {}) exited with status {}, restarting".format(index, pid, code))
+        if time.monotonic() - started < MIN_UPTIME:
+            time.sleep(MIN_UPTIME)
+        if not state["stopping"]:
+            spawn(index)
+
+    if shared is not None:
+        shared.close()
+    print("[Prefork] All workers stopped")
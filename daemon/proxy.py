@@ -25,12 +25,21 @@ Requirement:
 - response: customized :class: `Response <Response>` utilities.
 - httpadapter: :class: `HttpAdapter <HttpAdapter >` adapter for HTTP request processing.
 - dictionary: :class: `CaseInsensitiveDict <CaseInsensitiveDict>` for managing headers and cookies.
+- lifecycle: graceful drain and listening socket hand-off.
+
+Notes:
+------
+- SIGINT/SIGTERM drain the proxy: it stops accepting and lets the requests being
+  forwarded finish within ``drain_timeout`` seconds. SIGUSR2 first hands the
+  listening socket to a new process running the same command.
 
 """
 import socket
 import threading
 from .response import *
 from .httpadapter import HttpAdapter
+from .listener import create_listener, inherited_listener
+from .lifecycle import Drain, DRAIN_TIMEOUT, install_signal_handlers
 from .dictionary import CaseInsensitiveDict
 
 #: A dictionary mapping hostnames to backend IP and port tuples.
@@ -42,6 +51,27 @@ PROXY_PASS = {
 }
 
 
+def upstream_request(request):
+    """
+    Rewrite the head of a request forwarded to a backend to ask it to close the
+    connection once it answered. The end of the response is then the end of the
+    stream, whatever its framing: a body delimited by ``Content-Length`` or
+    chunked, streamed, or none at all for HEAD, 1xx, 204 and 304 responses.
+
+    :params request (str): incoming HTTP request.
+
+    :rtype str: the request with ``Connection: close`` instead of its own
+                ``Connection`` and ``Keep-Alive`` headers.
+    """
+    head, sep, body = request.partition("\r\n\r\n")
+    if not sep:
+        return request
+    lines = [line for line in head.split("\r\n")
+             if line.split(":", 1)[0].strip().lower() not in ("connection", "keep-alive")]
+    lines.append("Connection: close")
+    return "\r\n".join(lines) + "\r\n\r\n" + body
+
+
 def forward_request(host, port, request):
     """
     Forwards an HTTP request to a backend server and retrieves the response.
@@ -58,7 +88,7 @@ def forward_request(host, port, request):
 
     try:
         backend.connect((host, port))
-        backend.sendall(request.encode())
+        backend.sendall(upstream_request(request).encode())
         response = b""
         while True:
             chunk = backend.recv(4096)
@@ -76,6 +106,8 @@ def forward_request(host, port, request):
             "\r\n"
             "404 Not Found"
         ).encode('utf-8')
+    finally:
+        backend.close()
 
 
 def resolve_routing_policy(hostname, routes):
@@ -120,7 +152,7 @@ def resolve_routing_policy(hostname, routes):
 
     return proxy_host, proxy_port
 
-def handle_client(ip, port, conn, addr, routes):
+def handle_client(ip, port, conn, addr, routes, drain=None):
     """
     Handles an individual client connection by parsing the request,
     determining the target backend, and forwarding the request.
@@ -134,6 +166,25 @@ def handle_client(ip, port, conn, addr, routes):
 
     :params ip (str): IP address of the proxy server.
     :params port (int): port number of the proxy server.
+    :params conn (socket.socket): client connection socket.
+    :params addr (tuple): client address (IP, port).
+    :params routes (dict): dictionary mapping hostnames and location.
+    :params drain (Drain): open connections book-keeping of the proxy, already
+                           counting this connection, or None.
+    """
+    try:
+        forward_client(conn, addr, routes)
+    except Exception as e:
+        print("[Proxy] Error handling client {}: {}".format(addr, e))
+        conn.close()
+    finally:
+        if drain is not None:
+            drain.remove(conn)
+
+def forward_client(conn, addr, routes):
+    """
+    Forwards the request of one client connection and answers it.
+
     :params conn (socket.socket): client connection socket.
     :params addr (tuple): client address (IP, port).
     :params routes (dict): dictionary mapping hostnames and location.
@@ -171,7 +222,7 @@ def handle_client(ip, port, conn, addr, routes):
     conn.sendall(response)
     conn.close()
 
-def run_proxy(ip, port, routes):
+def run_proxy(ip, port, routes, drain_timeout=DRAIN_TIMEOUT, listener=None):
     """
     Starts the proxy server and listens for incoming connections. 
 
@@ -183,37 +234,60 @@ def run_proxy(ip, port, routes):
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
     :params routes (dict): dictionary mapping hostnames and location.
+    :params drain_timeout (float): seconds given to the requests being forwarded
+                                   once interrupted.
+    :params listener (socket.socket): already listening socket, or None to bind one.
 
     """
 
-    proxy = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    drain = Drain(drain_timeout)
+    proxy = listener
 
     try:
-        proxy.bind((ip, port))
-        proxy.listen(50)
+        if proxy is None:
+            proxy = create_listener(ip, port)
         print("[Proxy] Listening on IP {} port {}".format(ip,port))
         if routes != {}:
             print("[Proxy] Route settings {}".format(routes))
         while True:
             conn, addr = proxy.accept()
-            t = threading.Thread(target=handle_client, args=(ip, port, conn, addr, routes), daemon=True)
+            drain.add()
+            t = threading.Thread(target=handle_client, args=(ip, port, conn, addr, routes, drain), daemon=True)
             t.start()
             print("[Proxy] Started thread for client {}".format(addr))
     except socket.error as e:
       print("[Proxy] Socket error: {}".format(e))
     except KeyboardInterrupt:
-        print("\n[Proxy] Shutting down...")
+        print("\n[Proxy] Shutting down, draining connections...")
     finally:
-        proxy.close()
+        if proxy is not None:
+            proxy.close()
+        drain.start()
+        left = drain.wait()
+        if left:
+            print("[Proxy] Drain deadline reached, closing {} connections".format(left))
         print("[Proxy] Server closed")
 
-def create_proxy(ip, port, routes):
+def create_proxy(ip, port, routes, drain_timeout=DRAIN_TIMEOUT):
     """
     Entry point for launching the proxy server.
 
+    The listening socket is inherited from the predecessor process when the
+    proxy was started by a hand-off (see :mod:`daemon.lifecycle`).
+
     :params ip (str): IP address to bind the proxy server.
     :params port (int): port number to listen on.
     :params routes (dict): dictionary mapping hostnames and location.
+    :params drain_timeout (float): seconds given to the requests being forwarded
+                                   once interrupted.
     """
 
-    run_proxy(ip, port, routes)
+    listener = inherited_listener()
+    try:
+        if listener is None:
+            listener = create_listener(ip, port)
+    except OSError as e:
+        print("[Proxy] Socket error: {}".format(e))
+        return
+    install_signal_handlers(listener)
+    run_proxy(ip, port, routes, drain_timeout=drain_timeout, listener=listener)
@@ -0,0 +1,155 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.ranges
+~~~~~~~~~~~~~~~~~
+
+This module parses the ``Range`` and ``If-Range`` request headers of GET
+requests for static files, answered ``206 Partial Content`` by
+:class:`Response <Response>`, so an interrupted download resumes where it stopped
+instead of starting over.
+
+- One range is sent as the body, with a ``Content-Range`` header.
+- Several ranges are sent as a ``multipart/byteranges`` body, one part per range.
+- A range starting past the end of the file is answered ``416 Range Not
+  Satisfiable``.
+- With ``If-Range``, the ranges are only sent if the file still has the given
+  ``ETag`` or ``Last-Modified`` date; otherwise the whole file is sent.
+
+Ranges apply to the uncompressed file: a request with a ``Range`` header is not
+answered with a compressed variant. A file too large for the file cache sends its
+ranges with ``sendfile`` too.
+
+Usage Example:
+--------------
+>>> parse_ranges("bytes=0-499, -500", 10000)
+[(0, 499), (9500, 9999)]
+>>> parse_ranges("bytes=20000-", 10000)
+[]
+"""
+
+import binascii
+import os
+
+#: Largest number of ranges served for one request; past it, the whole file is sent.
+MAX_RANGES = 16
+
+
+def is_position(value):
+    """Whether a side of a range is a byte position: ASCII decimal digits only,
+    which excludes the signs, underscores and other digits ``int`` accepts."""
+    return value.isascii() and value.isdigit()
+
+
+def parse_ranges(header, length):
+    """
+    Parse a ``Range`` header against the length of the file.
+
+    :param header (str): the header value, e.g. ``bytes=0-499, 1000-``.
+    :param length (int): size of the file, in bytes.
+
+    :rtype list: the satisfiable ranges as (first, last) byte positions,
+                 inclusive, in request order; empty when none is satisfiable.
+                 None when the header is malformed, uses another unit or asks
+                 for too many ranges: it is then ignored.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        first, dash, last = item.partition('-')
+        first, last = first.strip(), last.strip()
+        if not dash or not (first or last):
+            return None
+        if not all(is_position(side) for side in (first, last) if side):
+            return None
+        if first:
+            start = int(first)
+            if last and int(last) < start:
+                return None
+            if start >= length:
+                continue
+            end = min(int(last), length - 1) if last else length - 1
+            ranges.append((start, end))
+        else:
+            suffix = int(last)
+            if suffix and length:
+                ranges.append((max(length - suffix, 0), length - 1))
+        if len(ranges) > MAX_RANGES:
+            return None
+    return ranges
+
+
+def if_range_matches(header, etag, last_modified):
+    """
+    Evaluate an ``If-Range`` header: the ranges are sent only if it matches.
+
+    :param header (str): the header value, an entity tag or a date, or None.
+    :param etag (str): the ``ETag`` of the file.
+    :param last_modified (str): its ``Last-Modified`` date.
+
+    :rtype bool: True when there is no header or it matches; an entity tag must
+                 be strong and equal, a date must be equal.
+    """
+    if header is None:
+        return True
+    header = header.strip()
+    if header.startswith('"'):
+        return header == etag
+    if header.startswith('W/'):
+        return False
+    return header == last_modified
+
+
+def content_range(first, last, length):
+    """
+    ``Content-Range`` header value of a range.
+
+    :rtype str: e.g. ``bytes 0-499/10000``.
+    """
+    return "bytes {}-{}/{}".format(first, last, length)
+
+
+def new_boundary():
+    """
+    Boundary of a ``multipart/byteranges`` body.
+
+    :rtype str: random hexadecimal digits, which the file parts cannot
+                reasonably contain at a line start after ``--``.
+    """
+    return binascii.hexlify(os.urandom(12)).decode('ascii')
+
+
+def byteranges(ranges, length, content_type, boundary):
+    """
+    Layout of a ``multipart/byteranges`` body.
+
+    :param ranges (list): the (first, last) ranges.
+    :param length (int): size of the file, in bytes.
+    :param content_type (str): ``Content-Type`` of the file.
+    :param boundary (str): the part boundary.
+
+    :rtype list: the body, as the part headers in bytes and the
+                 ``(offset, count)`` spans of the file between them.
+    """
+    parts = []
+    for first, last in ranges:
+        parts.append("\r\n--{}\r\nContent-Type: {}\r\nContent-Range: {}\r\n\r\n".format(
+            boundary, content_type, content_range(first, last, length)).encode('utf-8'))
+        parts.append((first, last - first + 1))
+    parts.append("\r\n--{}--\r\n".format(boundary).encode('utf-8'))
+    return parts
@@ -0,0 +1,546 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.reactor
+~~~~~~~~~~~~~~~~~
+
+This module provides the "reactor" backend engine, a non-blocking server built on
+the :mod:`selectors` module (epoll on Linux). One thread multiplexes accept, read
+and write readiness of every connection; only complete requests are handed to a
+small :class:`WorkerPool <WorkerPool>` which runs the route handlers and builds
+the responses.
+
+Requirements:
+--------------
+- selectors: readiness notification (epoll, kqueue or select).
+- workerpool: bounded pool of handler threads.
+- httpadapter: the class turning a raw request into a response.
+
+Notes:
+------
+- A connection never occupies a thread while it is idle, reading or writing.
+- Handler threads give their responses back to the reactor through a socketpair
+  so the selector is only touched from the reactor thread.
+- A streamed response is pulled from its route handler one part at a time, in a
+  handler thread, each time the previous part has been written.
+- ``async def`` route handlers run on the handler event loop of
+  :mod:`daemon.eventloop`; a handler thread is only busy while preparing the
+  request, not while the coroutine waits.
+- When interrupted, the reactor drains: it stops accepting, closes its idle
+  connections and keeps serving the others until they are answered or the
+  drain deadline expires.
+
+Usage Example:
+--------------
+>>> create_backend("127.0.0.1", 9000, routes={}, engine="reactor", handler_threads=4)
+
+"""
+
+import collections
+import os
+import selectors
+import socket
+import time
+from concurrent.futures import Future
+
+from .httpadapter import worker_adapter, detach_worker_adapter, KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS
+from .framing import RequestFramer, FramingError
+from .response import Response, FileResponse, next_part
+from .bodystream import body_sink
+from .workerpool import WorkerPool
+from .listener import create_listener
+from .lifecycle import DRAIN_TIMEOUT
+
+
+class Connection:
+    """
+    State of one client connection owned by the reactor.
+
+    Attributes:
+        sock (socket): the non-blocking client socket.
+        addr (tuple): the client address.
+        framer (RequestFramer): received bytes not yet handed to a handler.
+        outbuf (memoryview): encoded response bytes not yet written.
+        stream (iterator): parts of a streamed response not yet produced, or None.
+        file (FileResponse): file response whose body is being sent with
+                             ``sendfile`` once ``outbuf`` is written, or None.
+        keep_alive (bool): whether the connection stays open after the response.
+        served (int): number of requests handed to a handler so far.
+        last_active (float): monotonic time of the last read or completed write.
+    """
+
+    __slots__ = ("sock", "addr", "framer", "outbuf", "stream", "file", "keep_alive", "served", "last_active")
+
+    def __init__(self, sock, addr, body_sink=None):
+        self.sock = sock
+        self.addr = addr
+        self.framer = RequestFramer(body_sink=body_sink)
+        self.outbuf = None
+        self.stream = None
+        self.file = None
+        self.keep_alive = False
+        self.served = 0
+        self.last_active = time.monotonic()
+
+
+class Reactor:
+    """
+    The :class:`Reactor <Reactor>` event loop serving one listening socket.
+
+    Attributes:
+        ip (str): IP address of the server.
+        port (int): Port number the server is listening on.
+        routes (dict): Dictionary of route handlers.
+        pool (WorkerPool): pool running the route handlers.
+        keepalive_timeout (float): idle seconds before a persistent connection is closed.
+        max_requests (int): maximum number of requests served per connection.
+        selector (selectors.BaseSelector): readiness selector of every socket.
+        admission (AdmissionController): sheds requests when overloaded, or None.
+        connections (set): every open :class:`Connection <Connection>`.
+        draining (bool): whether the reactor stopped accepting connections.
+        body_sink (callable): framer callback streaming the bodies of streaming
+                              routes, or None.
+        config (AppConfig): settings of the app serving the routes, or None.
+    """
+
+    def __init__(self, ip, port, routes, pool,
+                 keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX_REQUESTS,
+                 admission=None, config=None):
+        """
+        Initialize a new Reactor instance.
+
+        :param ip (str): IP address of the server.
+        :param port (int): Port number the server is listening on.
+        :param routes (dict): Dictionary of route handlers.
+        :param pool (WorkerPool): started pool running the route handlers.
+        :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+        :param max_requests (int): maximum number of requests served per connection.
+        :param admission (AdmissionController): admission control, or None.
+        :param config (AppConfig): settings of the app serving the routes, or None.
+        """
+        self.ip = ip
+        self.port = port
+        self.routes = routes
+        self.pool = pool
+        self.keepalive_timeout = keepalive_timeout
+        self.max_requests = max_requests
+        self.selector = selectors.DefaultSelector()
+        self.admission = admission
+        self.connections = set()
+        self.draining = False
+        self.busy_reply = Response().build_unavailable()
+        self.body_sink = body_sink(routes)
+        self.config = config
+
+        # Responses produced by handler threads, drained by the reactor thread.
+        self._done = collections.deque()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+    def serve(self, server):
+        """
+        Run the event loop on a bound, listening socket until interrupted.
+
+        :param server (socket): the listening socket.
+        """
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, None)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self.run(server, lambda: True)
+
+    def drain(self, server, timeout=DRAIN_TIMEOUT):
+        """
+        Stop accepting connections, close the idle ones and keep serving the
+        others until they are all answered or the deadline expires.
+
+        :param server (socket): the listening socket.
+        :param timeout (float): seconds given to the open connections.
+
+        :rtype int: number of connections still open at the deadline.
+        """
+        self.draining = True
+        try:
+            self.selector.unregister(server)
+        except (KeyError, ValueError):
+            pass
+        idle = [conn for conn in self.connections
+                if conn.outbuf is None and conn.file is None and not conn.framer.pending
+                and self.selector.get_map().get(conn.sock) is not None]
+        for conn in idle:
+            self.close(conn)
+
+        deadline = time.monotonic() + timeout
+        self.run(server, lambda: self.connections and time.monotonic() < deadline)
+        return len(self.connections)
+
+    def run(self, server, running):
+        """
+        Dispatch readiness events while ``running()`` is true.
+
+        :param server (socket): the listening socket.
+        :param running (callable): loop condition, checked after every select.
+        """
+        next_sweep = time.monotonic() + 1.0
+        while running():
+            for key, mask in self.selector.select(timeout=1.0):
+                if key.fileobj is server:
+                    self.accept(server)
+                elif key.fileobj is self._wake_r:
+                    self.collect()
+                elif mask & selectors.EVENT_READ:
+                    self.read(key.data)
+                elif mask & selectors.EVENT_WRITE:
+                    self.write(key.data)
+            if time.monotonic() >= next_sweep:
+                self.sweep()
+                next_sweep = time.monotonic() + 1.0
+
+    def sweep(self):
+        """
+        Close the connections that stayed idle longer than ``keepalive_timeout``.
+        Connections waiting for a handler are not registered, so never swept.
+        """
+        deadline = time.monotonic() - self.keepalive_timeout
+        idle = [key.data for key in self.selector.get_map().values()
+                if isinstance(key.data, Connection)
+                and key.events == selectors.EVENT_READ
+                and key.data.last_active < deadline]
+        for conn in idle:
+            self.close(conn)
+
+    def accept(self, server):
+        """
+        Accept every pending connection and watch it for reads.
+
+        :param server (socket): the listening socket.
+        """
+        while True:
+            try:
+                sock, addr = server.accept()
+            except BlockingIOError:
+                return
+            sock.setblocking(False)
+            conn = Connection(sock, addr, self.body_sink)
+            self.connections.add(conn)
+            self.selector.register(sock, selectors.EVENT_READ, conn)
+
+    def read(self, conn):
+        """
+        Read what is available on a connection and hand the request to the pool
+        once it is complete.
+
+        :param conn (Connection): the readable connection.
+        """
+        try:
+            received = conn.framer.recv_into(conn.sock)
+        except BlockingIOError:
+            return
+        except OSError:
+            received = 0
+        if not received:
+            self.close(conn)
+            return
+        conn.last_active = time.monotonic()
+        self.dispatch(conn)
+
+    def dispatch(self, conn):
+        """
+        Hand the first request buffered on a connection to the pool, if it is
+        complete.
+
+        :param conn (Connection): a connection registered for reads.
+        """
+        try:
+            msg = conn.framer.next_request()
+        except FramingError as e:
+            print("[Reactor] Rejecting request from {}: {}".format(conn.addr, e))
+            self.selector.unregister(conn.sock)
+            conn.keep_alive = False
+            self.send(conn, Response().build_error(e.status_code))
+            return
+        if msg is None:
+            return
+        conn.served += 1
+
+        # Stop watching the socket while a handler owns the request.
+        self.selector.unregister(conn.sock)
+        conn.keep_alive = False
+        admission = self.admission
+        if admission is not None and not admission.admit():
+            print("[Reactor] Overloaded, shedding request from {}".format(conn.addr))
+            self.send(conn, admission.reply)
+            return
+        if not self.pool.submit(self.handle, conn, msg, time.monotonic()):
+            if admission is not None:
+                admission.release()
+            print("[Reactor] Worker pool full, refusing client {}".format(conn.addr))
+            self.send(conn, self.busy_reply)
+
+    def handle(self, conn, msg, queued_at):
+        """
+        Handler thread job: build the response of one request and give it back
+        to the reactor thread.
+
+        The handler thread does not wait for a coroutine route handler: its
+        response is given back by :meth:`finish` once the handler event loop
+        ran it.
+
+        :param conn (Connection): the connection the request came from.
+        :param msg (Message): the request parsed by the framer.
+        :param queued_at (float): ``time.monotonic()`` of the submission to the pool.
+        """
+        keep_alive = False
+        admission = self.admission
+        pending = None
+        try:
+            if admission is not None and admission.expired(queued_at):
+                print("[Reactor] Overloaded, shedding request from {}".format(conn.addr))
+                response = admission.reply
+            else:
+                daemon = worker_adapter(self.ip, self.port, self.routes, config=self.config)
+                daemon.conn = conn.sock
+                daemon.connaddr = conn.addr
+                keep_alive = conn.served < self.max_requests and not self.draining
+                response = daemon.handle_request(msg, self.routes, keep_alive=keep_alive)
+                keep_alive = daemon.request.keep_alive
+                if isinstance(response, Future):
+                    # The adapter stays with the request until the coroutine returns
+                    detach_worker_adapter(daemon)
+                    pending = response
+        except Exception as e:
+            print("[Reactor] Error handling client {}: {}".format(conn.addr, e))
+            response = None
+        finally:
+            if admission is not None and pending is None:
+                admission.release()
+
+        if pending is not None:
+            pending.add_done_callback(lambda future: self.finish(conn, daemon, future))
+            return
+        stream = None
+        if response is not None and not isinstance(response, (bytes, bytearray)):
+            stream = response
+            response = next_part(stream)
+        self.complete(conn, response, keep_alive, stream)
+
+    def finish(self, conn, daemon, future):
+        """
+        Give the response of a coroutine route handler back to the reactor
+        thread. Called on the handler event loop, so the first part of a
+        streamed response is left to a handler thread (see :meth:`written`).
+
+        :param conn (Connection): the connection the request came from.
+        :param daemon (HttpAdapter): the adapter of the request.
+        :param future (Future): the result of :meth:`HttpAdapter.dispatch`.
+        """
+        try:
+            response = future.result()
+        except Exception as e:
+            print("[Reactor] Error handling client {}: {}".format(conn.addr, e))
+            response = None
+        finally:
+            if self.admission is not None:
+                self.admission.release()
+
+        keep_alive = daemon.request.keep_alive
+        if response is None or isinstance(response, (bytes, bytearray)):
+            self.complete(conn, response, keep_alive)
+        else:
+            self.complete(conn, b"", keep_alive, response)
+
+    def pull(self, conn):
+        """
+        Handler thread job: produce the next part of the streamed response of a
+        connection and give it back to the reactor thread.
+
+        :param conn (Connection): a connection whose previous part was written.
+        """
+        part = next_part(conn.stream)
+        self.complete(conn, part, conn.keep_alive, conn.stream if part else None)
+
+    def complete(self, conn, data, keep_alive, stream=None):
+        """
+        Give bytes to write back to the reactor thread and wake it up.
+
+        :param conn (Connection): the connection to answer.
+        :param data (bytes): bytes to write, b"" for none, None to close the connection.
+        :param keep_alive (bool): whether the connection stays open after the response.
+        :param stream (iterator): parts of the response still to produce, or None.
+        """
+        self._done.append((conn, data, keep_alive, stream))
+        try:
+            self._wake_w.send(b"\0")
+        except BlockingIOError:
+            # The reactor already has pending wake-ups to process.
+            pass
+
+    def collect(self):
+        """
+        Drain the wake-up socket and start writing every finished response.
+        """
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        while self._done:
+            conn, data, keep_alive, stream = self._done.popleft()
+            if data is None:
+                self.close(conn)
+                continue
+            conn.keep_alive = keep_alive
+            conn.stream = stream
+            if data and isinstance(stream, FileResponse) and hasattr(os, 'sendfile'):
+                # Header produced: the body goes out with sendfile from write()
+                conn.file, conn.stream = stream, None
+            if data:
+                self.send(conn, data)
+            else:
+                self.written(conn)
+
+    def send(self, conn, response):
+        """
+        Queue an encoded response on a connection that is not registered in the
+        selector and watch it for write readiness.
+
+        :param conn (Connection): the connection to answer.
+        :param response (bytes): the encoded HTTP response.
+        """
+        conn.outbuf = memoryview(response)
+        self.selector.register(conn.sock, selectors.EVENT_WRITE, conn)
+
+    def write(self, conn):
+        """
+        Write as much of the pending response as the socket accepts, then the
+        body of a file response, and continue with :meth:`written` once it has
+        been fully sent.
+
+        :param conn (Connection): the writable connection.
+        """
+        if conn.outbuf is not None:
+            try:
+                sent = conn.sock.send(conn.outbuf)
+            except BlockingIOError:
+                return
+            except OSError:
+                self.close(conn)
+                return
+            conn.outbuf = conn.outbuf[sent:]
+            if conn.outbuf:
+                return
+            conn.outbuf = None
+        if conn.file is not None:
+            try:
+                if not conn.file.send_some(conn.sock):
+                    return
+            except BlockingIOError:
+                return
+            except OSError as e:
+                print("[Reactor] Error sending file to {}: {}".format(conn.addr, e))
+                self.close(conn)
+                return
+            conn.file = None
+        self.selector.unregister(conn.sock)
+        self.written(conn)
+
+    def written(self, conn):
+        """
+        Continue once the pending bytes of a connection that is not registered
+        in the selector have been written: pull the next part of a streamed
+        response, go back to reading, or close the connection when it is not
+        persistent.
+
+        :param conn (Connection): the connection.
+        """
+        if conn.stream is not None:
+            if not self.pool.submit(self.pull, conn):
+                print("[Reactor] Worker pool full, cutting stream to {}".format(conn.addr))
+                self.close(conn)
+            return
+        if not conn.keep_alive or self.draining:
+            self.close(conn)
+            return
+        conn.last_active = time.monotonic()
+        self.selector.register(conn.sock, selectors.EVENT_READ, conn)
+        # A pipelined request may already be buffered.
+        self.dispatch(conn)
+
+    def close(self, conn):
+        """
+        Stop watching a connection and close its socket.
+
+        :param conn (Connection): the connection to close.
+        """
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        self.connections.discard(conn)
+        if conn.file is not None:
+            conn.file.close()
+            conn.file = None
+        conn.sock.close()
+
+
+def run_reactor_backend(ip, port, routes, handler_threads=4, queue_size=256,
+                        keepalive_timeout=KEEPALIVE_TIMEOUT, max_requests=KEEPALIVE_MAX_REQUESTS,
+                        listener=None, admission=None, drain_timeout=DRAIN_TIMEOUT, config=None):
+    """
+    Starts the reactor backend server and blocks until it is interrupted.
+
+    :param ip (str): IP address to bind the server.
+    :param port (int): Port number to listen on.
+    :param routes (dict): Dictionary of route handlers.
+    :param handler_threads (int): Number of threads running the route handlers.
+    :param queue_size (int): Maximum number of complete requests waiting for a handler.
+    :param keepalive_timeout (float): idle seconds before a persistent connection is closed.
+    :param max_requests (int): maximum number of requests served per connection.
+    :param listener (socket.socket): already listening socket to serve, e.g. one
+                                     shared by worker processes. Defaults to binding
+                                     a new one.
+    :param admission (AdmissionController): sheds requests over its thresholds, or
+                                            None to serve everything. The time spent
+                                            waiting for a handler thread counts as
+                                            queue wait.
+    :param drain_timeout (float): seconds given to open connections once interrupted.
+    :param config (AppConfig): settings of the app serving the routes, or None.
+    """
+    pool = WorkerPool(size=handler_threads, queue_size=queue_size, overflow="reject", name="Reactor")
+    reactor = Reactor(ip, port, routes, pool, keepalive_timeout=keepalive_timeout, max_requests=max_requests,
+                      admission=admission, config=config)
+    server = listener
+
+    try:
+        if server is None:
+            server = create_listener(ip, port)
+        pool.start()
+        print("[Reactor] Listening on port {} with {} handler threads".format(port, handler_threads))
+        if routes != {}:
+            print("[Reactor] Route settings {}".format(routes))
+        reactor.serve(server)
+    except socket.error as e:
+        print("[Reactor] Socket error: {}".format(e))
+    except KeyboardInterrupt:
+        print("\n[Reactor] Shutting down, draining {} connections...".format(len(reactor.connections)))
+        left = reactor.drain(server, drain_timeout)
+        if left:
+            print("[Reactor] Drain deadline reached, closing {} connections".format(left))
+    finally:
+        if server is not None:
+            server.close()
+        print("[Reactor] Handler pool stats {}".format(pool.stats()))
+        if admission is not None:
+            print("[Reactor] Admission stats {}".format(admission.stats()))
+        pool.shutdown(wait=False)
+        print("[Reactor] Server closed")
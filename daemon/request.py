@@ -16,12 +16,97 @@ daemon.request
 
 This module provides a Request object to manage and persist 
 request settings (cookies, auth, proxies).
+
+The query string, the cookies and the body of a request are parsed lazily, on
+first access to ``query``, ``cookies``, ``body`` (decoded to ``str``) and
+``json``, and at most once. A route
+handler declaring a ``query``, ``cookies`` or ``json`` parameter receives the
+parsed value in it, next to ``headers`` and ``body``.
 """
 from .dictionary import CaseInsensitiveDict
+from .framing import decode_chunked, unchunk_headers
+from .router import match_route
 from json import dumps
+from .codec import loads
+from .appconfig import DEFAULT_CONFIG
+import inspect
 import urllib.parse
 import base64
 
+#: Parsed request parts a route handler can receive by declaring a parameter of that name.
+REQUEST_PARAMS = ("query", "cookies", "json")
+
+
+class InvalidJSON(ValueError):
+    """
+    Raised when the JSON body of a request is accessed but cannot be decoded.
+    """
+
+
+def route_params(func):
+    """
+    Tell which parsed request parts a route handler wants.
+
+    :param func (function): the route handler.
+
+    :rtype tuple: names among :data:`REQUEST_PARAMS` declared as parameters of ``func``.
+    """
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return ()
+    return tuple(name for name in REQUEST_PARAMS if name in params)
+
+
+def accepts_argument(func, name):
+    """
+    Tell whether a route handler can be called with the keyword argument ``name``.
+
+    :param func (function): the route handler.
+    :param name (str): the argument name.
+
+    :rtype bool: True if ``func`` declares ``name`` or takes ``**kwargs``.
+    """
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return True
+    param = params.get(name)
+    if param is not None:
+        return param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY)
+    return any(p.kind == p.VAR_KEYWORD for p in params.values())
+
+
+def parse_cookies(header):
+    """
+    Parse a ``Cookie`` header value.
+
+    :param header (str): e.g. "session_id=abc123; auth=true".
+
+    :rtype dict: cookie values by lower-cased name. Pairs without ``=`` are
+                 ignored.
+    """
+    cookies = {}
+    for pair in header.split(';'):
+        key, sep, value = pair.partition('=')
+        key = key.strip()
+        if sep and key:
+            cookies[key.lower()] = value.strip()
+    return cookies
+
+
+def parse_query(query_string):
+    """
+    Parse a URL query string.
+
+    :param query_string (str): e.g. "channel=general&limit=50".
+
+    :rtype dict: decoded values by decoded name; the last value wins when a
+                 name is repeated.
+    """
+    return dict(urllib.parse.parse_qsl(query_string, keep_blank_values=True))
+
+
 class Request(): # parse and prepare
     """The fully mutable "class" `Request <Request>` object,
     containing the exact bytes that will be sent to the server.
@@ -46,43 +131,104 @@ class Request(): # parse and prepare
         "body",
         "reason",
         "cookies",
-        "body",
+        "query",
+        "json",
+        "body_bytes",
         "routes",
+        "config",
         "hook",
     ]
 
+    __slots__ = (
+        "method",
+        "url",
+        "version",
+        "headers",
+        "path",
+        "query_string",
+        "_cookies",
+        "_query",
+        "_json",
+        "_json_parsed",
+        "_body",
+        "body_bytes",
+        "routes",
+        "config",
+        "hook",
+        "path_params",
+        "allowed_methods",
+        "timings",
+        "cache_key",
+        "route_result",
+        "keep_alive",
+    )
+
     def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget the previous request, so the object can be reused for the
+        next one without allocating a new one."""
         #: HTTP verb to send to the server.
         self.method = None
         #: HTTP URL to send the request to.
         self.url = None
+        #: HTTP version of the request line.
+        self.version = None
         #: dictionary of HTTP headers.
         self.headers = None
         #: HTTP path
         self.path = None        
-        # The cookies set used to create Cookie header
-        self.cookies = None
-        #: request body to send to the server.
-        self.body = None
+        #: Query string of the URL, without the "?"
+        self.query_string = ""
+        # Parsed on first access of the cookies, query and json properties
+        self._cookies = None
+        self._query = None
+        self._json = None
+        self._json_parsed = False
+        # Decoded from body_bytes on first access of the body property
+        self._body = None
+        #: request body as received, in bytes.
+        self.body_bytes = b""
         #: Routes
-        self.routes = {}
+        self.routes = None
+        #: Settings of the app serving the request
+        self.config = DEFAULT_CONFIG
         #: Hook point for routed mapped-path
         self.hook = None
+        #: Path parameters of the matched route, by name
+        self.path_params = None
+        #: Methods the path has routes for when none matches the request method
+        self.allowed_methods = ()
+        #: Time spent in every middleware stage and the handler, or None
+        self.timings = None
+        #: Response cache key, tag versions and ttl of a missed cached route, or None
+        self.cache_key = None
+        #: Result of the route handler, for the response builder
+        self.route_result = None
+        #: Whether the client wants the connection kept open after this request
+        self.keep_alive = False
 
     def extract_request_line(self, request):
         try:
             lines = request.splitlines()
             first_line = lines[0]
             method, path, version = first_line.split()
-
-            if path == '/':
-                path = '/index.html'
-            if path == '/test': 
-                path = '/test.html'
+            path, _, self.query_string = path.partition('?')
+            path = self.prepare_path(path)
         except Exception:
             return None, None, None
 
         return method, path, version
+
+    @staticmethod
+    def prepare_path(path):
+        """Maps the short paths of the static pages to their files."""
+        if path == '/':
+            path = '/index.html'
+        if path == '/test': 
+            path = '/test.html'
+        return path
              
     def prepare_headers(self, request):
         """Prepares the given HTTP headers."""
@@ -96,6 +242,17 @@ class Request(): # parse and prepare
                 headers[key.lower()] = val
         return headers
 
+    def prepare_keep_alive(self, version, headers):
+        """Tells whether the connection persists after this request.
+
+        HTTP/1.1 connections are persistent unless the client sends
+        ``Connection: close``; HTTP/1.0 ones only with ``Connection: keep-alive``.
+        """
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            return 'close' not in connection
+        return 'keep-alive' in connection
+
     def prepare(self, request, routes=None):
         """Prepares the entire request with the given parameters."""
 
@@ -105,23 +262,46 @@ class Request(): # parse and prepare
         
         self.headers = self.prepare_headers(request)
         
-        cookies = self.headers.get('cookie', '') # "session_id=abc123; auth=true"
-        cookies_mp = {}
-        if cookies:
-            for i in cookies.split('; '): 
-                key, value = i.split('=', 1)
-                cookies_mp[key.lower()] = value
-        self.cookies = cookies_mp # {'session_id': 'abc123', 'auth': 'true'}
-        
         if self.method in ['POST', 'PUT']:
             body_start = request.find('\r\n\r\n')
             self.body = request[body_start + 4:] if body_start != -1 else ''
+            if self.headers.get('transfer-encoding', '').lower().endswith('chunked'):
+                body = decode_chunked(self.body.encode('utf-8'))
+                unchunk_headers(self.headers, len(body))
+                self.body = body.decode('utf-8', errors='replace')
         else:
             self.body = ''
 
+        self.prepare_route(routes)
+
+    def prepare_message(self, message, routes=None):
+        """Prepares the request from a :class:`Message <Message>` parsed by the
+        framer, without decoding and splitting the raw request again."""
+
+        self.method = message.method
+        path, _, self.query_string = message.target.partition('?')
+        self.path = self.prepare_path(path)
+        self.version = message.version
+        print(f"[Request] {self.method} path {self.path} version {self.version}")
+
+        self.headers = message.headers
+        if not isinstance(message.body, (bytes, bytearray)):
+            # Streamed to a RequestBody for a route registered with stream=True
+            self.body = message.body
+        else:
+            self.body_bytes = message.body
+
+        self.prepare_route(routes)
+
+    def prepare_route(self, routes):
+        """Derives the connection and route handler from the parsed request
+        line and headers."""
+
+        self.keep_alive = self.prepare_keep_alive(self.version, self.headers)
+
         if not routes == {}: #{('POST', '/login'): login_function, ('GET', '/hello'): hello_function}
             self.routes = routes
-            self.hook = routes.get((self.method, self.path))
+            self.hook, self.path_params, self.allowed_methods = match_route(routes, self.method, self.path)
         if self.hook is not None: 
             print(f"[Request] Handler founded for {self.method} - {self.path}")
         else: 
@@ -129,6 +309,66 @@ class Request(): # parse and prepare
 
         return
 
+    @property
+    def cookies(self):
+        """Cookies sent by the client, by lower-cased name, parsed on first access."""
+        if self._cookies is None:
+            self._cookies = parse_cookies(self.headers.get('cookie', '')) if self.headers else {}
+        return self._cookies # {'session_id': 'abc123', 'auth': 'true'}
+
+    @cookies.setter
+    def cookies(self, value):
+        self._cookies = value
+
+    @property
+    def query(self):
+        """Query string parameters of the URL, parsed on first access."""
+        if self._query is None:
+            self._query = parse_query(self.query_string)
+        return self._query
+
+    @property
+    def body(self):
+        """The body of a POST or PUT request as ``str``, decoded from
+        ``body_bytes`` on first access (UTF-8, else latin-1); empty for other
+        methods. A :class:`RequestBody <RequestBody>` for a streaming route."""
+        if self._body is None:
+            if self.body_bytes and self.method in ('POST', 'PUT'):
+                try:
+                    self._body = self.body_bytes.decode('utf-8')
+                except UnicodeDecodeError:
+                    self._body = self.body_bytes.decode('latin-1')  # Fallback encoding
+            else:
+                self._body = ''
+        return self._body
+
+    @body.setter
+    def body(self, value):
+        self._body = value
+
+    @property
+    def json(self):
+        """The body decoded from JSON on first access, None for an empty body.
+
+        :raises InvalidJSON: If the body is not valid JSON.
+        """
+        if not self._json_parsed:
+            body = self._body
+            if hasattr(body, 'read'):
+                # Streamed body of a stream=True route
+                body = body.read()
+            elif self.body_bytes:
+                # Decode the received bytes, not a str copy
+                body = self.body_bytes
+            elif body is None:
+                body = self.body
+            try:
+                self._json = loads(body) if body else None
+            except (ValueError, UnicodeDecodeError) as e:
+                raise InvalidJSON("Invalid JSON body: {}".format(e))
+            self._json_parsed = True
+        return self._json
+
     def prepare_body(self, data, files, json=None): # for POST/PUT, para are json>files>data
         """
         prepare_body(data={'user': 'admin', 'pass': '123'}, files=None, json=None)
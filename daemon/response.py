@@ -18,32 +18,283 @@ This module provides a :class: `Response <Response>` object to manage and persis
 response settings (cookies, auth, proxies), and to construct HTTP responses
 based on incoming requests. 
 
-The current version supports MIME type detection, content loading and header formatting
+The current version supports MIME type detection, content loading and header formatting.
+
+A route handler returning an iterator (e.g. a generator) instead of a dict gets a
+streamed response: every item it yields is sent as one chunk of a
+``Transfer-Encoding: chunked`` body as soon as it is produced, so large or
+incrementally generated payloads are never fully materialized. Items may be
+``bytes``, ``str`` or JSON-serializable values. HTTP/1.0 clients get the same
+bytes unchunked, delimited by closing the connection.
 """
 from daemon.request import * 
 import datetime
+import itertools
 import os
+import time
 import mimetypes
 from .dictionary import CaseInsensitiveDict
 import urllib.parse
-import json
+from collections.abc import Iterator
+from .middleware import server_timing
+from .offload import EncodedJSON
+from .cache import CacheEntry
+from .filecache import FileCache
+from .conditional import (make_etag, file_etag, http_date, is_not_modified,
+                          DEFAULT_CACHE_CONTROL, CONDITIONAL_METHODS)
+from .compression import compress, negotiate, variant_etag
+from .codec import dumps, iterencode, is_large
+from .ranges import parse_ranges, if_range_matches, content_range, new_boundary, byteranges
 BASE_DIR = os.path.dirname(os.path.abspath(__file__)) + "/../"
 HTTP_REASON = {
     200: "OK",
     201: "Created",
     204: "No Content",
+    206: "Partial Content",
     301: "Moved Permanently",
     302: "Found",
+    304: "Not Modified",
     400: "Bad Request",
     401: "Unauthorized",
     403: "Forbidden",
     404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    416: "Range Not Satisfiable",
+    431: "Request Header Fields Too Large",
     500: "Internal Server Error",
+    503: "Service Unavailable",
 }
 VALID_USERNAME = "admin"
 VALID_PASSWORD = "password"
 AUTH_COOKIE_NAME = "auth"
 AUTH_COOKIE_VALUE = "true"
+#: Elapsed time of a response that was not timed, shared by every response.
+NO_ELAPSED = datetime.timedelta(0)
+#: Terminating zero-size chunk of a chunked body, without trailers.
+LAST_CHUNK = b"0\r\n\r\n"
+#: Cache of the static files and error pages of routes without their own.
+STATIC_FILES = FileCache()
+#: Size of the reads of a file response sent without ``sendfile``, in bytes.
+FILE_CHUNK_SIZE = 64 * 1024
+#: CORS headers of every response, after ``Access-Control-Allow-Origin``.
+CORS_HEADERS = ("Access-Control-Allow-Methods: GET, POST, PUT, DELETE, OPTIONS\r\n"
+                "Access-Control-Allow-Headers: Content-Type, Authorization, X-Requested-With\r\n"
+                "Access-Control-Allow-Credentials: true\r\n")
+#: Status line and ``Content-Type`` of the response headers, by status code and
+#: content type.
+HEADER_TEMPLATES = {}
+#: Largest number of header templates kept.
+HEADER_TEMPLATES_MAX = 256
+#: Second and ``Date`` header value of the last formatted date.
+_date = (0, "")
+#: Response headers copied as they are from ``Response.headers`` when set.
+OPTIONAL_HEADERS = ("ETag", "Last-Modified", "Content-Encoding", "Vary",
+                    "Accept-Ranges", "Content-Range")
+
+
+def encode_chunk(data):
+    """
+    Frame data as one chunk of a ``Transfer-Encoding: chunked`` body.
+
+    :param data (bytes): non-empty chunk data.
+
+    :rtype bytes: the chunk-size line, the data and its CRLF.
+    """
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+def encode_part(part):
+    """
+    Encode one item yielded by a streaming route handler.
+
+    :param part (bytes | str | object): raw bytes, text, or a JSON-serializable value.
+
+    :rtype bytes: the encoded item.
+    """
+    if isinstance(part, (bytes, bytearray, memoryview)):
+        return bytes(part)
+    if isinstance(part, str):
+        return part.encode('utf-8')
+    return dumps(part)
+
+
+def header_template(status_code, content_type):
+    """
+    Start of a response header: status line and ``Content-Type``, formatted
+    once per status code and content type.
+
+    :param status_code (int): HTTP status code.
+    :param content_type (str): the ``Content-Type``.
+
+    :rtype str: the header lines, each ending with CRLF.
+    """
+    key = (status_code, content_type)
+    template = HEADER_TEMPLATES.get(key)
+    if template is None:
+        template = "HTTP/1.1 {} {}\r\nContent-Type: {}\r\n".format(
+            status_code, HTTP_REASON.get(status_code, "Unknown"), content_type)
+        if len(HEADER_TEMPLATES) >= HEADER_TEMPLATES_MAX:
+            # e.g. multipart/byteranges, with a boundary per response
+            HEADER_TEMPLATES.clear()
+        HEADER_TEMPLATES[key] = template
+    return template
+
+
+def date_header():
+    """
+    Value of the ``Date`` response header, formatted at most once per second.
+
+    :rtype str: the current date, e.g. ``Tue, 15 Nov 1994 08:12:31 GMT``.
+    """
+    global _date
+    now = int(time.time())
+    date = _date
+    if date[0] != now:
+        date = _date = (now, http_date(now))
+    return date[1]
+
+
+def next_part(stream):
+    """
+    Produce the next encoded part of a streamed response, running the route
+    handler until its next item. Engines call this from a thread that may block.
+
+    :param stream (iterator): the response returned by
+                              :meth:`Response.build_stream_response`.
+
+    :rtype bytes: the next bytes to send, b"" once the response is complete, or
+                  None when the handler failed half-way: the response is then cut
+                  short and the connection must be closed.
+    """
+    try:
+        return next(stream, b"")
+    except Exception as e:
+        print("[Response] Error in streaming route handler: {}".format(e))
+        return None
+
+
+class FileResponse:
+    """
+    Response whose body is read from a file too large for the file cache, sent
+    from the page cache of the kernel straight to the socket with ``sendfile``,
+    without being read into memory.
+
+    The body is a list of parts, each either bytes held in memory or an
+    ``(offset, count)`` span of the file: the whole file, one byte range, or the
+    ranges of a ``multipart/byteranges`` body with their part headers.
+
+    Engines holding a socket call :meth:`sendfile` (blocking) or
+    :meth:`send_some` (non-blocking). Iterating over it instead yields the
+    header, then the body by chunks of at most ``FILE_CHUNK_SIZE`` bytes, like a
+    streamed response: the fallback for transports without ``sendfile``. Either
+    way the memory used does not depend on the file size. The file is closed once
+    sent.
+
+    Attributes:
+        header (bytes): the encoded response header.
+        file (file): the open file.
+        parts (list): the body, as bytes and ``(offset, count)`` file spans.
+    """
+
+    __slots__ = ("header", "file", "parts", "_index", "_done", "_header_sent")
+
+    def __init__(self, header, file, parts):
+        self.header = header
+        self.file = file
+        self.parts = parts
+        self._index = 0
+        self._done = 0
+        self._header_sent = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self._header_sent:
+            self._header_sent = True
+            return self.header
+        while self._index < len(self.parts):
+            part = self.parts[self._index]
+            if isinstance(part, bytes):
+                data = part[self._done:]
+            else:
+                offset, count = part
+                self.file.seek(offset + self._done)
+                data = self.file.read(min(FILE_CHUNK_SIZE, count - self._done))
+                if not data:
+                    self.close()
+                    raise OSError("file {} truncated while sent".format(self.file.name))
+            self.advance(len(data))
+            if data:
+                return data
+        self.close()
+        raise StopIteration
+
+    def advance(self, sent):
+        """Account for bytes of the current part sent."""
+        part = self.parts[self._index]
+        self._done += sent
+        if self._done >= (len(part) if isinstance(part, bytes) else part[1]):
+            self._index += 1
+            self._done = 0
+
+    def sendfile(self, sock):
+        """
+        Send the header, if not sent yet, then the body on a blocking socket.
+
+        :param sock (socket): the client socket.
+        """
+        try:
+            if not self._header_sent:
+                self._header_sent = True
+                sock.sendall(self.header)
+            while self._index < len(self.parts):
+                part = self.parts[self._index]
+                if isinstance(part, bytes):
+                    sock.sendall(part[self._done:])
+                    sent = len(part) - self._done
+                else:
+                    offset, count = part
+                    sent = sock.sendfile(self.file, offset + self._done, count - self._done)
+                    if not sent:
+                        raise OSError("file {} truncated while sent".format(self.file.name))
+                self.advance(sent)
+        finally:
+            self.close()
+
+    def send_some(self, sock):
+        """
+        Send as much of the body as a non-blocking socket accepts, once the
+        header was sent.
+
+        :param sock (socket): the client socket.
+
+        :rtype bool: True once the whole body has been sent.
+
+        :raises BlockingIOError: If the socket is not writable.
+        :raises OSError: If the file shrank or the socket failed.
+        """
+        while self._index < len(self.parts):
+            part = self.parts[self._index]
+            if isinstance(part, bytes):
+                sent = sock.send(memoryview(part)[self._done:])
+            else:
+                offset, count = part
+                sent = os.sendfile(sock.fileno(), self.file.fileno(), offset + self._done, count - self._done)
+                if not sent:
+                    raise OSError("file {} truncated while sent".format(self.file.name))
+            self.advance(sent)
+        self.close()
+        return True
+
+    def close(self):
+        """
+        Close the file.
+        """
+        self.file.close()
+
+
 class Response():   
     """The :class:`Response <Response>` object, which contains a
     server's response to an HTTP request.
@@ -93,6 +344,22 @@ class Response():
     ]
 
 
+    __slots__ = (
+        "_content",
+        "_header",
+        "_content_consumed",
+        "_next",
+        "_cookies",
+        "status_code",
+        "headers",
+        "url",
+        "encoding",
+        "history",
+        "reason",
+        "elapsed",
+        "request",
+    )
+
     def __init__(self, request=None):
         """
         Initializes a new :class:`Response <Response>` object.
@@ -100,17 +367,28 @@ class Response():
         : params request : The originating request object.
         """
 
+        #: Case-insensitive Dictionary of Response Headers.
+        #: For example, ``headers['content-type']`` will return the
+        #: value of a ``'Content-Type'`` response header.
+        self.headers = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the previous response, so the object can be reused for the next
+        request without allocating a new one.
+        """
+
         self._content = False
+        self._header = None
         self._content_consumed = False
         self._next = None
+        self._cookies = None
 
         #: Integer Code of responded HTTP Status, e.g. 404 or 200.
         self.status_code = None
 
-        #: Case-insensitive Dictionary of Response Headers.
-        #: For example, ``headers['content-type']`` will return the
-        #: value of a ``'Content-Type'`` response header.
-        self.headers = {}
+        self.headers.clear()
 
         #: URL location of Response.
         self.url = None
@@ -118,23 +396,31 @@ class Response():
         #: Encoding to decode with when accessing response text.
         self.encoding = None
 
-        #: A list of :class:`Response <Response>` objects from
+        #: A sequence of :class:`Response <Response>` objects from
         #: the history of the Request.
-        self.history = []
+        self.history = ()
 
         #: Textual reason of responded HTTP Status, e.g. "Not Found" or "OK".
         self.reason = None
 
-        #: A of Cookies the response headers.
-        self.cookies = CaseInsensitiveDict()
-
         #: The amount of time elapsed between sending the request
-        self.elapsed = datetime.timedelta(0)
+        self.elapsed = NO_ELAPSED
 
         #: The :class:`PreparedRequest <PreparedRequest>` object to which this
         #: is a response.
         self.request = None
 
+    @property
+    def cookies(self):
+        """A of Cookies the response headers, created on first access."""
+        if self._cookies is None:
+            self._cookies = CaseInsensitiveDict()
+        return self._cookies
+
+    @cookies.setter
+    def cookies(self, value):
+        self._cookies = value
+
     def parse_post_body(self, body): 
         """
         Parse URL-encoded POST body into dictionary.
@@ -208,8 +494,7 @@ class Response():
             filepath = os.path.join(BASE_DIR+ "www/", "index.html")
             
             try:
-                with open(filepath,'rb') as f: 
-                    content =f.read()
+                content = self.read_file(filepath, request)
 
                 self.status_code = 200
                 self._content = content
@@ -231,9 +516,7 @@ class Response():
             filepath = os.path.join(BASE_DIR+ "www/errors/" , "401.html")
 
             try:
-                with open(filepath,'rb') as f: 
-                    content =f.read()
-                self._content = content
+                self._content = self.read_file(filepath, request)
             except FileNotFoundError:
                 self._content = b"401 Unauthorized"
 
@@ -257,9 +540,7 @@ class Response():
         filepath = os.path.join(BASE_DIR+ "www/errors/" , "401.html")
 
         try:
-            with open(filepath,'rb') as f: 
-                content =f.read()
-            self._content = content
+            self._content = self.read_file(filepath, request)
         except FileNotFoundError:
             # Fallback content if 401.html doesn't exist
             self._content = b"""<!DOCTYPE html>
@@ -288,9 +569,8 @@ class Response():
             fmt_header += f"{key}: {value}\r\n"
         # Add CORS headers
         fmt_header += f"Access-Control-Allow-Origin: {origin}\r\n"
-        fmt_header += "Access-Control-Allow-Methods: GET, POST, PUT, DELETE, OPTIONS\r\n"
-        fmt_header += "Access-Control-Allow-Headers: Content-Type, Authorization, X-Requested-With\r\n"
-        fmt_header += "Access-Control-Allow-Credentials: true\r\n"
+        fmt_header += CORS_HEADERS
+        fmt_header += f"Connection: {self.connection_header(request)}\r\n"
         fmt_header += "\r\n"
 
         return str(fmt_header).encode('utf-8') + self._content
@@ -365,99 +645,198 @@ class Response():
         return base_dir
 
 
-    def build_content(self, path, base_dir):
+    def file_cache(self, request=None):
+        """
+        Cache of the static files of the app serving a request (see
+        :mod:`daemon.filecache`), else the default one.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype FileCache: the cache.
+        """
+        files = request.config.files if request is not None else None
+        return files if files is not None else STATIC_FILES
+
+    def cache_control(self, request):
+        """
+        ``Cache-Control`` value of the response to a request, from the
+        per-path policies of the app (see :mod:`daemon.conditional`).
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype str: the header value.
         """
-        Loads the objects file from storage space.
+        policies = request.config.cache_control if request is not None else None
+        if policies is None:
+            return DEFAULT_CACHE_CONTROL
+        return policies.lookup(request.path)
+
+    def select_variant(self, entry, request):
+        """
+        Choose the variant of a cached static file the client accepts, among
+        its precompressed ones (see :mod:`daemon.compression`), and set its
+        ``ETag``, ``Content-Encoding`` and ``Vary`` headers. A request for byte
+        ranges gets the uncompressed content, which the ranges apply to.
+
+        :params entry (FileEntry): the cached file.
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype bytes: the body to send.
+        """
+        if not entry.variants:
+            self.headers['ETag'] = entry.etag
+            return entry.content
+        self.headers['Vary'] = 'Accept-Encoding'
+        encoding = None
+        if request is not None and request.headers.get('range') is None:
+            encoding = negotiate(request.headers.get('accept-encoding'), entry.variants)
+        if encoding is None:
+            self.headers['ETag'] = entry.etag
+            return entry.content
+        self.headers['ETag'] = variant_etag(entry.etag, encoding)
+        self.headers['Content-Encoding'] = encoding
+        return entry.variants[encoding]
+
+    def negotiate_encoding(self, length, request):
+        """
+        Choose the encoding of a dynamic body, compressed only from the size
+        threshold of the app, and set ``Vary`` when it may be compressed.
+
+        :params length (int): size of the body, in bytes.
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype str: the encoding to compress with, or None.
+        """
+        min_size = request.config.compress_min_size
+        if min_size is None or length < min_size:
+            return None
+        self.headers['Vary'] = 'Accept-Encoding'
+        return negotiate(request.headers.get('accept-encoding'))
+
+    def read_file(self, filepath, request=None):
+        """
+        Content of a file, through the file cache.
+
+        :params filepath (str): path of the file.
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype bytes: the file content.
+
+        :raises OSError: If the file cannot be read.
+        """
+        entry = self.file_cache(request).get(filepath)
+        if entry is None:
+            # Too large for the cache
+            with open(filepath, 'rb') as f:
+                return f.read()
+        return entry.content
+
+    def build_content(self, path, base_dir, request=None):
+        """
+        Loads the objects file from storage space, through the file cache.
+        Once served, the path is remembered with its file and content type, for
+        :meth:`build_response` to find it directly next time.
+
+        A file too large for the cache is not read: it is returned open, to be
+        sent with ``sendfile`` (see :class:`FileResponse <FileResponse>`).
 
         :params path (str): relative path to the file.
         :params base_dir (str): base directory where the file is located.
+        :params request (class:`Request <Request>`): incoming request object.
 
-        :rtype tuple: (int, bytes) representing content length and content data.
+        :rtype tuple: (int, bytes) representing content length and content data,
+                      or (int, file) for a file to send from disk.
         """
 
         filepath = os.path.join(base_dir, path.lstrip('/'))
 
         print(f"[Response] serving the object at location {filepath}")
-            #
-            #  TODO: implement the step of fetch the object file
-            #        store in the return value of content
-            #
+        files = self.file_cache(request)
         try: 
-            with open(filepath,'rb') as f: 
-                content = f.read()
+            entry = files.get(filepath)
+            if entry is None:
+                f = open(filepath, 'rb')
+                st = os.fstat(f.fileno())
                 self.status_code = 200
+                self.headers['ETag'] = file_etag(st)
+                self.headers['Last-Modified'] = http_date(st.st_mtime)
+                return st.st_size, f
+            content = self.select_variant(entry, request)
+            self.status_code = 200
+            self.headers['Last-Modified'] = entry.last_modified
+            files.remember(path, filepath, self.headers.get('Content-Type'))
         except FileNotFoundError:
             self.status_code = 404
             filepath_ = os.path.join(BASE_DIR+ "www/errors/" , "404.html")
-            with open(filepath_,'rb') as f: 
-                content =f.read()
+            content = self.read_file(filepath_, request)
             self.headers["Content-Type"] = "text/html"
         except Exception as e: # 500
             self.status_code = 500
             filepath_ = os.path.join(BASE_DIR+ "www/errors/" , "500.html")
-            with open(filepath_,'rb') as f: 
-                content =f.read()
+            content = self.read_file(filepath_, request)
             self.headers["Content-Type"] = "text/html"
         return len(content), content
 
 
+    def connection_header(self, request):
+        """
+        Value of the ``Connection`` response header, following the keep-alive
+        decision taken for the :class:`Request <Request>`.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype str: "keep-alive" or "close".
+        """
+        if request is not None and getattr(request, 'keep_alive', False):
+            return "keep-alive"
+        return "close"
+
     def build_response_header(self, request):
         """
         Constructs the HTTP response headers based on the class:`Request <Request>
         and internal attributes.
 
+        The status line and ``Content-Type`` come from a template kept per
+        status code and content type, the ``Date`` from a value formatted once
+        per second (see :func:`header_template` and :func:`date_header`), and
+        the header is encoded with a single join.
+
         :params request (class:`Request <Request>`): incoming request object.
 
         :rtypes bytes: encoded HTTP response header.
         """
-        reqhdr = request.headers
         rsphdr = self.headers
-    
-        # Get origin from request header for CORS
-        origin = reqhdr.get("origin", "*")
-        
-        #Build dynamic headers
-        headers = {
-                "Accept": str(reqhdr.get("Accept", "application/json")),
-                "Accept-Language": str(reqhdr.get("Accept-Language", "en-US,en;q=0.9")),
-                "Authorization": str(reqhdr.get("Authorization", "Basic <credentials>")),
-                "Cache-Control": "no-cache",
-                "Content-Type": str(self.headers.get('Content-Type', 'text/html')),
-                "Content-Length": str(len(self._content) if isinstance(self._content, (bytearray,bytes)) else 0 ),
-#                "Cookie": "{}".format(reqhdr.get("Cookie", "sessionid=xyz789")), #dummy cooki
-                "Date": str(datetime.datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")),
-                "Max-Forward": "10",
-                "Pragma": "no-cache",
-                "Proxy-Authorization": "Basic dXNlcjpwYXNz",  # example base64
-                "Warning": "199 Miscellaneous warning",
-                "User-Agent": str(reqhdr.get("User-Agent", "Chrome/123.0.0.0")),
-                # CORS headers
-                "Access-Control-Allow-Origin": origin,
-                "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-                "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Requested-With",
-                "Access-Control-Allow-Credentials": "true",
-            }
-        if 'Set-Cookie' in rsphdr: 
-            headers['Set-Cookie'] = rsphdr['Set-Cookie']
-            print(f"[Response] Adding Set-Cookie header: {rsphdr['Set-Cookie']}" )
-        if 'Authorization' in reqhdr: # request having logging in
-            headers['Authorization'] = str(reqhdr.get("Authorization")) 
-        # Header text alignment
-            #
-            #  TODO: implement the header building to create formated
-            #        header from the provied headers
-            #
-        #
-        # TODO prepare the request authentication
-        #
-	# self.auth = ...
         self.reason = HTTP_REASON.get(self.status_code, "Unknown")
-        status_line = f"HTTP/1.1 {self.status_code} {self.reason}"
-        fmt_header = status_line + "\r\n"
-        for key, value in  headers.items():
-            fmt_header += f"{key}: {value}\r\n"
-        fmt_header += "\r\n"
-        return str(fmt_header).encode('utf-8')
+        cache_control = rsphdr.get('Cache-Control') or self.cache_control(request)
+
+        parts = [header_template(self.status_code, rsphdr.get('Content-Type', 'text/html')),
+                 "Cache-Control: ", cache_control, "\r\n"]
+        if cache_control == "no-cache":
+            parts.append("Pragma: no-cache\r\n")
+        if isinstance(self._content, (bytearray, bytes)):
+            parts += ("Content-Length: ", str(len(self._content)), "\r\n")
+        elif self._content is None:
+            if 'Content-Length' in rsphdr:
+                # Body sent from a file
+                parts += ("Content-Length: ", rsphdr['Content-Length'], "\r\n")
+            # else streamed body of unknown length
+            if 'Transfer-Encoding' in rsphdr:
+                parts += ("Transfer-Encoding: ", rsphdr['Transfer-Encoding'], "\r\n")
+        else:
+            parts.append("Content-Length: 0\r\n")
+        parts += ("Date: ", date_header(), "\r\n")
+        for name in OPTIONAL_HEADERS:
+            if name in rsphdr:
+                parts += (name, ": ", rsphdr[name], "\r\n")
+        if request.timings:
+            parts += ("Server-Timing: ", server_timing(request.timings), "\r\n")
+        if 'Set-Cookie' in rsphdr:
+            parts += ("Set-Cookie: ", rsphdr['Set-Cookie'], "\r\n")
+            print(f"[Response] Adding Set-Cookie header: {rsphdr['Set-Cookie']}" )
+        # CORS headers
+        parts += ("Access-Control-Allow-Origin: ", request.headers.get("origin", "*"), "\r\n",
+                  CORS_HEADERS, "Connection: ", self.connection_header(request), "\r\n\r\n")
+        return "".join(parts).encode('utf-8')
 
 
     def build_notfound(self):
@@ -478,6 +857,99 @@ class Response():
                 "404 Not Found" #body
             ).encode('utf-8')
 
+    def build_not_allowed(self, request):
+        """
+        Constructs a 405 Method Not Allowed HTTP response for a path whose routes
+        do not accept the request method, listing those they accept.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype bytes: Encoded 405 response.
+        """
+
+        self.status_code = 405
+        self.reason = HTTP_REASON[405]
+        return (
+                "HTTP/1.1 405 Method Not Allowed\r\n"
+                "Allow: {}\r\n"
+                "Content-Type: text/plain\r\n"
+                "Content-Length: 18\r\n"
+                "Connection: {}\r\n"
+                "\r\n"
+                "Method Not Allowed" #body
+            ).format(", ".join(request.allowed_methods),
+                     self.connection_header(request)).encode('utf-8')
+
+    def build_not_modified(self, request):
+        """
+        Constructs a 304 Not Modified HTTP response, without a body, for a
+        conditional request whose copy is current. The validators set in
+        ``self.headers`` are sent again.
+
+        The status code and content are left as they are, for the response
+        cache to keep the full response.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype bytes: Encoded 304 response.
+        """
+        print(f"[Response] Not modified: {request.method} {request.path}")
+        rsphdr = self.headers
+        fmt_header = "HTTP/1.1 304 Not Modified\r\n"
+        fmt_header += f"ETag: {rsphdr['ETag']}\r\n"
+        if 'Last-Modified' in rsphdr:
+            fmt_header += f"Last-Modified: {rsphdr['Last-Modified']}\r\n"
+        fmt_header += f"Cache-Control: {rsphdr.get('Cache-Control') or self.cache_control(request)}\r\n"
+        if 'Vary' in rsphdr:
+            fmt_header += f"Vary: {rsphdr['Vary']}\r\n"
+        fmt_header += f"Date: {date_header()}\r\n"
+        fmt_header += f"Access-Control-Allow-Origin: {request.headers.get('origin', '*')}\r\n"
+        fmt_header += "Access-Control-Allow-Credentials: true\r\n"
+        fmt_header += f"Connection: {self.connection_header(request)}\r\n"
+        fmt_header += "\r\n"
+        return fmt_header.encode('utf-8')
+
+    def build_error(self, status_code):
+        """
+        Constructs a plain-text error response for a request that cannot be
+        served, e.g. a malformed or oversized one. The connection is closed
+        afterwards.
+
+        :params status_code (int): HTTP status code (e.g., 400, 413).
+
+        :rtype bytes: Encoded error response.
+        """
+
+        reason = HTTP_REASON.get(status_code, "Unknown")
+        return (
+                "HTTP/1.1 {} {}\r\n"
+                "Content-Type: text/plain\r\n"
+                "Content-Length: {}\r\n"
+                "Connection: close\r\n"
+                "\r\n"
+                "{}" #body
+            ).format(status_code, reason, len(reason), reason).encode('utf-8')
+
+    def build_unavailable(self, retry_after=1):
+        """
+        Constructs a standard 503 Service Unavailable HTTP response, used when
+        the backend refuses a connection because it is overloaded.
+
+        :params retry_after (int): seconds the client should wait before retrying.
+
+        :rtype bytes: Encoded 503 response.
+        """
+
+        return (
+                "HTTP/1.1 503 Service Unavailable\r\n"
+                "Content-Type: text/plain\r\n"
+                "Content-Length: 19\r\n"
+                "Retry-After: {}\r\n"
+                "Connection: close\r\n"
+                "\r\n"
+                "Service Unavailable" #body
+            ).format(retry_after).encode('utf-8')
+
     def build_json_response(self, data, request):
         """
         Builds an HTTP response with JSON content from route handler result.
@@ -491,22 +963,46 @@ class Response():
         # Set status code (default to 200)
         self.status_code = 200
         
-        # Convert data to JSON string
+        # Convert data to JSON bytes
         try:
-            json_str = json.dumps(data, ensure_ascii=False)
-            json_bytes = json_str.encode('utf-8')
+            if request.cache_key is None and is_large(data, request.config.json_stream_items):
+                # Encoded while sent, rather than held in memory whole. The first
+                # chunk is encoded before the header, so it can still be a 500.
+                chunks = iterencode(data)
+                first = next(chunks)
+                return self.build_stream_response(itertools.chain((first,), chunks), request)
+            if isinstance(data, EncodedJSON):
+                # Encoded by the worker process of a CPU-bound handler
+                json_bytes = bytes(data)
+            else:
+                json_bytes = dumps(data)
         except (TypeError, ValueError) as e:
             print(f"[Response] Error serializing JSON: {e}")
             self.status_code = 500
             json_bytes = b'{"status": "error", "message": "Internal server error"}'
         
-        # Set content
-        self._content = json_bytes
-        
+        # Validator of the state shown, unless it is an error
+        etag = None
+        if self.status_code == 200 and request.method in CONDITIONAL_METHODS and not (
+                isinstance(data, dict) and data.get("status") == "error"):
+            etag = make_etag(json_bytes)
+
         # Set headers
         self.headers['Content-Type'] = 'application/json; charset=utf-8'
+        encoding = self.negotiate_encoding(len(json_bytes), request)
+        if encoding is not None and etag is not None:
+            etag = variant_etag(etag, encoding)
+        if etag is not None:
+            self.headers['ETag'] = etag
+            if is_not_modified(request, etag):
+                return self.build_not_modified(request)
+        if encoding is not None:
+            json_bytes = compress(json_bytes, encoding)
+            self.headers['Content-Encoding'] = encoding
+
+        # Set content
+        self._content = json_bytes
         self.headers['Content-Length'] = str(len(json_bytes))
-        self.headers['Cache-Control'] = 'no-cache'
         
         # Build response header
         self.reason = HTTP_REASON.get(self.status_code, "OK")
@@ -516,13 +1012,198 @@ class Response():
         return self._header + self._content
 
 
+    def build_cached_response(self, entry, request):
+        """
+        Builds an HTTP response from a cached encoded body, without calling the
+        route handler nor encoding its result again.
+
+        :param entry (CacheEntry): the cached response.
+        :param request: Request object
+        :rtype bytes: Complete HTTP response
+        """
+        self.status_code = entry.status_code
+        self.headers['Content-Type'] = entry.content_type
+        body, etag = entry.body, entry.etag
+        encoding = self.negotiate_encoding(len(body), request)
+        if encoding is not None and etag is not None:
+            etag = variant_etag(etag, encoding)
+        if etag is not None:
+            self.headers['ETag'] = etag
+            if is_not_modified(request, etag):
+                return self.build_not_modified(request)
+        if encoding is not None:
+            encoded = entry.variants.get(encoding)
+            if encoded is None:
+                encoded = entry.variants[encoding] = compress(body, encoding)
+            body = encoded
+            self.headers['Content-Encoding'] = encoding
+        self._content = body
+        self.reason = HTTP_REASON.get(self.status_code, "OK")
+        self._header = self.build_response_header(request)
+        return self._header + self._content
+
+    def build_stream_response(self, parts, request):
+        """
+        Builds a streamed HTTP response with JSON content from the iterator
+        returned by a route handler. Nothing is produced until the caller
+        iterates over the result, one part at a time (see :func:`next_part`).
+
+        :param parts (iterator): items yielded by the route handler.
+        :param request: Request object
+        :rtype iterator: the encoded header, then the encoded body parts.
+        """
+        print(f"[Response] Building streamed JSON response from route handler")
+
+        self.status_code = 200
+        self._content = None
+        self.headers['Content-Type'] = 'application/json; charset=utf-8'
+        chunked = request.version != 'HTTP/1.0'
+        if chunked:
+            self.headers['Transfer-Encoding'] = 'chunked'
+        else:
+            # No chunked coding in HTTP/1.0: the end of the body is the close
+            request.keep_alive = False
+
+        self.reason = HTTP_REASON.get(self.status_code, "OK")
+        self._header = self.build_response_header(request)
+        return self.iter_stream(parts, chunked)
+
+    def build_file_response(self, file, length, request, parts=None):
+        """
+        Builds the response of a file sent from disk rather than from memory.
+
+        :param file (file): the open file.
+        :param length (int): size of the body in bytes.
+        :param request: Request object
+        :param parts (list): the body, as bytes and ``(offset, count)`` spans of
+                             the file (see :class:`FileResponse <FileResponse>`);
+                             the whole file by default.
+        :rtype FileResponse: the header and the file to send.
+        """
+        print(f"[Response] Sending {length} bytes of {file.name} from disk")
+        self._content = None
+        self.headers['Content-Length'] = str(length)
+        self.reason = HTTP_REASON.get(self.status_code, "OK")
+        self._header = self.build_response_header(request)
+        return FileResponse(self._header, file, parts if parts is not None else [(0, length)])
+
+    def build_partial(self, content, length, request):
+        """
+        Builds the ``206 Partial Content`` response of a GET request for byte
+        ranges of a static file (see :mod:`daemon.ranges`), or its ``416 Range
+        Not Satisfiable`` response. Also advertises ``Accept-Ranges``.
+
+        :param content (bytes | file): the file content, or the open file of a
+                                       file sent from disk.
+        :param length (int): size of the file in bytes.
+        :param request: Request object
+        :rtype bytes: Complete HTTP response, or a :class:`FileResponse
+                      <FileResponse>` for a file sent from disk; None if the
+                      whole file is to be sent.
+        """
+        if self.status_code != 200:
+            return None
+        self.headers['Accept-Ranges'] = 'bytes'
+        header = request.headers.get('range')
+        if header is None or request.method != 'GET' or 'Content-Encoding' in self.headers:
+            return None
+        ranges = parse_ranges(header, length)
+        if ranges is None or not if_range_matches(request.headers.get('if-range'),
+                                                  self.headers.get('ETag'),
+                                                  self.headers.get('Last-Modified')):
+            return None
+
+        if not ranges:
+            print(f"[Response] Range not satisfiable: {header} of {length} bytes")
+            if not isinstance(content, bytes):
+                content.close()
+            self.status_code = 416
+            self.headers['Content-Range'] = "bytes */{}".format(length)
+            self.headers['Content-Type'] = 'text/plain'
+            self._content = HTTP_REASON[416].encode('utf-8')
+            self._header = self.build_response_header(request)
+            return self._header + self._content
+
+        print(f"[Response] Partial content: {header} of {length} bytes")
+        self.status_code = 206
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            self.headers['Content-Range'] = content_range(first, last, length)
+            parts = [(first, last - first + 1)]
+        else:
+            boundary = new_boundary()
+            parts = byteranges(ranges, length, self.headers.get('Content-Type', 'application/octet-stream'),
+                               boundary)
+            self.headers['Content-Type'] = 'multipart/byteranges; boundary=' + boundary
+        if not isinstance(content, bytes):
+            size = sum(len(part) if isinstance(part, bytes) else part[1] for part in parts)
+            return self.build_file_response(content, size, request, parts)
+        self._content = b"".join(part if isinstance(part, bytes) else content[part[0]:part[0] + part[1]]
+                                 for part in parts)
+        self.headers['Content-Length'] = str(len(self._content))
+        self._header = self.build_response_header(request)
+        return self._header + self._content
+
+    def iter_stream(self, parts, chunked=True):
+        """
+        Generator behind :meth:`build_stream_response`.
+
+        :param parts (iterator): items yielded by the route handler.
+        :param chunked (bool): whether to frame the items as chunks.
+        """
+        yield self._header
+        for part in parts:
+            data = encode_part(part)
+            if not data:
+                # An empty chunk would end the body
+                continue
+            yield encode_chunk(data) if chunked else data
+        if chunked:
+            yield LAST_CHUNK
+
     def build_response(self, request):
         """
         Builds a full HTTP response including headers and content based on the request.
+        A HEAD request is answered with the headers of the GET response only.
 
         :params request (class:`Request <Request>`): incoming request object.
 
-        :rtype bytes: complete HTTP response using prepared headers and content.
+        :rtype bytes: complete HTTP response using prepared headers and content,
+                      or an iterator of its parts for a streamed response, or a
+                      :class:`FileResponse <FileResponse>` for a large file.
+        """
+        response = self.build_full_response(request)
+        if request.method == 'HEAD':
+            return self.strip_body(response)
+        return response
+
+    def strip_body(self, response):
+        """
+        Keep the header of a response only, e.g. to answer a HEAD request. A
+        streamed or file response is closed without producing its body.
+
+        :param response (bytes): a response built by :meth:`build_full_response`,
+                                 or an iterator of its parts.
+
+        :rtype bytes: the encoded header, ``Content-Length`` included.
+        """
+        if isinstance(response, (bytes, bytearray)):
+            return bytes(response[:response.index(b"\r\n\r\n") + 4])
+        header = next(response)
+        close = getattr(response, 'close', None)
+        if close is not None:
+            close()
+        return header
+
+    def build_full_response(self, request):
+        """
+        Builds the response of a request with its body, as :meth:`build_response`
+        returns it for every method but HEAD.
+
+        :params request (class:`Request <Request>`): incoming request object.
+
+        :rtype bytes: complete HTTP response, or an iterator of its parts for a
+                      streamed response, or a :class:`FileResponse <FileResponse>`.
         """
         path = request.path
         method = request.method
@@ -530,6 +1211,10 @@ class Response():
         print(f"[Response] {request.method} path {request.path}")
 
         # Check if there's a route handler result (JSON API response)
+        if isinstance(getattr(request, 'route_result', None), CacheEntry):
+            return self.build_cached_response(request.route_result, request)
+        if hasattr(request, 'route_result') and isinstance(request.route_result, Iterator):
+            return self.build_stream_response(request.route_result, request)
         if hasattr(request, 'route_result') and request.route_result is not None:
             print(f"[Response] Route handler returned result: {request.route_result}")
             return self.build_json_response(request.route_result, request)
@@ -539,6 +1224,10 @@ class Response():
             print("[Response] Handling login POST request")
             return self.build_login_response(request)
 
+        # Known path, but no route for this method
+        if request.hook is None and request.allowed_methods:
+            return self.build_not_allowed(request)
+
         # Handle GET / or /index.html - require authentication
         if method == 'GET' and path in ['/', '/index.html']: 
             if not self.is_authenticated(request): 
@@ -546,6 +1235,21 @@ class Response():
                 return self.build_unauthorized_response(request)
             else: 
                 print("[Response] Access permitted: Valid authentication cookie found")
+
+        # Static file served before: no MIME type nor directory resolution
+        entry = self.file_cache(request).lookup(path)
+        if entry is not None:
+            self.status_code = 200
+            self.headers['Content-Type'] = entry.content_type
+            self.headers['Last-Modified'] = entry.last_modified
+            self._content = self.select_variant(entry, request)
+            if is_not_modified(request, self.headers['ETag'], entry.last_modified):
+                return self.build_not_modified(request)
+            partial = self.build_partial(entry.content, len(entry.content), request)
+            if partial is not None:
+                return partial
+            self._header = self.build_response_header(request)
+            return self._header + self._content
                         
         # Continue with normal file serving
         mime_type = self.get_mime_type(path)
@@ -562,10 +1266,23 @@ class Response():
             base_dir = self.prepare_content_type(mime_type=mime_type)
         else:
             print(f"[Response] Unsupported MIME type: {mime_type}")
+            # build_notfound always answers "Connection: close"
+            request.keep_alive = False
             return self.build_notfound()
 
         # Load content
-        _, self._content = self.build_content(path, base_dir)
+        length, content = self.build_content(path, base_dir, request)
+        if self.status_code == 200 and is_not_modified(request, self.headers['ETag'],
+                                                       self.headers['Last-Modified']):
+            if not isinstance(content, bytes):
+                content.close()
+            return self.build_not_modified(request)
+        partial = self.build_partial(content, length, request)
+        if partial is not None:
+            return partial
+        if not isinstance(content, bytes):
+            return self.build_file_response(content, length, request)
+        self._content = content
         self._header = self.build_response_header(request)
         self.reason = HTTP_REASON.get(self.status_code, "Unknown")
 
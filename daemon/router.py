@@ -0,0 +1,314 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.router
+~~~~~~~~~~~~~~~~~
+
+This module provides a :class:`Router <Router>` object, the route table of a
+WeApRous app, matching request paths with parameters.
+
+A route path is made of ``/``-separated segments, each one either literal or a
+parameter written ``<name>`` or ``<converter:name>``. The value of a parameter
+is passed to the route handler as a keyword argument of the same name, after
+conversion:
+
+- ``str`` (default): one non-empty segment.
+- ``int``: one segment of decimal digits, given as an int.
+- ``float``: one segment holding a number, given as a float.
+- ``path``: the rest of the path, slashes included. Last segment only.
+
+Routes are compiled into a tree of path segments when registered. A lookup walks
+one tree level per segment of the request path, so its cost depends on the depth
+of the path, not on the number of routes. Routes without parameters are found
+with a single dict lookup. When the path matches routes of other methods only,
+the lookup reports the allowed methods for a ``405 Method Not Allowed`` reply.
+
+Usage Example:
+--------------
+>>> router = Router()
+>>> router[("GET", "/channels/<name>/messages")] = get_messages
+>>> router[("GET", "/peers/<int:peer_id>")] = get_peer
+>>> router.match("GET", "/peers/42")
+(<function get_peer>, {'peer_id': 42}, None)
+>>> router.match("POST", "/peers/42")
+(None, None, ('GET',))
+"""
+
+from urllib.parse import unquote
+
+#: Argument names of a route handler that path parameters cannot take.
+RESERVED_PARAMS = ("headers", "body", "query", "cookies", "json")
+
+
+def convert_str(value):
+    if not value:
+        raise ValueError("empty segment")
+    return value
+
+
+def convert_int(value):
+    if not value.isdigit() or not value.isascii():
+        raise ValueError("not an integer: {!r}".format(value))
+    return int(value)
+
+
+def convert_float(value):
+    if not value or not value.isascii() or value.lower().lstrip('+-') in ("inf", "infinity", "nan"):
+        raise ValueError("not a number: {!r}".format(value))
+    return float(value)
+
+
+#: Path parameter converters, by name, turning the percent-decoded segment into
+#: the value given to the handler or raising ValueError when it does not fit.
+CONVERTERS = {
+    "str": convert_str,
+    "int": convert_int,
+    "float": convert_float,
+    "path": convert_str,
+}
+
+
+def parse_segment(segment):
+    """
+    Parse one segment of a route path.
+
+    :param segment (str): the segment, e.g. ``channels`` or ``<int:peer_id>``.
+
+    :rtype tuple: ``(None, None)`` for a literal segment, else the converter and
+                  parameter names.
+
+    :raises ValueError: If the parameter is malformed or the converter unknown.
+    """
+    if not (segment.startswith('<') and segment.endswith('>')):
+        if '<' in segment or '>' in segment:
+            raise ValueError("parameters must span a whole path segment: {!r}".format(segment))
+        return None, None
+    converter, _, name = segment[1:-1].rpartition(':')
+    converter = converter or "str"
+    if converter not in CONVERTERS:
+        raise ValueError("unknown path converter {!r}".format(converter))
+    if not name.isidentifier() or name in RESERVED_PARAMS:
+        raise ValueError("invalid path parameter name {!r}".format(name))
+    return converter, name
+
+
+def path_params(path):
+    """
+    Names of the parameters of a route path, in order.
+
+    :param path (str): the route path, e.g. ``/channels/<name>/messages``.
+
+    :rtype list: the parameter names.
+    """
+    return [name for _, name in map(parse_segment, path.split('/')) if name is not None]
+
+
+class Node:
+    """
+    One level of the route tree: the routes ending at this segment, and the
+    literal and parameter segments that can follow it.
+    """
+
+    __slots__ = ("handlers", "static", "params", "rest")
+
+    def __init__(self):
+        #: Route handlers of the path ending here, by method
+        self.handlers = {}
+        #: Next nodes by literal segment
+        self.static = {}
+        #: Next nodes of parameter segments, as (converter name, name, converter, node)
+        self.params = []
+        #: Node of a trailing ``path`` parameter, as (name, node), or None
+        self.rest = None
+
+    def child(self, segment, last):
+        """Return the node following this one for a route path segment,
+        creating it if needed."""
+        converter, name = parse_segment(segment)
+        if converter is None:
+            return self.static.setdefault(segment, Node())
+        if converter == "path":
+            if not last:
+                raise ValueError("a path parameter must be the last segment")
+            if self.rest is None:
+                self.rest = (name, Node())
+            elif self.rest[0] != name:
+                raise ValueError("conflicting path parameters {!r} and {!r}".format(self.rest[0], name))
+            return self.rest[1]
+        for conv, param, _, node in self.params:
+            if conv == converter and param == name:
+                return node
+        node = Node()
+        self.params.append((converter, name, CONVERTERS[converter], node))
+        return node
+
+    def find(self, method, segments, index, params):
+        """
+        Find the node of a route for a request, trying literal segments first,
+        then parameters in registration order, then a trailing ``path`` parameter.
+
+        :param method (str): the request method.
+        :param segments (list): the segments of the request path.
+        :param index (int): index of the first segment left to match.
+        :param params (dict): receives the parameters of the matched route.
+
+        :rtype Node: the node where the route ends, or None.
+        """
+        if index == len(segments):
+            return self if method in self.handlers else None
+        segment = segments[index]
+        node = self.static.get(segment)
+        if node is not None:
+            found = node.find(method, segments, index + 1, params)
+            if found is not None:
+                return found
+        if self.params:
+            value = unquote(segment)
+            for _, name, convert, node in self.params:
+                try:
+                    converted = convert(value)
+                except ValueError:
+                    continue
+                found = node.find(method, segments, index + 1, params)
+                if found is not None:
+                    params[name] = converted
+                    return found
+        if self.rest is not None and segment:
+            name, node = self.rest
+            if method in node.handlers:
+                params[name] = unquote("/".join(segments[index:]))
+                return node
+        return None
+
+    def methods(self, segments, index, allowed):
+        """
+        Collect the methods of every route matching a request path, whatever
+        their method.
+
+        :param segments (list): the segments of the request path.
+        :param index (int): index of the first segment left to match.
+        :param allowed (set): receives the methods.
+        """
+        if index == len(segments):
+            allowed.update(self.handlers)
+            return
+        segment = segments[index]
+        node = self.static.get(segment)
+        if node is not None:
+            node.methods(segments, index + 1, allowed)
+        if self.params:
+            value = unquote(segment)
+            for _, _, convert, node in self.params:
+                try:
+                    convert(value)
+                except ValueError:
+                    continue
+                node.methods(segments, index + 1, allowed)
+        if self.rest is not None and segment:
+            allowed.update(self.rest[1].handlers)
+
+
+class Router(dict):
+    """
+    Route table of a WeApRous app, with path parameters.
+
+    It is the mapping of route handlers by ``(method, path)`` the rest of the
+    daemon package expects, with each route also compiled into a tree of path
+    segments for :meth:`match`.
+    """
+
+    def __init__(self, routes=()):
+        """
+        Initialize a new Router instance.
+
+        :param routes (dict): initial route handlers by (method, path).
+        """
+        super().__init__()
+        self._root = Node()
+        self._static = {}
+        self.update(routes)
+
+    def __setitem__(self, key, handler):
+        method, path = key
+        if not path.startswith('/'):
+            raise ValueError("route path must start with '/': {!r}".format(path))
+        segments = path.split('/')[1:]
+        node = self._root
+        for index, segment in enumerate(segments):
+            node = node.child(segment, index == len(segments) - 1)
+        node.handlers[method] = handler
+        if not path_params(path):
+            self._static[key] = handler
+        super().__setitem__(key, handler)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        routes = dict(self)
+        self.clear()
+        self.update(routes)
+
+    def clear(self):
+        super().clear()
+        self._root = Node()
+        self._static = {}
+
+    def update(self, routes=(), **kwargs):
+        for key, handler in dict(routes, **kwargs).items():
+            self[key] = handler
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def match(self, method, path):
+        """
+        Find the route handler of a request.
+
+        :param method (str): the request method.
+        :param path (str): the request path, without the query string.
+
+        :rtype tuple: the handler and its path parameters, then None, or
+                      ``(None, None, allowed)`` where ``allowed`` is the sorted
+                      tuple of the methods the path has routes for, empty when
+                      no route matches the path.
+        """
+        handler = self._static.get((method, path))
+        if handler is not None:
+            return handler, {}, None
+        if not path.startswith('/'):
+            return None, None, ()
+        segments = path.split('/')[1:]
+        params = {}
+        node = self._root.find(method, segments, 0, params)
+        if node is not None:
+            return node.handlers[method], params, None
+        allowed = set()
+        self._root.methods(segments, 0, allowed)
+        return None, None, tuple(sorted(allowed))
+
+
+def match_route(routes, method, path):
+    """
+    Find the route handler of a request in a :class:`Router <Router>` or in a
+    plain dict of route handlers by (method, path), which has no path parameters.
+
+    :rtype tuple: see :meth:`Router.match`.
+    """
+    match = getattr(routes, 'match', None)
+    if match is not None:
+        return match(method, path)
+    handler = routes.get((method, path))
+    if handler is None:
+        return None, None, ()
+    return handler, {}, None
@@ -17,7 +17,20 @@ deamon.weaproute
 This module provides a WeApRous object to deploy RESTful url web app with routing
 """
 
+import inspect
+
 from .backend import create_backend
+from .bodystream import MAX_STREAM_SIZE, SPOOL_SIZE
+from .middleware import Pipeline
+from .cache import CachePolicy, ResponseCache, CACHE_ENTRIES, CACHE_BYTES
+from .filecache import FileCache, FILE_CACHE_BYTES, FILE_CHECK_INTERVAL
+from .conditional import CacheControl
+from .compression import COMPRESS_MIN_SIZE
+from .codec import STREAM_MIN_ITEMS
+from .appconfig import AppConfig
+from . import offload
+from .request import accepts_argument, route_params
+from .router import Router, path_params
 
 class WeApRous:
     """The fully mutable :class:`WeApRous <WeApRous>` object, which is a lightweight,
@@ -40,16 +53,100 @@ class WeApRous:
       >>> def hello(headers, body):
       >>>     return {'message': 'Hello, world!'}
 
+      >>> @app.route('/messages', methods=['GET'])
+      >>> def messages(headers, body, query, cookies):
+      >>>     return {'channel': query.get('channel'), 'user': cookies.get('user')}
+
+      >>> @app.route('/channels/<name>/messages', methods=['GET'])
+      >>> def channel_messages(headers, body, name):
+      >>>     return {'channel': name}
+
+      >>> @app.route('/channels/<name>/members', methods=['GET'])
+      >>> @app.cache(ttl=5, tags=['channel:{name}'])
+      >>> def channel_members(headers, body, name):
+      >>>     return {'members': members[name]}      # app.invalidate('channel:' + name) on change
+
+      >>> @app.route('/peers/<int:peer_id>', methods=['GET', 'DELETE'])
+      >>> def peer(headers, body, peer_id):
+      >>>     return {'peer': peer_id}
+
+      >>> @app.route('/send', methods=['POST'])
+      >>> def send(headers, body, json):
+      >>>     return {'echo': json}
+
+      >>> @app.route('/wait-messages', methods=['GET'])
+      >>> async def wait_messages(headers, body, query):
+      >>>     await asyncio.sleep(1)
+      >>>     return {'messages': []}
+
+      >>> @app.route('/reports/<int:year>', methods=['GET'], cpu_bound=True)
+      >>> def report(headers, body, year):
+      >>>     return build_report(year)           # runs in a worker process
+
+      >>> @app.route('/import', methods=['POST'], stream=True)
+      >>> def bulk_import(headers, body):
+      >>>     return {'lines': sum(1 for line in body)}
+
+      >>> @app.before_request
+      >>> def require_auth(request):
+      >>>     if request.cookies.get('auth') != 'true':
+      >>>         return {'status': 'error', 'message': 'Unauthorized'}
+
+      >>> @app.around_request
+      >>> def log_errors(request):
+      >>>     result = yield
+      >>>     if result.get('status') == 'error':
+      >>>         print(request.path, result)
+
+      >>> @app.on_shutdown
+      >>> def flush():
+      >>>     db.save_all()
+
       >>> app.run()
+      >>> app.run(engine="pool", pool_size=32, queue_size=512)
+      >>> app.run(engine="asyncio")
+      >>> app.run(engine="reactor", workers=4)
     """
 
-    def __init__(self):
+    def __init__(self, cache_entries=CACHE_ENTRIES, cache_bytes=CACHE_BYTES,
+                 cpu_workers=offload.CPU_WORKERS, static_cache_bytes=FILE_CACHE_BYTES,
+                 static_check_interval=FILE_CHECK_INTERVAL, compress_min_size=COMPRESS_MIN_SIZE,
+                 json_stream_items=STREAM_MIN_ITEMS, server_timing=False):
         """
         Initialize a new WeApRous instance.
 
         Sets up an empty route registry and prepares placeholders for IP and port.
+
+        :param cache_entries (int): largest number of responses kept by ``@app.cache``.
+        :param cache_bytes (int): largest total size of the cached responses, in bytes.
+        :param cpu_workers (int): number of worker processes running CPU-bound
+                                  handlers, per server process.
+        :param static_cache_bytes (int): largest total size of the static files
+                                         kept in memory, in bytes.
+        :param static_check_interval (float): seconds between two checks of a
+                                              cached static file against the disk.
+        :param compress_min_size (int): smallest JSON response compressed for
+                                        the clients accepting it, in bytes, None
+                                        to never compress them.
+        :param json_stream_items (int): smallest list of a route result, in
+                                        items, encoded incrementally while sent
+                                        (see :mod:`daemon.codec`), None to
+                                        always encode results whole.
+        :param server_timing (bool): time the route handlers and send the
+                                     ``Server-Timing`` header even when no
+                                     middleware is registered.
         """
-        self.routes = {}
+        self.routes = Router()
+        self.pipeline = Pipeline(timing=server_timing)
+        self.response_cache = ResponseCache(cache_entries, cache_bytes)
+        self.file_cache = FileCache(static_cache_bytes, check_interval=static_check_interval)
+        self.cache_controls = CacheControl()
+        self.config = AppConfig(pipeline=self.pipeline, cache=self.response_cache,
+                                files=self.file_cache, cache_control=self.cache_controls,
+                                compress_min_size=compress_min_size,
+                                json_stream_items=json_stream_items)
+        offload.configure(cpu_workers)
+        self.shutdown_hooks = []
         self.ip = None
         self.port = None
         return
@@ -64,38 +161,214 @@ class WeApRous:
         self.ip = ip
         self.port = port
 
-    def route(self, path, methods=['GET']):
+    def route(self, path, methods=['GET'], stream=False,
+              max_body_size=MAX_STREAM_SIZE, spool_size=SPOOL_SIZE, cpu_bound=False):
         """
         Decorator to register a route handler for a specific path and HTTP methods.
 
+        The handler may be a regular function or an ``async def`` coroutine
+        function, mixed freely in one app. Every engine awaits coroutine
+        handlers on an event loop, so one waiting (long-poll, upstream call)
+        does not hold a thread of the "asyncio" or "reactor" engines.
+
+        The path may hold parameters, written ``<name>`` or ``<converter:name>``
+        with the converters ``str``, ``int``, ``float`` and ``path`` (see
+        :mod:`daemon.router`). A request for the path with another method is
+        answered with ``405 Method Not Allowed``.
+
+        The handler is called with ``headers`` and ``body`` keyword arguments,
+        the path parameters by name, plus ``query`` (dict), ``cookies`` (dict) and ``json`` (decoded body, None
+        when empty) for those of them it declares as parameters. A request whose
+        body is not valid JSON is answered with an "Invalid JSON" error without
+        calling a handler declaring ``json``.
+
         :param path (str): The URL path to route.
         :param methods (list): A list of HTTP methods (e.g., ['GET', 'POST']) to bind.
+        :param stream (bool): give the handler its body as a file-like
+                              :class:`RequestBody <RequestBody>` written to a
+                              spooled file while it is received, instead of a
+                              ``str`` held in memory. For large uploads and imports.
+        :param max_body_size (int): largest body accepted by a streaming route, in
+                                    bytes, None for no limit.
+        :param spool_size (int): size past which the body of a streaming route
+                                 spills from memory to a temporary file, in bytes.
+        :param cpu_bound (bool): run the handler in a worker process (see
+                                 :mod:`daemon.offload`), so a long computation
+                                 does not stall the other clients of the server.
+                                 Its arguments must be picklable and its result
+                                 is JSON-encoded in the worker.
 
         :rtype: function - A decorator that registers the handler function.
+
+        :raises ValueError: If the path is malformed, the handler does not take
+                            one of its parameters, or a CPU-bound handler is a
+                            coroutine, a streaming route or not module-level.
         """
         def decorator(func):
+            if cpu_bound and (stream or inspect.iscoroutinefunction(func) or '<' in func.__qualname__):
+                raise ValueError("CPU-bound route handler {} must be a regular module-level function "
+                                 "without a streamed body".format(func.__qualname__))
+            missing = [name for name in path_params(path) if not accepts_argument(func, name)]
+            if missing:
+                raise ValueError("Route handler {} does not take the path parameters {} of {}".format(
+                    func.__name__, ", ".join(missing), path))
             for method in methods:
                 self.routes[(method.upper(), path)] = func
 
             # Optional attach route metadata to the function
             func._route_path = path
             func._route_methods = methods
+            func._route_stream = stream
+            func._route_max_body_size = max_body_size
+            func._route_spool_size = spool_size
+            func._route_params = route_params(func)
+            func._route_cpu_bound = cpu_bound
+            # A CPU-bound handler is awaited on an event loop like a coroutine one
+            func._route_async = cpu_bound or inspect.iscoroutinefunction(func)
 
             return func
         return decorator
 
-    def run(self):
+    def cache(self, ttl, key=None, tags=()):
+        """
+        Decorator caching the encoded responses of a route handler for ``ttl``
+        seconds, placed under ``@app.route``. A cached response is sent without
+        calling the handler nor encoding its result, once the ``before_request``
+        middleware let the request through. Only GET requests are cached, and
+        neither streamed nor ``{"status": "error"}`` results.
+
+        :param ttl (float): seconds a response stays valid.
+        :param key (callable): ``key(request)`` returning a hashable cache key.
+                               Defaults to the path and query string.
+        :param tags (list): invalidation tags of the responses, as templates
+                            formatted with the path parameters (e.g.
+                            ``"channel:{channel}"``), or a callable
+                            ``tags(request)`` returning them. See :meth:`invalidate`.
+
+        :rtype: function - A decorator that marks the handler function.
+        """
+        def decorator(func):
+            func._route_cache = CachePolicy(ttl, key=key, tags=tags)
+            return func
+        return decorator
+
+    def offload(self, func, *args, **kwargs):
+        """
+        Run a CPU-heavy function in a worker process, from an ``async def``
+        route handler, so that the server keeps serving other clients
+        meanwhile. See :mod:`daemon.offload`.
+
+        :param func (function): a module-level function.
+        :param args: its picklable arguments.
+
+        :rtype asyncio.Future: its result, to be awaited.
+        """
+        return offload.offload(func, *args, **kwargs)
+
+    def cache_control(self, pattern, value):
+        """
+        Set the ``Cache-Control`` header of the responses to the paths matching
+        a pattern, static files and routes alike, e.g. a long ``max-age`` for
+        assets that never change. Other paths get ``no-cache``: browsers keep
+        them but revalidate them with their ``ETag``, answered ``304 Not
+        Modified`` when unchanged (see :mod:`daemon.conditional`).
+
+        :param pattern (str): the path pattern, e.g. ``/images/*``, matched with
+                              :mod:`fnmatch` in registration order.
+        :param value (str): the header value, e.g. ``public, max-age=31536000, immutable``.
+        """
+        self.cache_controls.add(pattern, value)
+
+    def invalidate(self, *tags):
+        """
+        Make the cached responses carrying any of the tags stale, e.g. from a
+        handler changing the data they were built from.
+
+        :param tags (str): the tags, e.g. ``"channel:general"``.
+        """
+        self.response_cache.invalidate(*tags)
+
+    def before_request(self, func):
+        """
+        Decorator to register a middleware called as ``func(request)`` before
+        the route handler of every routed request. When it returns anything but
+        None, the request is answered with that result and the handler is not
+        called. It may be an ``async def`` function.
+
+        :param func (function): the middleware.
+
+        :rtype: function - the middleware, unchanged.
+        """
+        self.pipeline.add("before", func)
+        return func
+
+    def after_request(self, func):
+        """
+        Decorator to register a middleware called as ``func(request, result)``
+        with the result of the route handler of every routed request. When it
+        returns anything but None, that replaces the result. It may be an
+        ``async def`` function.
+
+        :param func (function): the middleware.
+
+        :rtype: function - the middleware, unchanged.
+        """
+        self.pipeline.add("after", func)
+        return func
+
+    def around_request(self, func):
+        """
+        Decorator to register a middleware wrapping the route handler of every
+        routed request: a generator function called as ``func(request)``, whose
+        ``yield`` returns the result of the handler or raises its exception (see
+        :mod:`daemon.middleware`).
+
+        Middleware run in registration order, and their time and the handler
+        time are sent in the ``Server-Timing`` response header and summed up in
+        ``app.pipeline.stats()``. Without middleware, the header is only sent
+        when the app is created with ``server_timing=True``.
+
+        :param func (function): the middleware.
+
+        :rtype: function - the middleware, unchanged.
+        """
+        self.pipeline.add("around", func)
+        return func
+
+    def on_shutdown(self, func):
+        """
+        Decorator to register a function called without arguments once the
+        server stopped and drained its in-flight requests, e.g. to flush state
+        to disk. With several workers it runs in every worker process.
+
+        :param func (function): the shutdown hook.
+
+        :rtype: function - the hook, unchanged.
+        """
+        self.shutdown_hooks.append(func)
+        return func
+
+    def run(self, engine="thread", workers=1, **options):
         """
         Start the backend server and begin handling requests.
 
         This method launches the TCP server using the configured IP and port,
         and dispatches incoming requests to the registered route handlers.
 
+        :param engine (str): Backend serving engine, see :func:`create_backend`.
+        :param workers (int): Number of pre-forked worker processes sharing the port.
+                              Handlers keeping state in module variables see one
+                              copy per worker.
+        :param options: Engine specific settings forwarded to :func:`create_backend`,
+                        e.g. ``pool_size``, ``queue_size`` and ``overflow`` for the
+                        "pool" engine, ``executor_workers`` for the "asyncio" engine or
+                        ``handler_threads`` for the "reactor" engine.
+
         :raise: Error if IP or port has not been configured.
         """
         if not self.ip or not self.port:
             print("Rous app need to preapre address"
                   "by calling app.prepare_address(ip,port)")
 
-        create_backend(self.ip, self.port, self.routes)
-        
+        create_backend(self.ip, self.port, self.routes, engine=engine, workers=workers,
+                       on_shutdown=self.shutdown_hooks, config=self.config, **options)
@@ -0,0 +1,237 @@
+#
+# Copyright (C) 2025 pdnguyen of HCMC University of Technology VNU-HCM.
+# All rights reserved.
+# This file is part of the CO3093/CO3094 course.
+#
+# WeApRous release
+#
+# The authors hereby grant to Licensee personal permission to use
+# and modify the Licensed Source Code for the sole purpose of studying
+# while attending the course
+#
+
+"""
+daemon.workerpool
+~~~~~~~~~~~~~~~~~
+
+This module provides a bounded :class:`WorkerPool <WorkerPool>` object, a fixed
+set of threads fed from a bounded queue. The backend uses it to serve accepted
+connections without spawning a new thread per client.
+
+Overflow policies:
+------------------
+- block: the submitter waits until a queue slot frees up.
+- reject: the job is refused so the caller can answer ``503 Service Unavailable``.
+- drop: the job is refused so the caller can close the connection silently.
+
+Usage Example:
+--------------
+>>> pool = WorkerPool(size=8, queue_size=128, overflow="reject")
+>>> pool.start()
+>>> pool.submit(print, "hello")
+True
+>>> pool.stats()["submitted"]
+1
+>>> pool.shutdown()
+"""
+
+import queue
+import threading
+import time
+
+#: Supported behaviours when the job queue is full.
+OVERFLOW_POLICIES = ("block", "reject", "drop")
+
+
+class WorkerPool:
+    """
+    A fixed-size :class:`WorkerPool <WorkerPool>` of daemon threads consuming jobs
+    from a bounded queue.
+
+    Attributes:
+        size (int): number of worker threads.
+        queue_size (int): maximum number of queued jobs waiting for a worker.
+        overflow (str): policy applied when the queue is full, see ``OVERFLOW_POLICIES``.
+        name (str): prefix used for worker thread names.
+    """
+
+    __attrs__ = [
+        "size",
+        "queue_size",
+        "overflow",
+        "name",
+    ]
+
+    def __init__(self, size=16, queue_size=256, overflow="reject", name="Worker"):
+        """
+        Initialize a new WorkerPool instance.
+
+        :param size (int): number of worker threads.
+        :param queue_size (int): bound of the job queue.
+        :param overflow (str): one of ``OVERFLOW_POLICIES``.
+        :param name (str): prefix used for worker thread names.
+
+        :raises ValueError: If the size, the queue bound or the overflow policy is invalid.
+        """
+        if size < 1:
+            raise ValueError("WorkerPool size must be at least 1, got {}".format(size))
+        if queue_size < 1:
+            raise ValueError("WorkerPool queue_size must be at least 1, got {}".format(queue_size))
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Invalid overflow policy {}, expected one of {}".format(
+                overflow, OVERFLOW_POLICIES))
+
+        #: Number of worker threads.
+        self.size = size
+        #: Queue bound
+        self.queue_size = queue_size
+        #: Overflow policy
+        self.overflow = overflow
+        #: Thread name prefix
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._stopping = False
+
+        # Counters, guarded by self._lock
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+        self._dropped = 0
+        self._busy = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def start(self):
+        """
+        Spawn the worker threads. Calling it twice has no effect.
+        """
+        if self._threads:
+            return
+        for i in range(self.size):
+            t = threading.Thread(target=self._worker, name="{}-{}".format(self.name, i), daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, func, *args):
+        """
+        Queue ``func(*args)`` for execution by a worker thread.
+
+        :param func (callable): the job to run.
+        :param args: positional arguments of the job.
+
+        :rtype bool: True if the job was queued, False if it was refused by
+                     the overflow policy or the pool is shut down.
+        """
+        if self._stopping:
+            with self._lock:
+                self._rejected += 1
+            return False
+        item = (func, args, time.monotonic())
+        try:
+            if self.overflow == "block":
+                self._queue.put(item)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            return False
+
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def _worker(self):
+        """
+        Worker thread main loop: take a job, record its queue wait and run it.
+        A ``None`` item stops the worker, and so does any item taken once the
+        pool is shut down, which is dropped.
+        """
+        while not self._stopping:
+            item = self._queue.get()
+            if item is None or self._stopping:
+                if item is not None:
+                    with self._lock:
+                        self._dropped += 1
+                # Pass the wake-up on, the queue may hold fewer than one per worker
+                try:
+                    self._queue.put_nowait(None)
+                except queue.Full:
+                    pass
+                break
+            func, args, queued_at = item
+            waited = time.monotonic() - queued_at
+            with self._lock:
+                self._busy += 1
+                self._wait_total += waited
+                if waited > self._wait_max:
+                    self._wait_max = waited
+            try:
+                func(*args)
+            except Exception as e:
+                print("[WorkerPool] Error in job {}: {}".format(func, e))
+                with self._lock:
+                    self._failed += 1
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._completed += 1
+
+    def stats(self):
+        """
+        Snapshot of the pool counters.
+
+        :rtype dict: submitted, completed, rejected, failed and dropped job counts,
+                     the number of busy workers, the current queue depth and the queue wait time
+                     (average and maximum, in milliseconds).
+        """
+        with self._lock:
+            started = self._completed + self._busy
+            return {
+                "size": self.size,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "failed": self._failed,
+                "dropped": self._dropped,
+                "busy": self._busy,
+                "queued": self._queue.qsize(),
+                "wait_avg_ms": (self._wait_total / started * 1000.0) if started else 0.0,
+                "wait_max_ms": self._wait_max * 1000.0,
+            }
+
+    def shutdown(self, wait=True, timeout=None):
+        """
+        Stop the worker threads: each one exits once done with its current job.
+        Jobs still queued are dropped, and later submissions refused. Never
+        blocks on the queue, so it returns even when every worker is stuck with
+        a full queue, e.g. past the drain deadline.
+
+        :param wait (bool): join the worker threads before returning.
+        :param timeout (float): maximum seconds to wait for each thread.
+        """
+        self._stopping = True
+        dropped = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                dropped += 1
+        with self._lock:
+            self._dropped += dropped
+        for _ in self._threads:
+            # Wakes up the idle workers; busy ones see the flag after their job
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        if wait:
+            for t in self._threads:
+                t.join(timeout)
+        self._threads = []
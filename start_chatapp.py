@@ -17,12 +17,18 @@ It combines client-server and P2P paradigms for distributed chat functionality.
 """
 
 import json
+import time
+import heapq
+import asyncio
+import difflib
 import argparse
 import threading
 from datetime import datetime
 
 from db.database_manager import DatabaseManager
 from daemon.weaprous import WeApRous
+from daemon.admission import AdmissionController
+from daemon.codec import iterencode
 
 PORT = 8001 # Default port for chat app
 
@@ -40,6 +46,9 @@ direct_messages = loaded_data.get("direct_messages", {})
 print(f"[DB] Loaded {len(peers_registry)} peers, {len(channels)} channels, "
       f"{len(direct_messages)} direct message threads.")
 
+# Images do not change between releases; pages, CSS and JS are revalidated
+app.cache_control("/images/*", "public, max-age=86400")
+
 @app.route('/login', methods=['POST'])
 def chat_login(headers="guest", body="anonymous"):
     """
@@ -56,7 +65,7 @@ def chat_login(headers="guest", body="anonymous"):
 
 
 @app.route('/submit-info', methods=["POST"])
-def submit_peer_info(headers="", body=""):
+def submit_peer_info(headers="", body="", json=None):
     """
     Register a new peer with the centralized server.
     
@@ -64,9 +73,10 @@ def submit_peer_info(headers="", body=""):
     
     :param headers: Request headers
     :param body: JSON containing peer information
+    :param json: Decoded JSON body (None when empty)
     """
     try:
-        data = json.loads(body) if body else {}
+        data = json or {}
         peer_id = data.get("peer_id")
         peer_ip = data.get("ip")
         peer_port = data.get("port")
@@ -83,6 +93,7 @@ def submit_peer_info(headers="", body=""):
         }
         
         db.save_all(peers_registry, channels, peer_connections, direct_messages)
+        app.invalidate("peers")
         
         print(f"[ChatApp] Peer registered: {peer_id} at {peer_ip}:{peer_port}")
         print(f"[ChatApp] Total peers: {len(peers_registry)}")
@@ -93,15 +104,13 @@ def submit_peer_info(headers="", body=""):
             "peer_id": peer_id
         }
         
-    except json.JSONDecodeError:
-        print("[ChatApp] Invalid JSON in submit-info")
-        return {"status": "error", "message": "Invalid JSON"}
     except Exception as e:
         print(f"[ChatApp] Error in submit-info: {e}")
         return {"status": "error", "message": str(e)}
 
 
 @app.route("/get-list", methods=["GET"])
+@app.cache(ttl=2, tags=["peers"])
 def get_peer_list(headers="", body=""):
     """
     Retrieve the list of active peers.
@@ -130,7 +139,7 @@ def get_peer_list(headers="", body=""):
     }
     
 @app.route("/add-list", methods=["POST"])
-def add_to_channel(headers="", body=""):
+def add_to_channel(headers="", body="", json=None):
     """
     Add a peer to a channel.
     
@@ -138,9 +147,10 @@ def add_to_channel(headers="", body=""):
     
     :param headers: Request headers
     :param body: JSON containing peer_id and channel name
+    :param json: Decoded JSON body (None when empty)
     """
     try:
-        data = json.loads(body) if body else {}
+        data = json or {}
         peer_id = data.get("peer_id")
         channel_name = data.get("channel", "general")
         
@@ -174,15 +184,13 @@ def add_to_channel(headers="", body=""):
             "members_count": len(channels[channel_name]["members"])
         }
         
-    except json.JSONDecodeError:
-        return {"status": "error", "message": "Invalid JSON"}
     except Exception as e:
         print(f"[ChatApp] Error in add-list: {e}")
         return {"status": "error", "message": str(e)}
 
 
 @app.route("/connect-peer", methods=["POST"])
-def connect_to_peer(headers="", body=""):
+def connect_to_peer(headers="", body="", json=None):
     """
     Initiate P2P connection setup between peers.
     
@@ -190,9 +198,10 @@ def connect_to_peer(headers="", body=""):
     
     :param headers: Request headers
     :param body: JSON containing source and destination peer IDs
+    :param json: Decoded JSON body (None when empty)
     """
     try:
-        data = json.loads(body) if body else {}
+        data = json or {}
         from_peer = data.get("from_peer")
         to_peer=  data.get("to_peer")
         
@@ -219,15 +228,13 @@ def connect_to_peer(headers="", body=""):
             }
         }
 
-    except json.JSONDecodeError:
-        return {"status": "error", "message": "Invalid JSON"}
     except Exception as e:
         print(f"[ChatApp] Error in connect-peer: {e}")
         return {"status": "error", "message": str(e)}
 
 
 @app.route("/broadcast-peer", methods=["POST"])
-def broadcast_message(headers="", body=""):
+def broadcast_message(headers="", body="", json=None):
     """
     Broadcast a message to all peers in a channel.
     
@@ -235,9 +242,10 @@ def broadcast_message(headers="", body=""):
     
     :param headers: Request headers
     :param body: JSON containing peer_id, channel, and message
+    :param json: Decoded JSON body (None when empty)
     """
     try:
-        data = json.loads(body) if body else {}
+        data = json or {}
         peer_id = data.get('peer_id')
         channel_name = data.get('channel', 'general')
         message = data.get('message')
@@ -255,6 +263,7 @@ def broadcast_message(headers="", body=""):
             "timestamp": datetime.now().isoformat()
         }
         channels[channel_name]['messages'].append(message_obj)
+        app.invalidate(f"channel:{channel_name}")
         
         # Get list of peers to broadcast to
         target_peers = [p for p in channels[channel_name]['members'] if p != peer_id]
@@ -270,15 +279,13 @@ def broadcast_message(headers="", body=""):
             "channel": channel_name
         }
 
-    except json.JSONDecodeError:
-        return {"status": "error", "message": "Invalid JSON"}
     except Exception as e:
         print(f"[ChatApp] Error in broadcast-peer: {e}")
         return {"status": "error", "message": str(e)}
     
     
 @app.route('/send-peer', methods=['POST'])
-def send_direct_message(headers="", body=""):
+def send_direct_message(headers="", body="", json=None):
     """
     Send a direct message to a specific peer.
     
@@ -286,9 +293,10 @@ def send_direct_message(headers="", body=""):
     
     :param headers: Request headers
     :param body: JSON containing sender, receiver, and message
+    :param json: Decoded JSON body (None when empty)
     """
     try:
-        data = json.loads(body) if body else {}
+        data = json or {}
         from_peer = data.get('from_peer')
         to_peer = data.get('to_peer')
         message = data.get('message')
@@ -330,27 +338,30 @@ def send_direct_message(headers="", body=""):
             }
         }
 
-    except json.JSONDecodeError:
-        return {"status": "error", "message": "Invalid JSON"}
     except Exception as e:
         print(f"[ChatApp] Error in send-peer: {e}")
         return {"status": "error", "message": str(e)}
 
+@app.route('/direct-messages/<peer1>/<peer2>', methods=['GET'])
 @app.route('/get-direct-messages', methods=['GET', 'POST'])
-def get_direct_messages(headers="", body=""):
+def get_direct_messages(headers="", body="", json=None, peer1=None, peer2=None):
     """
     Retrieve direct messages between two peers.
     
-    Expected body: {"peer1": "peer123", "peer2": "peer456"}
+    Expected path: /direct-messages/peer123/peer456
+    Or body: {"peer1": "peer123", "peer2": "peer456"}
     Hoặc chỉ cần {"from_peer": "peer123", "to_peer": "peer456"} (hoặc ngược lại)
     
     :param headers: Request headers
     :param body: JSON containing peer IDs
+    :param json: Decoded JSON body (None when empty)
+    :param peer1: First peer ID, from the path
+    :param peer2: Second peer ID, from the path
     """
     try:
-        data = json.loads(body) if body else {}
-        peer1 = data.get('peer1') or data.get('from_peer') or data.get('to_peer')
-        peer2 = data.get('peer2') or data.get('to_peer') or data.get('from_peer')
+        data = json or {}
+        peer1 = peer1 or data.get('peer1') or data.get('from_peer') or data.get('to_peer')
+        peer2 = peer2 or data.get('peer2') or data.get('to_peer') or data.get('from_peer')
         
         # Nếu chỉ có một peer, lấy peer còn lại từ current user
         if not peer1 or not peer2:
@@ -389,28 +400,43 @@ def get_direct_messages(headers="", body=""):
             "count": len(messages)
         }
         
-    except json.JSONDecodeError:
-        return {"status": "error", "message": "Invalid JSON"}
     except Exception as e:
         print(f"[ChatApp] Error in get-direct-messages: {e}")
         import traceback
         traceback.print_exc()
         return {"status": "error", "message": str(e)}
 
+def channel_cache_tags(request):
+    """Cache tag of a channel message list, named like get_channel_messages finds it."""
+    channel_name = (request.path_params or {}).get('channel') or request.query.get('channel')
+    if not channel_name:
+        try:
+            channel_name = (request.json or {}).get('channel', 'general')
+        except (ValueError, AttributeError):
+            channel_name = 'general'
+    return [f"channel:{channel_name}"]
+
+@app.route('/channels/<channel>/messages', methods=['GET'])
 @app.route('/get-messages', methods=['GET', 'POST'])
-def get_channel_messages(headers="", body=""):
+@app.cache(ttl=5, key=lambda request: (request.path, request.query_string, request.body_bytes),
+           tags=channel_cache_tags)
+def get_channel_messages(headers="", body="", query=None, json=None, channel=None):
     """
     Retrieve messages from a channel.
     
-    Expected query: ?channel=general
+    Expected path: /channels/general/messages
+    Or query: /get-messages?channel=general
     
     :param headers: Request headers
     :param body: Request body (channel name can be in body or query)
+    :param query: Query string parameters
+    :param json: Decoded JSON body (None when empty)
+    :param channel: Channel name, from the path
     """
     try:
-        # Try to parse channel from body
-        data = json.loads(body) if body else {}
-        channel_name = data.get('channel', 'general')
+        # Channel from the path, else the query string, else the body
+        data = json or {}
+        channel_name = channel or query.get('channel') or data.get('channel', 'general')
         
         if channel_name not in channels:
             return {
@@ -436,6 +462,182 @@ def get_channel_messages(headers="", body=""):
         print(f"[ChatApp] Error in get-messages: {e}")
         return {"status": "error", "message": str(e)}
 
+@app.route('/channels/<channel>/wait', methods=['GET'])
+async def wait_channel_messages(headers="", body="", query=None, channel=None):
+    """
+    Long-poll a channel: answer as soon as it holds more than ``since``
+    messages, or with no message once ``timeout`` seconds have passed. The
+    handler is a coroutine, so waiting clients do not hold a server thread.
+
+    Expected path: /channels/general/wait?since=12&timeout=25
+
+    :param headers: Request headers
+    :param body: Request body (not used)
+    :param query: Query string parameters
+    :param channel: Channel name, from the path
+    """
+    try:
+        since = int(query.get('since', 0))
+        timeout = min(float(query.get('timeout', 25)), 60)
+    except ValueError:
+        return {"status": "error", "message": "since and timeout must be numbers"}
+
+    deadline = time.monotonic() + timeout
+    while True:
+        messages = channels.get(channel, {}).get("messages", [])
+        if len(messages) > since or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(0.2)
+
+    new_messages = messages[since:]
+    return {
+        "status": "success",
+        "channel": channel,
+        "messages": new_messages,
+        "count": len(messages)
+    }
+
+def rank_messages(texts, terms, limit):
+    """
+    Fuzzy-match search terms against message texts, word by word, and keep the
+    best matches. CPU-heavy: run in a worker process through app.offload.
+
+    :param texts (list): message texts.
+    :param terms (list): lowercase search terms.
+    :param limit (int): number of matches kept.
+
+    :rtype list: (score, index in texts) of the best matches, best first.
+    """
+    scored = []
+    for index, text in enumerate(texts):
+        words = text.lower().split()
+        score = 0.0
+        for term in terms:
+            score += max((difflib.SequenceMatcher(None, term, word).ratio() for word in words), default=0.0)
+        if score:
+            scored.append((score / len(terms), index))
+    return heapq.nlargest(limit, scored)
+
+@app.route('/channels/<channel>/search', methods=['GET'])
+async def search_channel_messages(headers="", body="", query=None, channel=None):
+    """
+    Fuzzy search of the messages of a channel, tolerant to typos. The ranking
+    runs in a worker process, so the server keeps answering other clients
+    while it computes.
+
+    Expected path: /channels/general/search?q=hello+world&limit=20
+
+    :param headers: Request headers
+    :param body: Request body (not used)
+    :param query: Query string parameters
+    :param channel: Channel name, from the path
+    """
+    terms = query.get('q', '').lower().split()
+    if not terms:
+        return {"status": "error", "message": "Missing search terms q"}
+    try:
+        limit = max(int(query.get('limit', 20)), 1)
+    except ValueError:
+        return {"status": "error", "message": "limit must be a number"}
+
+    # Snapshot of the message list; only the texts are sent to the worker
+    messages = list(channels.get(channel, {}).get("messages", []))
+    ranked = await app.offload(rank_messages, [msg.get("message", "") for msg in messages], terms, limit)
+    print(f"[ChatApp] Searched {len(messages)} messages of {channel}: {len(ranked)} matches")
+    return {
+        "status": "success",
+        "channel": channel,
+        "matches": [dict(messages[index], score=round(score, 3)) for score, index in ranked],
+        "searched": len(messages)
+    }
+
+@app.route('/channels/<channel>/export', methods=['GET'])
+@app.route('/export-messages', methods=['GET', 'POST'])
+def export_channel_messages(headers="", body="", query=None, channel=None):
+    """
+    Stream the full history of a channel, in the same JSON shape as
+    /get-messages, without building the whole document in memory first.
+
+    Expected path: /channels/general/export
+    Or query: /export-messages?channel=general
+
+    :param headers: Request headers
+    :param body: Request body (not used)
+    :param query: Query string parameters
+    :param channel: Channel name, from the path
+    """
+    channel_name = channel or query.get('channel', 'general')
+    # Snapshot of the message list; messages posted meanwhile are not exported
+    messages = list(channels.get(channel_name, {}).get("messages", []))
+    print(f"[ChatApp] Exporting {len(messages)} messages from {channel_name}")
+
+    return iterencode({
+        "status": "success",
+        "channel": channel_name,
+        "messages": messages,
+        "count": len(messages)
+    })
+
+@app.route('/import-messages', methods=['POST'], stream=True)
+def import_channel_messages(headers="", body=None):
+    """
+    Bulk import of channel messages, one JSON object per line (the body is
+    streamed to a spooled file, not held in memory).
+
+    Expected body lines: {"channel": "general", "from": "peer123", "message": "Hello", "timestamp": "..."}
+
+    :param headers: Request headers
+    :param body: RequestBody file-like object
+    """
+    imported = 0
+    skipped = 0
+    touched = set()
+    for line in body:
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            skipped += 1
+            continue
+        if not isinstance(data, dict) or not data.get('from') or not data.get('message'):
+            skipped += 1
+            continue
+        channel_name = data.get('channel', 'general')
+        if channel_name not in channels:
+            channels[channel_name] = {"members": [], "messages": []}
+        channels[channel_name]['messages'].append({
+            "from": data['from'],
+            "message": data['message'],
+            "timestamp": data.get('timestamp') or datetime.now().isoformat()
+        })
+        touched.add(f"channel:{channel_name}")
+        imported += 1
+
+    print(f"[ChatApp] Imported {imported} messages ({body.size} bytes), skipped {skipped}")
+    db.save_all(peers_registry, channels, peer_connections, direct_messages)
+    app.invalidate(*touched)
+    return {"status": "success", "imported": imported, "skipped": skipped}
+
+@app.route('/server-timing', methods=['GET'])
+def get_server_timing(headers="", body=""):
+    """
+    Time spent so far in the middleware and the route handlers, by stage,
+    as also sent per request in the Server-Timing response header, and the
+    hit rates of the response and static file caches.
+
+    :param headers: Request headers
+    :param body: Request body (not used)
+    """
+    return {"status": "success", "timings": app.pipeline.stats(), "cache": app.response_cache.stats(),
+            "files": app.file_cache.stats()}
+
+@app.on_shutdown
+def flush_database():
+    """Persist the chat state once in-flight requests are drained."""
+    db.save_all(peers_registry, channels, peer_connections, direct_messages)
+    print("[DB] Chat state saved on shutdown")
+
 if __name__ == "__main__":
     """
     Entry point for launching the chat application server.
@@ -460,12 +662,78 @@ if __name__ == "__main__":
         default=PORT,
         help=f'Port number to bind the server. Default is {PORT}'
     )
+    parser.add_argument(
+        '--engine',
+        choices=['thread', 'pool', 'asyncio', 'reactor'],
+        default='thread',
+        help='Backend engine: one thread per connection, a bounded worker pool, an asyncio event loop or a selectors reactor. Default is thread'
+    )
+    parser.add_argument(
+        '--pool-size',
+        type=int,
+        default=16,
+        help='Number of worker threads for the pool engine, or of handler threads for the asyncio and reactor engines. Default is 16'
+    )
+    parser.add_argument(
+        '--queue-size',
+        type=int,
+        default=256,
+        help='Maximum connections (requests for the reactor engine) waiting for a worker. Default is 256'
+    )
+    parser.add_argument(
+        '--overflow',
+        choices=['block', 'reject', 'drop'],
+        default='reject',
+        help='What the pool engine does when its queue is full. Default is reject'
+    )
+    parser.add_argument(
+        '--keepalive-timeout',
+        type=float,
+        default=5,
+        help='Idle seconds before a persistent connection is closed. Default is 5'
+    )
+    parser.add_argument(
+        '--max-requests',
+        type=int,
+        default=100,
+        help='Maximum requests served on one persistent connection. Default is 100'
+    )
+    parser.add_argument(
+        '--max-in-flight',
+        type=int,
+        default=None,
+        help='Answer 503 once this many requests are in flight. Default is no limit'
+    )
+    parser.add_argument(
+        '--max-queue-wait',
+        type=float,
+        default=None,
+        help='Answer 503 to requests that waited longer than this many seconds for a handler. Default is no limit'
+    )
  
     args = parser.parse_args()
     ip = args.server_ip
     port = args.server_port
 
+    options = {}
+    if args.engine == 'pool':
+        options = {
+            "pool_size": args.pool_size,
+            "queue_size": args.queue_size,
+            "overflow": args.overflow,
+        }
+    elif args.engine == 'asyncio':
+        options = {"executor_workers": args.pool_size}
+    elif args.engine == 'reactor':
+        options = {"handler_threads": args.pool_size, "queue_size": args.queue_size}
+
+    options["keepalive_timeout"] = args.keepalive_timeout
+    options["max_requests"] = args.max_requests
+    if args.max_in_flight is not None or args.max_queue_wait is not None:
+        options["admission"] = AdmissionController(max_in_flight=args.max_in_flight,
+                                                   max_queue_wait=args.max_queue_wait)
+
     # Prepare and launch the chat application
-    print(f"[ChatApp] Starting hybrid chat server on {ip}:{port}")
+    print(f"[ChatApp] Starting hybrid chat server on {ip}:{port} ({args.engine} engine)")
     app.prepare_address(ip, port)
-    app.run()
\ No newline at end of file
+    app.run(engine=args.engine, **options)
\ No newline at end of file
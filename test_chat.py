@@ -10,6 +10,7 @@ import requests
 import json
 import time
 import sys
+import threading
 
 BASE_URL = "http://localhost:8001"
 
@@ -299,6 +300,74 @@ def test_error_handling():
     
     return True
 
+def test_cpu_offload():
+    """Test that light requests stay fast while a CPU-heavy search runs"""
+    print_test("GET /channels/<channel>/search - CPU Offload")
+
+    channel = "offload_test"
+    needed = 5000
+    words = ["hello", "world", "network", "socket", "packet", "router", "python",
+             "server", "client", "message", "channel", "latency", "thread", "process"]
+
+    try:
+        # Fill the channel once; later runs reuse its messages
+        response = requests.get(f"{BASE_URL}/channels/{channel}/wait",
+                                params={"since": needed, "timeout": 0})
+        count = response.json().get("count", 0)
+        if count < needed:
+            lines = []
+            for i in range(needed - count):
+                text = " ".join(words[(i * 7 + k * 3) % len(words)] for k in range(10))
+                lines.append(json.dumps({"channel": channel, "from": f"bench_{i % 50}", "message": text}))
+            response = requests.post(f"{BASE_URL}/import-messages", data="\n".join(lines))
+            print_info(f"Imported {response.json().get('imported')} messages into {channel}")
+
+        heavy = {}
+
+        def run_search():
+            started = time.perf_counter()
+            response = requests.get(f"{BASE_URL}/channels/{channel}/search",
+                                    params={"q": "helo netwrok pakcet", "limit": 5}, timeout=120)
+            heavy["seconds"] = time.perf_counter() - started
+            heavy["result"] = response.json()
+
+        search = threading.Thread(target=run_search)
+        search.start()
+        time.sleep(0.1)
+
+        # Light requests while the search runs
+        latencies = []
+        while search.is_alive():
+            started = time.perf_counter()
+            requests.get(f"{BASE_URL}/server-timing", timeout=10)
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.05)
+        search.join()
+
+        result = heavy.get("result", {})
+        if result.get("status") != "success" or not result.get("matches"):
+            print_error(f"Search failed: {result}")
+            return False
+        print_success(f"Searched {result.get('searched')} messages in {heavy['seconds']:.2f}s, "
+                      f"best match: {result['matches'][0].get('message')}")
+
+        if not latencies:
+            print_error("Search finished before any light request was sent")
+            return False
+        worst = max(latencies)
+        print_info(f"{len(latencies)} light requests during the search, "
+                   f"mean {sum(latencies) / len(latencies) * 1e3:.1f}ms, max {worst * 1e3:.1f}ms")
+        if worst > 0.25 or worst > heavy["seconds"] / 2:
+            print_error(f"Light requests were stalled by the search (max {worst * 1e3:.1f}ms)")
+            return False
+        print_success("Light requests kept a low latency during the search")
+
+    except Exception as e:
+        print_error(f"Request failed: {e}")
+        return False
+
+    return True
+
 def run_all_tests():
     """Run all test suites"""
     print(f"\n{Colors.BOLD}{'='*60}")
@@ -327,6 +396,7 @@ def run_all_tests():
         ("Direct Messaging", test_send_peer),
         ("Message Retrieval", test_get_messages),
         ("Error Handling", test_error_handling),
+        ("CPU Offload", test_cpu_offload),
     ]
     
     results = []
@@ -0,0 +1,122 @@
+"""
+Fixtures serving a :class:`WeApRous <WeApRous>` app on an ephemeral port and a
+raw HTTP/1.1 client reading the responses off the socket, so the tests see
+exactly the bytes an engine sends.
+"""
+
+import socket
+import threading
+
+import pytest
+
+from daemon.backend import run_engine
+from daemon.listener import create_listener
+
+
+class Client:
+    """A persistent connection to a test server."""
+
+    def __init__(self, port, timeout=5):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+        self.buffer = b""
+
+    def send(self, data):
+        self.sock.sendall(data)
+
+    def request(self, method, path, headers=None, body=b"", head=False):
+        lines = ["{} {} HTTP/1.1".format(method, path), "Host: test"]
+        for name, value in (headers or {}).items():
+            lines.append("{}: {}".format(name, value))
+        if body:
+            lines.append("Content-Length: {}".format(len(body)))
+        self.send(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        return self.response(head=head or method == "HEAD")
+
+    def fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("connection closed")
+        self.buffer += chunk
+
+    def read(self, size):
+        while len(self.buffer) < size:
+            self.fill()
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self):
+        while b"\r\n" not in self.buffer:
+            self.fill()
+        line, self.buffer = self.buffer.split(b"\r\n", 1)
+        return line
+
+    def response(self, head=False):
+        """
+        Read one response.
+
+        :rtype tuple: the status code, the headers with lowercase names, the body.
+        """
+        status = int(self.readline().split()[1])
+        headers = {}
+        while True:
+            line = self.readline()
+            if not line:
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if head or status in (204, 304) or 100 <= status < 200:
+            return status, headers, b""
+        if headers.get("transfer-encoding") == "chunked":
+            body = b""
+            while True:
+                size = int(self.readline().split(b";")[0], 16)
+                if not size:
+                    self.readline()
+                    return status, headers, body
+                body += self.read(size)
+                self.readline()
+        return status, headers, self.read(int(headers.get("content-length", 0)))
+
+    def closed(self):
+        """Tell whether the server closed the connection."""
+        try:
+            return self.sock.recv(1) == b""
+        except ConnectionError:
+            return True
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def serve():
+    """
+    Start an app with an engine in a daemon thread.
+
+    :rtype function: ``serve(app, engine="thread", **options)`` returning the port.
+    """
+    def start(app, engine="thread", **options):
+        listener = create_listener("127.0.0.1", 0)
+        port = listener.getsockname()[1]
+        threading.Thread(target=run_engine, args=("127.0.0.1", port, app.routes, engine),
+                         kwargs=dict(listener=listener, config=app.config, **options),
+                         daemon=True).start()
+        return port
+    return start
+
+
+@pytest.fixture
+def client():
+    """
+    Open connections to a test server, closed after the test.
+
+    :rtype function: ``client(port)`` returning a :class:`Client`.
+    """
+    clients = []
+
+    def connect(port, timeout=5):
+        clients.append(Client(port, timeout))
+        return clients[-1]
+    yield connect
+    for conn in clients:
+        conn.close()
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from daemon.admission import AdmissionController
+from daemon.weaprous import WeApRous
+
+
+def test_in_flight_limit():
+    admission = AdmissionController(max_in_flight=2, max_queue_wait=None)
+    assert admission.admit() and admission.admit()
+    assert admission.overloaded()
+    assert not admission.admit()
+    admission.release()
+    assert admission.admit()
+    stats = admission.stats()
+    assert (stats["admitted"], stats["shed"], stats["peak_in_flight"]) == (3, 2, 2)
+
+
+def test_queue_wait_limit():
+    admission = AdmissionController(max_in_flight=None, max_queue_wait=0.05)
+    assert admission.admit(time.monotonic())
+    assert not admission.admit(time.monotonic() - 1)
+    stats = admission.stats()
+    assert (stats["admitted"], stats["shed_queue_wait"], stats["in_flight"]) == (1, 1, 1)
+
+
+def test_invalid_thresholds():
+    with pytest.raises(ValueError):
+        AdmissionController(max_in_flight=0)
+    with pytest.raises(ValueError):
+        AdmissionController(max_queue_wait=0)
+
+
+def test_reply_is_503_with_retry_after():
+    reply = AdmissionController(retry_after=3).reply
+    assert reply.startswith(b"HTTP/1.1 503 ")
+    assert b"Retry-After: 3\r\n" in reply
+
+
+@pytest.mark.parametrize("engine", ["thread", "pool", "asyncio", "reactor"])
+def test_request_over_in_flight_limit_is_shed(serve, client, engine):
+    app = WeApRous()
+    entered, release = threading.Event(), threading.Event()
+
+    @app.route('/slow', methods=['GET'])
+    def slow(headers, body):
+        entered.set()
+        release.wait(5)
+        return {'ok': True}
+
+    admission = AdmissionController(max_in_flight=1, retry_after=2)
+    port = serve(app, engine=engine, admission=admission)
+    first = client(port)
+    first.send(b"GET /slow HTTP/1.1\r\nHost: test\r\n\r\n")
+    assert entered.wait(5)
+    status, headers, _ = client(port).request("GET", "/slow")
+    assert status == 503
+    assert headers["retry-after"] == "2"
+    release.set()
+    assert first.response()[0] == 200
+    assert admission.stats()["shed"] == 1
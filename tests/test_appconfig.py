@@ -0,0 +1,35 @@
+from daemon.appconfig import AppConfig, DEFAULT_CONFIG
+from daemon.request import Request
+from daemon.router import Router
+from daemon.weaprous import WeApRous
+
+
+def big_app(**settings):
+    app = WeApRous(**settings)
+
+    @app.route('/big', methods=['GET'])
+    def big(headers, body):
+        return {'items': ['x' * 10] * 500}
+
+    return app
+
+
+def test_router_holds_routes_only():
+    router = Router({("GET", "/a"): print})
+    assert not hasattr(router, 'pipeline') and not hasattr(router, 'cache')
+    assert Request().config is DEFAULT_CONFIG
+
+
+def test_app_config_holds_the_app_settings():
+    app = WeApRous(compress_min_size=None)
+    assert isinstance(app.config, AppConfig)
+    assert app.config.pipeline is app.pipeline and app.config.cache is app.response_cache
+    assert app.config.compress_min_size is None
+
+
+def test_app_settings_reach_the_response(serve, client):
+    gzip = {'Accept-Encoding': 'gzip'}
+    _, headers, _ = client(serve(big_app())).request("GET", "/big", headers=gzip)
+    assert headers.get('content-encoding') == 'gzip'
+    _, headers, _ = client(serve(big_app(compress_min_size=None))).request("GET", "/big", headers=gzip)
+    assert 'content-encoding' not in headers
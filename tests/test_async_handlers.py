@@ -0,0 +1,42 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from daemon.weaprous import WeApRous
+
+
+def async_app():
+    app = WeApRous()
+    started = threading.Event()
+    ready = asyncio.Event()
+
+    @app.route('/wait', methods=['GET'])
+    async def wait(headers, body, query):
+        started.set()
+        await asyncio.wait_for(ready.wait(), 5)
+        return {'waited': query.get('id')}
+
+    @app.route('/release', methods=['POST'])
+    async def release(headers, body, json):
+        await asyncio.sleep(0)
+        ready.set()
+        return {'released': json['id']}
+
+    return app, started
+
+
+@pytest.mark.parametrize("engine", ["thread", "pool", "asyncio", "reactor"])
+def test_waiting_async_handler_does_not_block_others(serve, client, engine):
+    app, started = async_app()
+    port = serve(app, engine=engine)
+    waiting = client(port)
+    waiting.send(b"GET /wait?id=1 HTTP/1.1\r\nHost: test\r\n\r\n")
+    assert started.wait(5)
+    status, _, body = client(port).request("POST", "/release", body=b'{"id": 2}')
+    assert status == 200 and json.loads(body) == {'released': 2}
+    status, _, body = waiting.response()
+    assert status == 200 and json.loads(body) == {'waited': '1'}
+    # The connection of a coroutine handler stays persistent
+    assert waiting.request("POST", "/release", body=b'{"id": 3}')[0] == 200
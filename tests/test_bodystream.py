@@ -0,0 +1,69 @@
+import hashlib
+import json
+
+import pytest
+
+from daemon.bodystream import RequestBody
+from daemon.framing import FramingError
+from daemon.weaprous import WeApRous
+
+
+def upload_app():
+    app = WeApRous()
+
+    @app.route('/upload', methods=['POST'], stream=True, max_body_size=1024, spool_size=16)
+    def upload(headers, body):
+        return {'type': type(body).__name__, 'size': body.size, 'spilled': body.spilled,
+                'sha1': hashlib.sha1(body.read()).hexdigest()}
+
+    @app.route('/lines', methods=['POST'], stream=True)
+    async def lines(headers, body):
+        data = b""
+        async for chunk in body:
+            data += chunk
+        return {'lines': data.count(b"\n")}
+
+    @app.route('/buffered', methods=['POST'])
+    def buffered(headers, body):
+        return {'type': type(body).__name__}
+
+    return app
+
+
+def test_body_spills_past_spool_size():
+    body = RequestBody(max_size=None, spool_size=4)
+    body.write(b"ab")
+    assert not body.spilled
+    body.write(b"cdef")
+    body.finish()
+    assert body.spilled and body.size == 6
+    assert list(body.chunks(4)) == [b"abcd", b"ef"]
+    body.close()
+    assert body.closed
+
+
+def test_body_over_max_size_is_refused():
+    body = RequestBody(max_size=3)
+    with pytest.raises(FramingError) as info:
+        body.write(b"abcd")
+    assert info.value.status_code == 413
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_streaming_route_gets_file_like_body(serve, client, engine):
+    conn = client(serve(upload_app(), engine=engine))
+    data = b"0123456789" * 50
+    status, _, body = conn.request("POST", "/upload", body=data)
+    assert status == 200
+    assert json.loads(body) == {'type': 'RequestBody', 'size': 500, 'spilled': True,
+                                'sha1': hashlib.sha1(data).hexdigest()}
+    status, _, body = conn.request("POST", "/lines", body=b"a\nb\nc\n")
+    assert json.loads(body) == {'lines': 3}
+    status, _, body = conn.request("POST", "/buffered", body=b"x")
+    assert json.loads(body) == {'type': 'str'}
+
+
+def test_streaming_route_refuses_body_over_its_limit(serve, client):
+    conn = client(serve(upload_app()))
+    status, _, _ = conn.request("POST", "/upload", body=b"x" * 2048)
+    assert status == 413
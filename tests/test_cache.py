@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from daemon.cache import CacheEntry, CachePolicy, ResponseCache
+from daemon.weaprous import WeApRous
+
+
+def cached_app(calls):
+    app = WeApRous()
+
+    @app.route('/channels/<name>/members', methods=['GET'])
+    @app.cache(ttl=60, tags=['channel:{name}'])
+    def members(headers, body, name):
+        calls.append(name)
+        return {'channel': name, 'members': ['a', 'b']}
+
+    @app.route('/slow/<name>', methods=['GET'])
+    @app.cache(ttl=60)
+    async def slow(headers, body, name):
+        calls.append(name)
+        return {'slow': name}
+
+    return app
+
+
+def get(conn, path, auth=None):
+    headers = {'Cookie': 'auth=' + auth} if auth else {}
+    status, headers, body = conn.request("GET", path, headers=headers)
+    return status, json.loads(body)
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_hit_is_not_answered_before_before_request(serve, client, engine):
+    calls = []
+    app = cached_app(calls)
+
+    @app.before_request
+    def require_auth(request):
+        if request.cookies.get('auth') != 'true':
+            return {'status': 'error', 'message': 'Unauthorized'}
+
+    conn = client(serve(app, engine=engine))
+    for path in ('/channels/general/members', '/slow/general'):
+        assert 'status' not in get(conn, path, auth='true')[1]
+        assert get(conn, path)[1] == {'status': 'error', 'message': 'Unauthorized'}
+        assert 'status' not in get(conn, path, auth='true')[1]
+    assert calls == ['general', 'general']
+
+
+def test_cache_keeps_handler_result_not_after_request_rewrite(serve, client):
+    calls = []
+    app = cached_app(calls)
+
+    @app.after_request
+    def add_user(request, result):
+        return dict(result, user=request.cookies.get('auth'))
+
+    conn = client(serve(app))
+    assert get(conn, '/channels/general/members', auth='alice')[1]['user'] == 'alice'
+    assert get(conn, '/channels/general/members', auth='bob')[1]['user'] == 'bob'
+    assert calls == ['general']
+
+
+def test_invalidated_tag_calls_handler_again(serve, client):
+    calls = []
+    app = cached_app(calls)
+    conn = client(serve(app))
+    _, headers, body = conn.request("GET", "/channels/general/members")
+    assert conn.request("GET", "/channels/general/members")[2] == body
+    assert conn.request("GET", "/channels/general/members",
+                        headers={'If-None-Match': headers['etag']})[0] == 304
+    app.invalidate('channel:general')
+    conn.request("GET", "/channels/general/members")
+    assert calls == ['general', 'general']
+
+
+def test_response_cache_expiry_and_versions():
+    cache = ResponseCache(max_entries=2)
+    policy = CachePolicy(ttl=60, tags=['t'])
+    assert policy.tags(type('R', (), {'path_params': {}})()) == ['t']
+    cache.put('a', CacheEntry(b'{}', 'application/json', 200, float('inf'), cache.versions(['t'])))
+    assert cache.get('a') is not None
+    cache.invalidate('t')
+    assert cache.get('a') is None
+    cache.put('b', CacheEntry(b'{}', 'application/json', 200, 0, cache.versions(['t'])))
+    assert cache.get('b') is None
+
+
+def test_tag_versions_are_only_kept_for_cached_entries():
+    cache = ResponseCache(max_entries=2)
+    for n in range(100):
+        tag = 'channel:{}'.format(n)
+        cache.put(tag, CacheEntry(b'{}', 'application/json', 200, float('inf'), cache.versions([tag])))
+        cache.invalidate(tag)
+    assert cache.stats()['tags'] == 2
+    cache.get('channel:98')
+    cache.get('channel:99')
+    assert cache.stats()['tags'] == 0
+
+
+def test_fill_in_flight_is_dropped_after_invalidating_a_forgotten_tag():
+    cache = ResponseCache(max_entries=1)
+    cache.put('a', CacheEntry(b'{}', 'application/json', 200, float('inf'), cache.versions(['t'])))
+    cache.invalidate('t')
+    in_flight = cache.versions(['t'])
+    cache.invalidate('t')
+    assert cache.get('a') is None and cache.stats()['tags'] == 0
+    cache.put('b', CacheEntry(b'{}', 'application/json', 200, float('inf'), in_flight))
+    assert cache.get('b') is None
+    fresh = cache.versions(['t'])
+    cache.put('c', CacheEntry(b'{}', 'application/json', 200, float('inf'), fresh))
+    assert cache.get('c') is not None
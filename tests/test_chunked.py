@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from daemon.bodystream import RequestBody
+from daemon.framing import FramingError, RequestFramer, decode_chunked, unchunk_headers
+from daemon.response import encode_chunk
+from daemon.weaprous import WeApRous
+
+
+def chunked_app():
+    app = WeApRous()
+
+    @app.route('/echo', methods=['POST'])
+    def echo(headers, body):
+        return {'body': body, 'length': headers.get('content-length')}
+
+    @app.route('/stream', methods=['GET'])
+    def stream(headers, body):
+        yield b"one"
+        yield ""
+        yield {"n": 2}
+
+    return app
+
+
+def test_decode_chunked_skips_extensions_and_trailers():
+    data = b"3;ext=1\r\nabc\r\nA\r\n0123456789\r\n0\r\nX-Trailer: 1\r\n\r\n"
+    assert decode_chunked(data) == b"abc0123456789"
+
+
+@pytest.mark.parametrize("data", [b"zz\r\nabc\r\n0\r\n\r\n", b"5\r\nabc\r\n", b"3\r\nabc\r\n",
+                                  b"0x3\r\nabc\r\n0\r\n\r\n", b"0_3\r\nabc\r\n0\r\n\r\n",
+                                  b"+3\r\nabc\r\n0\r\n\r\n"])
+def test_decode_chunked_rejects_malformed_bodies(data):
+    with pytest.raises(FramingError):
+        decode_chunked(data)
+
+
+def test_unchunk_headers_keeps_other_codings():
+    headers = {'transfer-encoding': 'gzip, chunked'}
+    unchunk_headers(headers, 12)
+    assert headers == {'transfer-encoding': 'gzip', 'content-length': '12'}
+
+
+def test_framer_decodes_chunks_split_across_feeds():
+    framer = RequestFramer()
+    raw = (b"POST /echo HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+           + encode_chunk(b"hello ") + encode_chunk(b"world") + b"0\r\n\r\nGET /next HTTP/1.1\r\n\r\n")
+    for i in range(0, len(raw), 7):
+        framer.feed(raw[i:i + 7])
+    msg = framer.next_request()
+    assert msg.body == b"hello world"
+    assert msg.headers['content-length'] == '11' and 'transfer-encoding' not in msg.headers
+    assert framer.next_request().target == "/next"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("body, status", [
+    (b"0x10\r\n", 400),
+    (b"1_0\r\n", 400),
+    (b"1" * 200, 400),
+    (b"2\r\nok\r\n" + b"1" * 200, 400),
+    (b"0\r\nX-Trailer: " + b"a" * 200, 431),
+    (b"0\r\n" + b"X-Trailer: a\r\n" * 20, 431),
+])
+def test_framer_bounds_chunk_lines_and_trailers(stream, body, status):
+    sink = None
+    if stream:
+        sink = lambda message: RequestBody(max_size=None)
+    framer = RequestFramer(max_header_size=128, body_sink=sink)
+    framer.feed(b"POST /echo HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n" + body)
+    with pytest.raises(FramingError) as info:
+        framer.next_request()
+    assert info.value.status_code == status
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+def test_chunked_request_body_reaches_handler(serve, client, engine):
+    conn = client(serve(chunked_app(), engine=engine))
+    conn.send(b"POST /echo HTTP/1.1\r\nHost: test\r\nTransfer-Encoding: chunked\r\n\r\n"
+              b"4\r\nping\r\n0\r\n\r\n")
+    status, _, body = conn.response()
+    assert status == 200
+    assert json.loads(body) == {'body': 'ping', 'length': '4'}
+
+
+def test_generator_result_is_streamed_chunked(serve, client):
+    conn = client(serve(chunked_app()))
+    status, headers, body = conn.request("GET", "/stream")
+    assert status == 200
+    assert headers['transfer-encoding'] == 'chunked' and 'content-length' not in headers
+    assert body == b'one{"n":2}'
+    # The connection stays usable after the terminating chunk
+    assert conn.request("GET", "/stream")[0] == 200
+
+
+def test_streamed_response_to_http10_closes_connection(serve, client):
+    conn = client(serve(chunked_app()))
+    conn.send(b"GET /stream HTTP/1.0\r\n\r\n")
+    status, headers, _ = conn.response(head=True)
+    assert status == 200 and 'transfer-encoding' not in headers
+    body = conn.buffer
+    while True:
+        data = conn.sock.recv(65536)
+        if not data:
+            break
+        body += data
+    assert body == b'one{"n":2}'
@@ -0,0 +1,69 @@
+import pytest
+
+from daemon.codec import dumps, loads, is_large, iterencode, STREAM_BATCH
+from daemon.weaprous import WeApRous
+
+
+def test_dumps_and_loads_round_trip():
+    value = {"status": "success", "text": "xin chào", "n": [1, 2.5, None, True]}
+    assert loads(dumps(value)) == value
+    assert loads(dumps(value).decode()) == value
+
+
+def test_dumps_falls_back_for_non_str_keys():
+    assert loads(dumps({1: "a"})) == {"1": "a"}
+
+
+@pytest.mark.parametrize("value", [
+    {"messages": [{"id": i, "text": "m" * 20} for i in range(3 * STREAM_BATCH + 7)]},
+    [{"id": i} for i in range(STREAM_BATCH + 1)],
+    {"messages": [{i: "non-str key"} for i in range(STREAM_BATCH * 2)], "n": 1},
+    {"empty": [], "nested": {"a": [1, 2]}},
+])
+def test_iterencode_decodes_like_dumps(value):
+    chunks = list(iterencode(value, chunk_size=1024))
+    assert loads(b"".join(chunks)) == loads(dumps(value))
+
+
+def test_iterencode_chunk_size():
+    chunks = list(iterencode([{"id": i} for i in range(5000)], chunk_size=4096))
+    assert len(chunks) > 1
+    assert all(len(chunk) >= 4096 for chunk in chunks[:-1])
+
+
+def test_is_large():
+    assert is_large([0] * 10, min_items=10)
+    assert is_large({"items": [0] * 10}, min_items=10)
+    assert not is_large([0] * 9, min_items=10)
+    assert not is_large([0] * 10, min_items=None)
+
+
+def streaming_app(items):
+    app = WeApRous(json_stream_items=10)
+
+    @app.route('/items', methods=['GET'])
+    def get_items(headers, body):
+        return {"items": items}
+
+    return app
+
+
+def test_large_result_is_streamed(serve, client):
+    items = [{"id": i} for i in range(1000)]
+    status, headers, body = client(serve(streaming_app(items))).request("GET", "/items")
+    assert status == 200 and headers["transfer-encoding"] == "chunked"
+    assert loads(body) == {"items": items}
+
+
+def test_unencodable_first_chunk_is_a_500(serve, client):
+    items = [object()] + [{"id": i} for i in range(1000)]
+    status, headers, body = client(serve(streaming_app(items))).request("GET", "/items")
+    assert status == 500 and "transfer-encoding" not in headers
+    assert loads(body)["status"] == "error"
+
+
+def test_unencodable_later_chunk_cuts_the_body_short(serve, client):
+    items = [{"id": i, "text": "x" * 100} for i in range(5000)] + [object()]
+    conn = client(serve(streaming_app(items)))
+    with pytest.raises(ConnectionError):
+        conn.request("GET", "/items")
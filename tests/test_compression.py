@@ -0,0 +1,69 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from daemon.compression import ENCODINGS, negotiate, precompress, variant_etag
+from daemon.response import BASE_DIR
+from daemon.weaprous import WeApRous
+
+
+@pytest.mark.parametrize("header, available, result", [
+    (None, ENCODINGS, None),
+    ("gzip, deflate", ENCODINGS, "gzip"),
+    ("gzip;q=0", ENCODINGS, None),
+    ("*", ENCODINGS, ENCODINGS[0]),
+    ("identity", ENCODINGS, None),
+    ("gzip", (), None),
+])
+def test_negotiate(header, available, result):
+    assert negotiate(header, available) == result
+
+
+def test_precompress_only_large_text():
+    text = b"hello world " * 100
+    variants = precompress(text, "text/css")
+    assert gzip.decompress(variants["gzip"]) == text
+    assert precompress(b"tiny", "text/css") == {}
+    assert precompress(text, "image/png") == {}
+
+
+def test_variant_etag():
+    assert variant_etag('"abc"', "gzip") == '"abc-gzip"'
+
+
+@pytest.fixture
+def compress_app():
+    app = WeApRous()
+
+    @app.route('/items', methods=['GET'])
+    def items(headers, body, query):
+        return {'items': ['item'] * int(query.get('n', 1))}
+
+    return app
+
+
+def test_static_file_variant(compress_app, serve, client):
+    with open(os.path.join(BASE_DIR, "static", "css", "chat_client.css"), "rb") as f:
+        content = f.read()
+    conn = client(serve(compress_app))
+    status, plain, body = conn.request("GET", "/css/chat_client.css")
+    assert status == 200 and body == content and "content-encoding" not in plain
+    status, headers, body = conn.request("GET", "/css/chat_client.css", {"Accept-Encoding": "gzip"})
+    assert status == 200 and headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == variant_etag(plain["etag"], "gzip")
+    assert gzip.decompress(body) == content
+    status, _, _ = conn.request("GET", "/css/chat_client.css",
+                                {"Accept-Encoding": "gzip", "If-None-Match": headers["etag"]})
+    assert status == 304
+
+
+def test_json_compressed_from_min_size(compress_app, serve, client):
+    conn = client(serve(compress_app))
+    _, headers, _ = conn.request("GET", "/items?n=1", {"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in headers
+    _, headers, body = conn.request("GET", "/items?n=500", {"Accept-Encoding": "gzip"})
+    assert headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(body)) == {'items': ['item'] * 500}
@@ -0,0 +1,79 @@
+import pytest
+
+from daemon.conditional import CacheControl, etag_matches, is_not_modified
+from daemon.request import Request
+from daemon.weaprous import WeApRous
+
+
+def conditional_request(method="GET", **headers):
+    req = Request()
+    req.method = method
+    req.headers = {name.replace('_', '-'): value for name, value in headers.items()}
+    return req
+
+
+@pytest.mark.parametrize("header, result", [
+    ('"a"', True), ('"b", W/"a"', True), ('*', True), ('"b"', False), ('a', False),
+])
+def test_etag_matches(header, result):
+    assert etag_matches(header, '"a"') is result
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    last_modified = "Tue, 15 Nov 1994 08:12:31 GMT"
+    assert is_not_modified(conditional_request(if_modified_since=last_modified), None, last_modified)
+    assert not is_not_modified(conditional_request(if_modified_since="Mon, 14 Nov 1994 08:12:31 GMT"),
+                               None, last_modified)
+    assert not is_not_modified(conditional_request(if_none_match='"x"', if_modified_since=last_modified),
+                               '"y"', last_modified)
+    assert not is_not_modified(conditional_request("POST", if_none_match='"y"'), '"y"')
+
+
+def test_cache_control_first_matching_policy():
+    policies = CacheControl()
+    policies.add("/images/*", "public, max-age=86400")
+    policies.add("/*", "private")
+    assert policies.lookup("/images/a/b.png") == "public, max-age=86400"
+    assert policies.lookup("/index.html") == "private"
+    assert CacheControl().lookup("/x") == "no-cache"
+
+
+@pytest.fixture
+def conditional_app():
+    app = WeApRous()
+    app.cache_control("/css/*", "public, max-age=3600")
+    state = {'n': 1}
+
+    @app.route('/state', methods=['GET'])
+    def get_state(headers, body):
+        return dict(state)
+
+    @app.route('/state', methods=['POST'])
+    def bump(headers, body):
+        state['n'] += 1
+        return dict(state)
+
+    return app
+
+
+def test_static_file_revalidation(conditional_app, serve, client):
+    conn = client(serve(conditional_app))
+    status, headers, body = conn.request("GET", "/css/styles.css")
+    assert status == 200 and body
+    assert headers["cache-control"] == "public, max-age=3600"
+    etag, last_modified = headers["etag"], headers["last-modified"]
+    status, headers, _ = conn.request("GET", "/css/styles.css", {"If-None-Match": etag})
+    assert status == 304 and headers["etag"] == etag
+    assert conn.request("GET", "/css/styles.css", {"If-Modified-Since": last_modified})[0] == 304
+    assert conn.request("GET", "/css/styles.css", {"If-None-Match": '"other"'})[0] == 200
+
+
+def test_json_route_revalidation(conditional_app, serve, client):
+    conn = client(serve(conditional_app))
+    status, headers, _ = conn.request("GET", "/state")
+    assert status == 200 and headers["cache-control"] == "no-cache"
+    etag = headers["etag"]
+    assert conn.request("GET", "/state", {"If-None-Match": etag})[0] == 304
+    conn.request("POST", "/state", body=b"{}")
+    status, headers, body = conn.request("GET", "/state", {"If-None-Match": etag})
+    assert status == 200 and headers["etag"] != etag and body == b'{"n":2}'
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from daemon.filecache import FileCache
+
+
+def write(path, data, mtime=None):
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_hit_until_the_file_changes(tmp_path):
+    files = FileCache(check_interval=0)
+    path = write(tmp_path / "a.txt", b"one", mtime=1000)
+    first = files.get(path)
+    assert first.content == b"one" and first.content_length == "3"
+    assert files.get(path) is first
+    write(tmp_path / "a.txt", b"two", mtime=2000)
+    second = files.get(path)
+    assert second.content == b"two" and second.etag != first.etag
+    assert files.stats()["hits"] == 1 and files.stats()["reloads"] == 1
+
+
+def test_changes_are_seen_after_check_interval(tmp_path):
+    files = FileCache(check_interval=60)
+    path = write(tmp_path / "a.txt", b"one", mtime=1000)
+    files.get(path)
+    write(tmp_path / "a.txt", b"two", mtime=2000)
+    assert files.get(path).content == b"one"
+    files.check_interval = 0
+    assert files.get(path).content == b"two"
+
+
+def test_deleted_file_is_dropped(tmp_path):
+    files = FileCache(check_interval=0)
+    path = write(tmp_path / "a.txt", b"one")
+    files.get(path)
+    os.remove(path)
+    with pytest.raises(FileNotFoundError):
+        files.get(path)
+    assert files.stats()["entries"] == 0
+
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    files = FileCache(max_bytes=10, max_file_size=10, check_interval=60)
+    a = write(tmp_path / "a", b"aaaa")
+    b = write(tmp_path / "b", b"bbbb")
+    c = write(tmp_path / "c", b"cccc")
+    files.get(a)
+    files.get(b)
+    files.get(a)
+    files.get(c)
+    stats = files.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 8, 1)
+    files.get(b)
+    assert files.stats()["misses"] == 4
+
+
+def test_compressed_variants_count_in_the_size(tmp_path):
+    text = b"body { color: red; }\n" * 100
+    files = FileCache(max_bytes=len(text) * 2, check_interval=60)
+    a = files.get(write(tmp_path / "a.css", text))
+    assert a.variants and a.size == len(text) + sum(len(v) for v in a.variants.values())
+    assert files.stats()["bytes"] == a.size
+    b = files.get(write(tmp_path / "b.css", text.replace(b"red", b"tan")))
+    stats = files.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (1, b.size, 1)
+    files.discard(str(tmp_path / "b.css"))
+    assert files.stats()["bytes"] == 0
+
+
+def test_large_file_is_not_cached(tmp_path):
+    files = FileCache(max_file_size=4)
+    assert files.get(write(tmp_path / "big", b"12345")) is None
+    assert files.stats()["entries"] == 0
+
+
+def test_lookup_of_remembered_path(tmp_path):
+    files = FileCache(check_interval=0)
+    path = write(tmp_path / "index.html", b"<html></html>")
+    assert files.lookup("/index.html") is None
+    files.get(path)
+    files.remember("/index.html", path, "text/html")
+    assert files.lookup("/index.html").content_type == "text/html"
+    os.remove(path)
+    assert files.lookup("/index.html") is None
@@ -0,0 +1,112 @@
+import json
+import socket
+
+import pytest
+
+from daemon.framing import DETACH_SIZE, FramingError, RequestFramer
+from daemon.weaprous import WeApRous
+
+
+def echo_app():
+    app = WeApRous()
+
+    @app.route('/echo', methods=['POST'])
+    def echo(headers, body):
+        return {'body': body}
+
+    return app
+
+
+def test_request_split_across_feeds():
+    framer = RequestFramer()
+    raw = b"POST /echo HTTP/1.1\r\nHost: test\r\nContent-Length: 5\r\n\r\nhello"
+    for i in range(len(raw) - 1):
+        framer.feed(raw[i:i + 1])
+        assert framer.next_request() is None
+    framer.feed(raw[-1:])
+    msg = framer.next_request()
+    assert (msg.method, msg.target, msg.headers['host']) == ("POST", "/echo", "test")
+    assert msg.body == b"hello"
+    assert not framer.pending
+
+
+def test_pipelined_requests_in_one_feed():
+    framer = RequestFramer()
+    framer.feed(b"GET /a HTTP/1.1\r\n\r\n"
+                b"POST /b HTTP/1.1\r\nContent-Length: 2\r\n\r\nok"
+                b"\r\nGET /c HTTP/1.1\r\n")
+    assert framer.next_request().target == "/a"
+    msg = framer.next_request()
+    assert (msg.target, msg.body) == ("/b", b"ok")
+    assert framer.next_request() is None
+    assert framer.pending
+    framer.feed(b"\r\n")
+    assert framer.next_request().target == "/c"
+
+
+@pytest.mark.parametrize("raw, status", [
+    (b"GARBAGE\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: x\r\n\r\n", 400),
+    (b"POST / HTTP/1.1\r\nContent-Length: 99\r\n\r\n", 413),
+])
+def test_invalid_requests_raise_framing_error(raw, status):
+    framer = RequestFramer(max_body_size=10)
+    framer.feed(raw)
+    with pytest.raises(FramingError) as info:
+        framer.next_request()
+    assert info.value.status_code == status
+
+
+def test_header_too_large():
+    framer = RequestFramer(max_header_size=64)
+    framer.feed(b"GET / HTTP/1.1\r\nX-Pad: " + b"a" * 100)
+    with pytest.raises(FramingError) as info:
+        framer.next_request()
+    assert info.value.status_code == 431
+
+
+@pytest.mark.parametrize("engine", ["thread", "pool", "asyncio", "reactor"])
+def test_pipelined_requests_answered_in_order(serve, client, engine):
+    port = serve(echo_app(), engine=engine)
+    conn = client(port)
+    conn.send(b"".join(b"POST /echo HTTP/1.1\r\nHost: test\r\nContent-Length: 1\r\n\r\n" + str(n).encode()
+                       for n in range(3)))
+    for n in range(3):
+        status, _, body = conn.response()
+        assert status == 200
+        assert json.loads(body) == {'body': str(n)}
+
+
+def test_large_body_is_detached_without_copy():
+    framer = RequestFramer()
+    body = b"x" * (DETACH_SIZE + 1)
+    framer.feed(b"POST /up HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body))
+    assert framer.next_request() is None
+    framer.feed(body)
+    msg = framer.next_request()
+    assert isinstance(msg.body, bytearray) and msg.body == body
+    assert not framer.pending
+    framer.feed(b"GET /next HTTP/1.1\r\n\r\n")
+    assert framer.next_request().target == "/next"
+    assert msg.body == body
+
+
+def test_recv_into_reads_from_socket():
+    framer = RequestFramer()
+    server, peer = socket.socketpair()
+    with server, peer:
+        peer.sendall(b"GET /a HTTP/1.1\r\n\r\n")
+        assert framer.recv_into(server) > 0
+        assert framer.next_request().target == "/a"
+        peer.close()
+        assert framer.recv_into(server) == 0
+
+
+def test_clear_drops_buffered_bytes():
+    framer = RequestFramer()
+    framer.feed(b"GET /a HTTP/1.1\r\nHost")
+    assert framer.next_request() is None
+    framer.clear()
+    assert not framer.pending
+    framer.feed(b"GET /b HTTP/1.1\r\n\r\n")
+    assert framer.next_request().target == "/b"
@@ -0,0 +1,46 @@
+import email.utils
+
+from daemon import response
+from daemon.response import HEADER_TEMPLATES_MAX, date_header, header_template
+from daemon.weaprous import WeApRous
+
+
+def test_header_template_is_formatted_once():
+    template = header_template(200, "application/json")
+    assert template == "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+    assert header_template(200, "application/json") is template
+    assert header_template(404, "text/html").startswith("HTTP/1.1 404 Not Found\r\n")
+
+
+def test_header_templates_are_bounded():
+    for n in range(HEADER_TEMPLATES_MAX + 10):
+        header_template(206, "multipart/byteranges; boundary={}".format(n))
+    assert len(response.HEADER_TEMPLATES) <= HEADER_TEMPLATES_MAX
+
+
+def test_date_header_is_formatted_once_per_second(monkeypatch):
+    now = [784887151.2]
+    monkeypatch.setattr(response.time, "time", lambda: now[0])
+    first = date_header()
+    assert first == "Tue, 15 Nov 1994 08:12:31 GMT"
+    now[0] += 0.5
+    assert date_header() is first
+    now[0] += 1
+    assert date_header() == "Tue, 15 Nov 1994 08:12:32 GMT"
+
+
+def test_response_header_lines(serve, client):
+    app = WeApRous()
+
+    @app.route('/login', methods=['POST'])
+    def login(headers, body):
+        return {'ok': True}
+
+    conn = client(serve(app))
+    status, headers, body = conn.request("POST", "/login", {"Origin": "http://a"}, body=b"{}")
+    assert status == 200 and body == b'{"ok":true}'
+    assert headers["content-type"] == "application/json; charset=utf-8"
+    assert headers["content-length"] == str(len(body))
+    assert headers["access-control-allow-origin"] == "http://a"
+    assert headers["connection"] == "keep-alive"
+    assert email.utils.parsedate_to_datetime(headers["date"]).tzinfo is not None
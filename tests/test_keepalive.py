@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from daemon.weaprous import WeApRous
+
+
+def upload_app():
+    app = WeApRous()
+
+    @app.route('/upload', methods=['POST'])
+    def upload(headers, body):
+        return {'size': len(body)}
+
+    return app
+
+
+def test_slow_upload_outlives_keepalive_timeout_on_asyncio(serve, client):
+    port = serve(upload_app(), engine="asyncio", keepalive_timeout=0.3)
+    conn = client(port)
+    conn.send(b"POST /upload HTTP/1.1\r\nHost: test\r\nContent-Length: 6\r\n\r\n")
+    for piece in (b"ab", b"cd", b"ef"):
+        time.sleep(0.2)
+        conn.send(piece)
+    status, _, body = conn.response()
+    assert status == 200
+    assert b'"size"' in body and b"6" in body
+
+
+def test_idle_connection_closed_after_keepalive_timeout_on_asyncio(serve, client):
+    port = serve(upload_app(), engine="asyncio", keepalive_timeout=0.2)
+    conn = client(port)
+    time.sleep(0.5)
+    assert conn.closed()
+
+
+@pytest.mark.parametrize("engine", ["thread", "pool", "asyncio", "reactor"])
+def test_head_sends_headers_only_on_persistent_connection(serve, client, engine):
+    port = serve(upload_app(), engine=engine)
+    conn = client(port)
+    status, headers, _ = conn.request("HEAD", "/css/styles.css")
+    assert status == 200 and int(headers["content-length"]) > 0
+    status, headers, body = conn.request("GET", "/css/styles.css")
+    assert status == 200 and len(body) == int(headers["content-length"])
+
+
+def test_idle_connection_does_not_hold_pool_worker(serve, client):
+    port = serve(upload_app(), engine="pool", pool_size=1, keepalive_timeout=5)
+    idle = client(port)
+    assert idle.request("GET", "/css/styles.css")[0] == 200
+    started = time.monotonic()
+    assert client(port).request("GET", "/css/styles.css")[0] == 200
+    assert time.monotonic() - started < 1
+    # The parked connection is served again once it sends its next request
+    assert idle.request("GET", "/css/styles.css")[0] == 200
+
+
+def test_parked_connection_closed_after_keepalive_timeout(serve, client):
+    port = serve(upload_app(), engine="pool", pool_size=1, keepalive_timeout=0.2)
+    conn = client(port)
+    assert conn.request("GET", "/css/styles.css")[0] == 200
+    time.sleep(0.5)
+    assert conn.closed()
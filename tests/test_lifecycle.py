@@ -0,0 +1,95 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from daemon.lifecycle import Drain
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = """
+import sys, time
+from daemon.weaprous import WeApRous
+
+app = WeApRous()
+
+@app.route('/slow', methods=['GET'])
+def slow(headers, body):
+    print('started', flush=True)
+    time.sleep(0.5)
+    return {'ok': True}
+
+@app.on_shutdown
+def flush():
+    print('flushed', flush=True)
+
+app.prepare_address('127.0.0.1', int(sys.argv[1]))
+app.run()
+"""
+
+
+def test_start_wakes_idle_connections():
+    drain = Drain(timeout=1)
+    idle, peer = socket.socketpair()
+    busy, other = socket.socketpair()
+    drain.add()
+    drain.add()
+    assert drain.idle(idle)
+    drain.start()
+    assert idle.recv(1) == b""
+    assert not drain.idle(busy)
+    for sock in (idle, peer, busy, other):
+        sock.close()
+
+
+def test_wait_returns_once_connections_are_removed():
+    drain = Drain(timeout=5)
+    conn = object()
+    drain.add()
+    threading.Timer(0.1, drain.remove, (conn,)).start()
+    assert drain.wait() == 0
+
+
+def test_wait_gives_up_after_timeout():
+    drain = Drain(timeout=0.1)
+    drain.add()
+    assert drain.wait() == 1
+
+
+def test_sigterm_finishes_in_flight_request():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    proc = subprocess.Popen([sys.executable, "-u", "-c", APP, str(port)], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        end = time.monotonic() + 5
+        while True:
+            try:
+                conn = socket.create_connection(("127.0.0.1", port), timeout=5)
+                break
+            except OSError:
+                assert time.monotonic() < end
+                time.sleep(0.05)
+        conn.sendall(b"GET /slow HTTP/1.1\r\nHost: test\r\n\r\n")
+        while proc.stdout.readline().strip() != "started":
+            pass
+        proc.send_signal(signal.SIGTERM)
+        response = b""
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                break
+            response += data
+        conn.close()
+        assert response.startswith(b"HTTP/1.1 200 ")
+        assert response.endswith(b'{"ok":true}')
+        assert proc.wait(timeout=10) == 0
+        assert "flushed" in proc.stdout.read()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
@@ -0,0 +1,134 @@
+import asyncio
+import types
+
+import pytest
+
+from daemon.middleware import Pipeline, HANDLER_TIMING, server_timing
+from daemon.weaprous import WeApRous
+
+
+def request():
+    return types.SimpleNamespace(path="/x")
+
+
+def traced_pipeline(trace):
+    pipeline = Pipeline()
+
+    def before(req):
+        trace.append("before")
+
+    def around(req):
+        trace.append("around in")
+        result = yield
+        trace.append("around out")
+        return dict(result, wrapped=True)
+
+    async def after(req, result):
+        trace.append("after")
+        return dict(result, after=True)
+
+    pipeline.add("before", before)
+    pipeline.add("around", around)
+    pipeline.add("after", after)
+    return pipeline
+
+
+def test_stages_run_in_order_around_the_handler():
+    trace = []
+    pipeline = traced_pipeline(trace)
+    req = request()
+
+    def handler():
+        trace.append("handler")
+        return {"ok": True}
+
+    assert pipeline.run(req, handler) == {"ok": True, "after": True, "wrapped": True}
+    assert trace == ["before", "around in", "handler", "after", "around out"]
+    assert [name for name, _ in req.timings] == ["before", "around", "after", HANDLER_TIMING,
+                                                 "after", "around"]
+    assert "handler;dur=" in server_timing(req.timings)
+
+
+def test_run_async_matches_run():
+    trace = []
+    pipeline = traced_pipeline(trace)
+
+    async def handler():
+        trace.append("handler")
+        return {"ok": True}
+
+    result = asyncio.run(pipeline.run_async(request(), handler))
+    assert result == {"ok": True, "after": True, "wrapped": True}
+    assert trace == ["before", "around in", "handler", "after", "around out"]
+
+
+def test_before_stage_answers_without_handler():
+    pipeline = Pipeline()
+    pipeline.add("before", lambda req: {"status": "error"})
+    called = []
+    assert pipeline.run(request(), lambda: called.append(1)) == {"status": "error"}
+    assert not called
+    assert pipeline.stats()["<lambda>"]["count"] == 1
+
+
+def test_around_stage_handles_handler_error():
+    pipeline = Pipeline()
+
+    def catch(req):
+        try:
+            return (yield)
+        except KeyError:
+            return {"status": "error"}
+
+    pipeline.add("around", catch)
+
+    def handler():
+        raise KeyError("x")
+
+    assert pipeline.run(request(), handler) == {"status": "error"}
+
+
+def test_handler_error_skips_after_stages_and_propagates():
+    pipeline = Pipeline()
+    pipeline.add("after", lambda req, result: {"replaced": True})
+
+    def handler():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        pipeline.run(request(), handler)
+
+
+def test_around_must_be_generator():
+    with pytest.raises(TypeError):
+        Pipeline().add("around", lambda req: None)
+
+
+def test_pipeline_active_with_stages_or_timing():
+    assert not Pipeline().active
+    assert Pipeline(timing=True).active
+    pipeline = Pipeline()
+    pipeline.add("before", lambda req: None)
+    assert pipeline.active
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio"])
+@pytest.mark.parametrize("server_timing, middleware, sent", [
+    (False, False, False), (True, False, True), (False, True, True),
+])
+def test_server_timing_only_when_enabled_or_middleware(serve, client, engine,
+                                                       server_timing, middleware, sent):
+    app = WeApRous(server_timing=server_timing)
+
+    @app.route('/ping', methods=['GET'])
+    def ping(headers, body):
+        return {'ok': True}
+
+    if middleware:
+        app.before_request(lambda req: None)
+
+    conn = client(serve(app, engine=engine))
+    status, headers, body = conn.request("GET", "/ping")
+    assert status == 200 and body == b'{"ok":true}'
+    assert ("server-timing" in headers) is sent
+    assert (HANDLER_TIMING in app.pipeline.stats()) is sent
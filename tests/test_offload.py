@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from daemon import offload
+from daemon.offload import EncodedJSON, call_route
+from daemon.weaprous import WeApRous
+
+
+def report(headers, body, year):
+    return {'year': year, 'pid': os.getpid()}
+
+
+def failing(headers, body):
+    return {'status': 'error', 'message': 'no data'}
+
+
+def square(n):
+    return n * n
+
+
+@pytest.fixture
+def offload_app():
+    app = WeApRous(cpu_workers=1)
+    app.route('/reports/<int:year>', methods=['GET'], cpu_bound=True)(report)
+
+    @app.route('/square/<int:n>', methods=['GET'])
+    async def square_route(headers, body, n):
+        return {'square': await app.offload(square, n)}
+
+    yield app
+    offload.shutdown()
+
+
+def test_call_route_encodes_results_but_errors():
+    assert call_route(square, {'n': 3}) == 9
+    result = call_route(report, {'headers': {}, 'body': '', 'year': 1})
+    assert isinstance(result, EncodedJSON) and json.loads(result)['year'] == 1
+    assert call_route(failing, {'headers': {}, 'body': ''}) == {'status': 'error', 'message': 'no data'}
+
+
+def test_cpu_bound_route_must_be_module_level_function():
+    app = WeApRous()
+
+    async def coroutine(headers, body):
+        return {}
+
+    with pytest.raises(ValueError):
+        app.route('/a', cpu_bound=True)(coroutine)
+    with pytest.raises(ValueError):
+        app.route('/b', cpu_bound=True)(lambda headers, body: {})
+
+
+def test_handlers_run_in_worker_process(offload_app, serve, client):
+    conn = client(serve(offload_app), timeout=30)
+    status, headers, body = conn.request("GET", "/reports/2024")
+    assert status == 200 and headers['content-type'].startswith('application/json')
+    result = json.loads(body)
+    assert result['year'] == 2024 and result['pid'] != os.getpid()
+    status, _, body = conn.request("GET", "/square/12")
+    assert status == 200 and json.loads(body) == {'square': 144}
@@ -0,0 +1,91 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from daemon.listener import create_listener, has_reuse_port
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP = """
+import os, sys
+from daemon.weaprous import WeApRous
+
+app = WeApRous()
+
+@app.route('/pid', methods=['GET'])
+def pid(headers, body):
+    return {'pid': os.getpid()}
+
+app.prepare_address('127.0.0.1', int(sys.argv[1]))
+app.run(workers=2)
+"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def children(pid):
+    with open("/proc/{0}/task/{0}/children".format(pid)) as f:
+        return set(map(int, f.read().split()))
+
+
+def worker_pid(port, deadline=5):
+    """Ask any worker for its pid, retrying while the workers start."""
+    end = time.monotonic() + deadline
+    while True:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            try:
+                conn.request("GET", "/pid")
+                response = conn.getresponse()
+                assert response.status == 200
+                return json.loads(response.read())["pid"]
+            finally:
+                conn.close()
+        except (http.client.HTTPException, OSError):
+            if time.monotonic() > end:
+                raise
+            time.sleep(0.05)
+
+
+@pytest.mark.skipif(not has_reuse_port(), reason="SO_REUSEPORT not supported")
+def test_reuse_port_listeners_share_a_port():
+    first = create_listener("127.0.0.1", 0, reuse_port=True)
+    port = first.getsockname()[1]
+    second = create_listener("127.0.0.1", port, reuse_port=True)
+    assert second.getsockname()[1] == port
+    first.close()
+    second.close()
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/task"), reason="requires Linux /proc")
+def test_supervisor_restarts_workers_and_stops_on_sigterm():
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, "-c", APP, str(port)], cwd=ROOT,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        pid = worker_pid(port)
+        workers = children(proc.pid)
+        assert pid in workers and len(workers) == 2
+        os.kill(pid, signal.SIGKILL)
+        end = time.monotonic() + 5
+        while len(children(proc.pid) - {pid}) < 2:
+            assert time.monotonic() < end
+            time.sleep(0.05)
+        assert worker_pid(port) != pid
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=10) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
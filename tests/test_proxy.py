@@ -0,0 +1,46 @@
+import time
+
+from daemon.proxy import forward_request, upstream_request
+from daemon.weaprous import WeApRous
+
+
+def backend_app():
+    app = WeApRous()
+
+    @app.route('/data', methods=['GET'])
+    def data(headers, body):
+        return {'value': 1}
+
+    @app.route('/stream', methods=['GET'])
+    def stream(headers, body):
+        return (piece for piece in (b"one", b"two"))
+
+    return app
+
+
+def forward(port, request):
+    started = time.monotonic()
+    response = forward_request("127.0.0.1", port, request)
+    # The backend keeps idle connections for 5 seconds
+    assert time.monotonic() - started < 2
+    return response
+
+
+def test_upstream_request_asks_to_close():
+    request = "GET / HTTP/1.1\r\nHost: a\r\nConnection: keep-alive\r\n\r\n"
+    assert upstream_request(request) == "GET / HTTP/1.1\r\nHost: a\r\nConnection: close\r\n\r\n"
+
+
+def test_not_modified_is_forwarded_without_waiting(serve, client):
+    port = serve(backend_app())
+    _, headers, _ = client(port).request("GET", "/data")
+    response = forward(port, "GET /data HTTP/1.1\r\nHost: a\r\nIf-None-Match: {}\r\n\r\n".format(
+        headers["etag"]))
+    assert response.startswith(b"HTTP/1.1 304")
+
+
+def test_head_and_chunked_are_forwarded_without_waiting(serve):
+    port = serve(backend_app())
+    assert forward(port, "HEAD /css/styles.css HTTP/1.1\r\nHost: a\r\n\r\n").startswith(b"HTTP/1.1 200")
+    response = forward(port, "GET /stream HTTP/1.1\r\nHost: a\r\n\r\n")
+    assert response.endswith(b"0\r\n\r\n") and b"one" in response
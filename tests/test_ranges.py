@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from daemon.ranges import MAX_RANGES, byteranges, if_range_matches, parse_ranges
+from daemon.response import BASE_DIR
+from daemon.weaprous import WeApRous
+
+
+@pytest.mark.parametrize("header, result", [
+    ("bytes=0-499, -500", [(0, 499), (9500, 9999)]),
+    ("bytes=9000-", [(9000, 9999)]),
+    ("bytes=9000-20000", [(9000, 9999)]),
+    ("bytes=20000-", []),
+    ("bytes=-0", []),
+    ("bytes=5-1", None),
+    ("items=0-1", None),
+    ("bytes=a-b", None),
+    ("bytes=x-5", None),
+    ("bytes=5-x", None),
+    ("bytes=\u00b2-", None),
+    ("bytes=-\u00b2", None),
+    ("bytes=+1-5", None),
+    ("bytes=-", None),
+    ("bytes=" + ",".join(["0-0"] * (MAX_RANGES + 1)), None),
+])
+def test_parse_ranges(header, result):
+    assert parse_ranges(header, 10000) == result
+
+
+def test_if_range_matches():
+    date = "Tue, 15 Nov 1994 08:12:31 GMT"
+    assert if_range_matches(None, '"a"', date)
+    assert if_range_matches('"a"', '"a"', date)
+    assert not if_range_matches('W/"a"', '"a"', date)
+    assert if_range_matches(date, '"a"', date)
+    assert not if_range_matches('"b"', '"a"', date)
+
+
+def test_byteranges_layout():
+    parts = byteranges([(0, 1), (5, 9)], 10, "text/plain", "XY")
+    assert parts[1] == (0, 2) and parts[3] == (5, 5)
+    assert parts[2].endswith(b"Content-Range: bytes 5-9/10\r\n\r\n")
+    assert parts[-1] == b"\r\n--XY--\r\n"
+
+
+@pytest.mark.parametrize("static_cache_bytes", [32 * 1024 * 1024, 1024])
+def test_range_requests_on_cached_and_sendfile_files(serve, client, static_cache_bytes):
+    with open(os.path.join(BASE_DIR, "static", "images", "welcome.png"), "rb") as f:
+        content = f.read()
+    conn = client(serve(WeApRous(static_cache_bytes=static_cache_bytes)))
+    status, headers, body = conn.request("GET", "/images/welcome.png", {"Range": "bytes=100-199"})
+    assert status == 206 and body == content[100:200]
+    assert headers["content-range"] == "bytes 100-199/{}".format(len(content))
+
+    status, headers, body = conn.request("GET", "/images/welcome.png", {"Range": "bytes=0-9,-10"})
+    assert status == 206 and headers["content-type"].startswith("multipart/byteranges; boundary=")
+    assert content[:10] in body and content[-10:] in body
+
+    status, headers, _ = conn.request("GET", "/images/welcome.png", {"Range": "bytes=999999-"})
+    assert status == 416 and headers["content-range"] == "bytes */{}".format(len(content))
+
+    status, _, body = conn.request("GET", "/images/welcome.png",
+                                   {"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert status == 200 and body == content
+
+
+@pytest.mark.parametrize("engine", ["thread", "asyncio", "reactor"])
+@pytest.mark.parametrize("header", ["bytes=x-5", "bytes=\u00b2-", "bytes=-\u00b2"])
+def test_malformed_range_is_ignored(serve, client, engine, header):
+    with open(os.path.join(BASE_DIR, "static", "css", "styles.css"), "rb") as f:
+        content = f.read()
+    conn = client(serve(WeApRous(), engine=engine))
+    conn.send("GET /css/styles.css HTTP/1.1\r\nHost: test\r\nRange: {}\r\n\r\n".format(header).encode())
+    status, headers, body = conn.response()
+    assert status == 200 and body == content and "content-range" not in headers
@@ -0,0 +1,46 @@
+import pytest
+
+from daemon.framing import RequestFramer
+from daemon.request import Request, InvalidJSON
+
+
+def prepare(raw):
+    framer = RequestFramer()
+    framer.feed(raw)
+    req = Request()
+    req.prepare_message(framer.next_request(), {})
+    return req
+
+
+def test_body_is_decoded_on_first_access():
+    req = prepare(b'POST /send HTTP/1.1\r\nContent-Length: 11\r\n\r\n{"a": "\xc3\xa9"}')
+    assert req._body is None
+    assert req.json == {"a": "é"}
+    assert req._body is None
+    assert req.body == '{"a": "é"}'
+
+
+def test_body_falls_back_to_latin1():
+    req = prepare(b'PUT /x HTTP/1.1\r\nContent-Length: 3\r\n\r\nca\xe9')
+    assert req.body == "caé"
+
+
+def test_body_of_get_is_empty():
+    req = prepare(b'GET /x?channel=general&n=2 HTTP/1.1\r\nCookie: auth=true; user=a\r\n\r\n')
+    assert req.body == ''
+    assert req.json is None
+    assert req.query == {"channel": "general", "n": "2"}
+    assert req.cookies == {"auth": "true", "user": "a"}
+
+
+def test_invalid_json_raises():
+    req = prepare(b'POST /send HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}')
+    with pytest.raises(InvalidJSON):
+        req.json
+
+
+def test_reset_forgets_the_body():
+    req = prepare(b'POST /send HTTP/1.1\r\nContent-Length: 2\r\n\r\nhi')
+    assert req.body == 'hi'
+    req.reset()
+    assert req.body == '' and req.body_bytes == b''
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from daemon.httpadapter import detach_worker_adapter, worker_adapter
+from daemon.request import Request
+from daemon.response import Response
+from daemon.router import Router
+
+
+@pytest.mark.parametrize("cls", [Request, Response])
+def test_objects_have_no_instance_dict(cls):
+    obj = cls()
+    assert not hasattr(obj, "__dict__")
+    with pytest.raises(AttributeError):
+        obj.unknown = 1
+
+
+def test_response_reset_forgets_previous_response():
+    resp = Response()
+    headers = resp.headers
+    resp.status_code = 404
+    resp.headers['X-Old'] = '1'
+    resp.reset()
+    assert resp.status_code is None
+    assert resp.headers == {} and resp.headers is headers
+
+
+def test_worker_adapter_is_reused_per_thread():
+    routes = Router({})
+    first = worker_adapter("127.0.0.1", 9000, routes, keepalive_timeout=5)
+    first.request.method = "GET"
+    again = worker_adapter("127.0.0.1", 9000, routes, keepalive_timeout=5)
+    assert again is first
+    assert again.request is first.request and again.request.method is None
+    assert worker_adapter("127.0.0.1", 9000, routes, keepalive_timeout=1) is not first
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(worker_adapter("127.0.0.1", 9000, routes)))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+def test_detached_adapter_is_not_reused():
+    routes = Router({})
+    adapter = worker_adapter("127.0.0.1", 9000, routes)
+    detach_worker_adapter(adapter)
+    assert worker_adapter("127.0.0.1", 9000, routes) is not adapter
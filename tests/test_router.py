@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from daemon.router import Router, match_route
+from daemon.weaprous import WeApRous
+
+
+def handler(name):
+    def route(headers, body, **params):
+        return params
+    route.__name__ = name
+    return route
+
+
+@pytest.fixture
+def router():
+    router = Router()
+    for method, path in [("GET", "/peers"), ("GET", "/peers/me"), ("GET", "/peers/<int:peer_id>"),
+                         ("DELETE", "/peers/<int:peer_id>"), ("GET", "/peers/<name>"),
+                         ("GET", "/points/<float:x>"), ("GET", "/files/<path:rest>")]:
+        router[(method, path)] = handler(method + path)
+    return router
+
+
+@pytest.mark.parametrize("path, name, params", [
+    ("/peers", "GET/peers", {}),
+    ("/peers/me", "GET/peers/me", {}),
+    ("/peers/42", "GET/peers/<int:peer_id>", {"peer_id": 42}),
+    ("/peers/bob", "GET/peers/<name>", {"name": "bob"}),
+    ("/points/-1.5", "GET/points/<float:x>", {"x": -1.5}),
+    ("/files/css/a%20b.css", "GET/files/<path:rest>", {"rest": "css/a b.css"}),
+])
+def test_match_routes_with_parameters(router, path, name, params):
+    found, found_params, allowed = router.match("GET", path)
+    assert (found.__name__, found_params, allowed) == (name, params, None)
+
+
+def test_match_reports_allowed_methods(router):
+    assert router.match("POST", "/peers/42") == (None, None, ("DELETE", "GET"))
+    assert router.match("GET", "/nowhere") == (None, None, ())
+    assert router.match("GET", "/points/nan")[0] is None
+
+
+def test_removed_route_no_longer_matches(router):
+    del router[("GET", "/peers/<int:peer_id>")]
+    assert router.match("GET", "/peers/42")[1] == {"name": "42"}
+
+
+@pytest.mark.parametrize("path", ["/a/<path:p>/b", "/a/x<id>", "/a/<bad:id>", "/a/<body>", "relative"])
+def test_invalid_route_paths(path):
+    with pytest.raises(ValueError):
+        Router()[("GET", path)] = handler("x")
+
+
+def test_match_route_on_plain_dict():
+    route = handler("plain")
+    assert match_route({("GET", "/a"): route}, "GET", "/a") == (route, {}, None)
+    assert match_route({}, "GET", "/a") == (None, None, ())
+
+
+def test_path_parameters_reach_handlers_and_405(serve, client):
+    app = WeApRous()
+
+    @app.route('/peers/<int:peer_id>', methods=['GET'])
+    def peer(headers, body, peer_id):
+        return {'peer': peer_id}
+
+    conn = client(serve(app))
+    status, _, body = conn.request("GET", "/peers/7")
+    assert status == 200 and json.loads(body) == {'peer': 7}
+    status, headers, _ = conn.request("DELETE", "/peers/7")
+    assert status == 405 and headers['allow'] == 'GET'
+    assert conn.request("GET", "/peers/x")[0] == 404
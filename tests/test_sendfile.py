@@ -0,0 +1,54 @@
+import os
+import socket
+
+import pytest
+
+from daemon.response import BASE_DIR, FileResponse
+from daemon.weaprous import WeApRous
+
+IMAGE = os.path.join(BASE_DIR, "static", "images", "welcome.png")
+
+
+def read_image():
+    with open(IMAGE, "rb") as f:
+        return f.read()
+
+
+def test_iteration_yields_header_memory_parts_and_file_spans(tmp_path):
+    path = tmp_path / "data"
+    path.write_bytes(b"0123456789")
+    stream = FileResponse(b"HEAD\r\n", open(path, "rb"), [b"--", (2, 5), b"--"])
+    assert b"".join(stream) == b"HEAD\r\n--23456--"
+    assert stream.file.closed
+
+
+def test_send_some_on_nonblocking_socket(tmp_path):
+    path = tmp_path / "data"
+    path.write_bytes(b"x" * 100000)
+    stream = FileResponse(b"", open(path, "rb"), [(0, 100000)])
+    server, peer = socket.socketpair()
+    with server, peer:
+        server.setblocking(False)
+        received = b""
+        while True:
+            try:
+                if stream.send_some(server):
+                    break
+            except BlockingIOError:
+                received += peer.recv(65536)
+        while len(received) < 100000:
+            received += peer.recv(65536)
+    assert received == b"x" * 100000
+    assert stream.file.closed
+
+
+@pytest.mark.parametrize("engine", ["thread", "pool", "asyncio", "reactor"])
+def test_file_past_cache_limit_is_sent_from_disk(serve, client, engine):
+    app = WeApRous(static_cache_bytes=1024)
+    conn = client(serve(app, engine=engine))
+    status, headers, body = conn.request("GET", "/images/welcome.png")
+    assert status == 200 and headers["content-type"] == "image/png"
+    assert body == read_image()
+    assert app.file_cache.stats()["entries"] == 0
+    # Followed by another request on the same connection
+    assert conn.request("GET", "/images/welcome.png")[2] == body
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import pytest
+
+from daemon.workerpool import WorkerPool
+
+
+def stuck_pool(overflow, queue_size=1):
+    """A started one-worker pool whose worker is stuck until ``release`` is set."""
+    pool = WorkerPool(size=1, queue_size=queue_size, overflow=overflow)
+    pool.start()
+    entered, release = threading.Event(), threading.Event()
+    pool.submit(lambda: (entered.set(), release.wait(5)))
+    assert entered.wait(5)
+    return pool, release
+
+
+def wait_for(predicate, timeout=5):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("overflow", ["reject", "drop"])
+def test_full_queue_refuses_jobs(overflow):
+    pool, release = stuck_pool(overflow)
+    assert pool.submit(lambda: None)
+    assert not pool.submit(lambda: None)
+    stats = pool.stats()
+    assert (stats["submitted"], stats["rejected"], stats["queued"], stats["busy"]) == (2, 1, 1, 1)
+    release.set()
+    wait_for(lambda: pool.stats()["completed"] == 2)
+    pool.shutdown()
+
+
+def test_full_queue_blocks_submitter():
+    pool, release = stuck_pool("block")
+    assert pool.submit(lambda: None)
+    submitted = threading.Event()
+    threading.Thread(target=lambda: (pool.submit(lambda: None), submitted.set()), daemon=True).start()
+    assert not submitted.wait(0.1)
+    release.set()
+    assert submitted.wait(5)
+    wait_for(lambda: pool.stats()["completed"] == 3)
+    assert pool.stats()["rejected"] == 0
+    pool.shutdown()
+
+
+def test_stats_count_failures_and_queue_wait():
+    pool, release = stuck_pool("reject", queue_size=4)
+    pool.submit(lambda: 1 / 0)
+    time.sleep(0.05)
+    release.set()
+    wait_for(lambda: pool.stats()["completed"] == 2)
+    stats = pool.stats()
+    assert stats["failed"] == 1
+    assert stats["wait_max_ms"] >= 40
+    assert 20 <= stats["wait_avg_ms"] <= stats["wait_max_ms"]
+    pool.shutdown()
+
+
+def test_shutdown_with_stuck_worker_and_full_queue():
+    pool, release = stuck_pool("block")
+    assert pool.submit(lambda: None)
+    started = time.monotonic()
+    pool.shutdown(wait=False, timeout=0.1)
+    assert time.monotonic() - started < 0.5
+    assert pool.stats()["dropped"] == 1
+    assert not pool.submit(lambda: None)
+    release.set()
+    wait_for(lambda: pool.stats()["busy"] == 0)
+    assert pool.stats()["completed"] == 1
+
+
+def test_shutdown_stops_idle_workers_of_small_queue():
+    pool = WorkerPool(size=4, queue_size=1)
+    pool.start()
+    threads = list(pool._threads)
+    pool.shutdown(timeout=5)
+    assert not any(t.is_alive() for t in threads)
+
+
+@pytest.mark.parametrize("options", [dict(size=0), dict(queue_size=0), dict(overflow="wait")])
+def test_invalid_settings(options):
+    with pytest.raises(ValueError):
+        WorkerPool(**options)